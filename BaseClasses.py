@@ -3,16 +3,20 @@ from __future__ import annotations
 import collections
 import functools
 import logging
+import math
 import random
 import secrets
+import threading
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
-from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableSequence, Set
+from collections.abc import (Callable, Collection, Iterable, Iterator, Mapping, MutableMapping, MutableSequence,
+                             MutableSet, Set)
 from enum import IntEnum, IntFlag
 from typing import (AbstractSet, Any, ClassVar, Dict, List, Literal, NamedTuple,
-                    Optional, Protocol, Tuple, Union, TYPE_CHECKING, overload)
+                    Optional, Protocol, Tuple, TypeVar, Union, TYPE_CHECKING, overload)
 import dataclasses
+from array import array
 
 from typing_extensions import NotRequired, TypedDict
 
@@ -22,6 +26,7 @@ import Utils
 
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
+    from rule_builder.compiled import CompiledRules
     from rule_builder.rules import Rule
     from worlds import AutoWorld
 
@@ -79,6 +84,10 @@ class MultiWorld():
     is_race: bool = False
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
+    state_indices: Dict[int, StateIndex]
+    sphere_caches: Optional[Dict[bool, SphereCache]]
+    rule_dependencies: Dict[Union[Location, Entrance],
+                            Tuple[CollectionRule, Optional[Tuple[frozenset[str], frozenset[str]]]]]
 
     plando_options: PlandoOptions
     early_items: Dict[int, Dict[str, int]]
@@ -169,6 +178,9 @@ class MultiWorld():
         self.indirect_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
+        self.state_indices = {}
+        self.sphere_caches = None
+        self.rule_dependencies = {}
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -428,6 +440,25 @@ class MultiWorld():
     def get_location(self, location_name: str, player: int) -> Location:
         return self.regions.location_cache[player][location_name]
 
+    def build_state_indices(self, players: Optional[Iterable[int]] = None) -> None:
+        """
+        Interns item names and regions to dense integer ids, so that CollectionStates created afterwards use compact
+        array and bitset storage for these players.
+
+        :param players: The players to build indices for, defaulting to every world with `compact_collection_state`.
+        """
+        if players is None:
+            players = [player for player in self.player_ids if self.worlds[player].compact_collection_state]
+        for player in players:
+            item_names: Set[str] = set(self.worlds[player].item_names)
+            item_names.update(item.name for item in self.itempool if item.player == player)
+            item_names.update(item.name for item in self.precollected_items[player])
+            index = StateIndex(sorted(item_names), self.get_regions(player))
+            self.state_indices[player] = index
+            if hasattr(self, "state"):
+                self.state.prog_items[player] = CompactItemCounter(index, self.state.prog_items[player])
+                self.state.reachable_regions[player] = RegionBitSet(index, self.state.reachable_regions[player])
+
     def get_all_state(self, use_cache: bool | None = None, allow_partial_entrances: bool = False,
                       collect_pre_fill_items: bool = True, perform_sweep: bool = True) -> CollectionState:
         """
@@ -526,6 +557,17 @@ class MultiWorld():
     def get_filled_locations(self, player: Optional[int] = None) -> List[Location]:
         return [location for location in self.get_locations(player) if location.item is not None]
 
+    def get_rule_dependencies(self, spot: Union[Location, Entrance]) -> Optional[Tuple[frozenset[str], frozenset[str]]]:
+        """The item names and region names the access rule of spot depends on,
+        or None if its rule does not report them. Cached until the access rule is replaced."""
+        rule = spot.access_rule
+        cached = self.rule_dependencies.get(spot)
+        if cached is not None and cached[0] is rule:
+            return cached[1]
+        dependencies = _access_rule_dependencies(rule)
+        self.rule_dependencies[spot] = rule, dependencies
+        return dependencies
+
     def get_reachable_locations(self, state: Optional[CollectionState] = None, player: Optional[int] = None) -> List[Location]:
         state: CollectionState = state if state else self.state
         return [location for location in self.get_locations(player) if location.can_reach(state)]
@@ -582,6 +624,27 @@ class MultiWorld():
 
         return False
 
+    def cache_spheres(self) -> None:
+        """
+        Keep the logical spheres of the filled locations around once placement is done, so that get_spheres,
+        get_sendable_spheres, fulfills_accessibility and the spoiler playthrough share a single computation.
+        """
+        if self.sphere_caches is None:
+            self.sphere_caches = {}
+
+    def get_sphere_cache(self, sendable: bool = False) -> SphereCache:
+        """
+        Returns the shared SphereCache brought up to date with the current placement if spheres are cached,
+        otherwise a fresh one.
+        """
+        if self.sphere_caches is None:
+            return SphereCache(self, sendable)
+        sphere_cache = self.sphere_caches.get(sendable)
+        if sphere_cache is None:
+            sphere_cache = self.sphere_caches.setdefault(sendable, SphereCache(self, sendable))
+        sphere_cache.refresh()
+        return sphere_cache
+
     def get_spheres(self) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
@@ -590,24 +653,7 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.get_sphere_cache()
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -616,46 +662,10 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.get_sphere_cache(sendable=True)
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -683,7 +693,20 @@ class MultiWorld():
                 return False  # still locations required to be collected
             return True
 
-        locations = [location for location in self.get_locations() if location_relevant(location)]
+        if not state and self.sphere_caches is not None:
+            # everything reachable from a fresh state is already known from the shared spheres
+            state = self.get_sphere_cache().final_state.copy()
+            locations = [location for location in self.get_locations()
+                         if location_relevant(location) and not location.can_reach(state)]
+            beatable_fulfilled = self.has_beaten_game(state)
+            if all_done():
+                return True
+            if not locations:
+                return False
+        else:
+            if not state:
+                state = CollectionState(self)
+            locations = [location for location in self.get_locations() if location_relevant(location)]
 
         while locations:
             sphere: List[Location] = []
@@ -719,13 +742,402 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class StateIndex:
+    """Dense per-player integer ids for item names and regions, shared by all compact CollectionState storage."""
+    item_ids: Dict[str, int]
+    item_names: List[str]
+    region_ids: Dict[Region, int]
+    regions: List[Region]
+
+    def __init__(self, item_names: Iterable[str] = (), regions: Iterable[Region] = ()) -> None:
+        self.item_ids = {}
+        self.item_names = []
+        self.region_ids = {}
+        self.regions = []
+        for item_name in item_names:
+            self.intern_item(item_name)
+        for region in regions:
+            self.intern_region(region)
+
+    def intern_item(self, item_name: str) -> int:
+        item_id = self.item_ids.get(item_name)
+        if item_id is None:
+            item_id = self.item_ids[item_name] = len(self.item_names)
+            self.item_names.append(item_name)
+        return item_id
+
+    def intern_region(self, region: Region) -> int:
+        region_id = self.region_ids.get(region)
+        if region_id is None:
+            region_id = self.region_ids[region] = len(self.regions)
+            self.regions.append(region)
+        return region_id
+
+
+class CompactItemCounter(MutableMapping[str, Any]):
+    """
+    Counter-compatible item storage backed by a flat integer array indexed through a StateIndex.
+    Copying is a single buffer copy. Names unknown to the index are interned on first write.
+    Non-integer counts, as some worlds track fractional pseudo-items, are kept in a small side dict.
+    """
+    __slots__ = ("index", "counts", "non_int_counts")
+    index: StateIndex
+    counts: array
+    non_int_counts: Dict[str, Any]
+
+    def __init__(self, index: StateIndex, initial: Optional[Mapping[str, Any]] = None) -> None:
+        self.index = index
+        self.counts = array("l", bytes(array("l").itemsize * len(index.item_names)))
+        self.non_int_counts = {}
+        if initial:
+            for item_name, count in initial.items():
+                if count:
+                    self[item_name] = count
+
+    def __getitem__(self, item_name: str) -> Any:
+        item_id = self.index.item_ids.get(item_name)
+        if item_id is not None and item_id < len(self.counts):
+            count = self.counts[item_id]
+            if count:
+                return count
+        if self.non_int_counts:
+            return self.non_int_counts.get(item_name, 0)
+        return 0
+
+    def __setitem__(self, item_name: str, count: Any) -> None:
+        item_id = self.index.intern_item(item_name)
+        counts = self.counts
+        if item_id >= len(counts):
+            counts.extend(bytes(counts.itemsize * (item_id + 1 - len(counts))))
+        if type(count) is int:
+            counts[item_id] = count
+            if self.non_int_counts:
+                self.non_int_counts.pop(item_name, None)
+        else:
+            counts[item_id] = 0
+            self.non_int_counts[item_name] = count
+
+    def __delitem__(self, item_name: str) -> None:
+        # like Counter, deleting a missing item is not an error
+        item_id = self.index.item_ids.get(item_name)
+        if item_id is not None and item_id < len(self.counts):
+            self.counts[item_id] = 0
+        if self.non_int_counts:
+            self.non_int_counts.pop(item_name, None)
+
+    def __contains__(self, item_name: object) -> bool:
+        return bool(self[item_name]) if isinstance(item_name, str) else False
+
+    def __iter__(self) -> Iterator[str]:
+        item_names = self.index.item_names
+        for item_id, count in enumerate(self.counts):
+            if count:
+                yield item_names[item_id]
+        for item_name, count in self.non_int_counts.items():
+            if count:
+                yield item_name
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.counts.count(0) + sum(1 for count in self.non_int_counts.values() if count)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Mapping):
+            return dict(self.items()) == {key: value for key, value in other.items() if value}
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())})"
+
+    def get(self, item_name: str, default: Any = None) -> Any:
+        count = self[item_name]
+        return count if count else default
+
+    def copy(self) -> CompactItemCounter:
+        ret = CompactItemCounter.__new__(CompactItemCounter)
+        ret.index = self.index
+        ret.counts = array("l", self.counts)
+        ret.non_int_counts = self.non_int_counts.copy()
+        return ret
+
+    def update(self, other: Union[Mapping[str, Any], Iterable[str]] = (), /, **kwargs: Any) -> None:
+        """Adds counts like Counter.update, instead of replacing them like dict.update."""
+        if isinstance(other, Mapping):
+            for item_name, count in other.items():
+                self[item_name] += count
+        else:
+            for item_name in other:
+                self[item_name] += 1
+        for item_name, count in kwargs.items():
+            self[item_name] += count
+
+    def total(self) -> Any:
+        return sum(self.counts) + sum(self.non_int_counts.values())
+
+
+class RegionBitSet(MutableSet["Region"]):
+    """Set of reachable Regions stored as a bitset indexed through a StateIndex. Copying is a single buffer copy."""
+    __slots__ = ("index", "bits", "size")
+    index: StateIndex
+    bits: bytearray
+    size: int
+
+    def __init__(self, index: StateIndex, initial: Iterable[Region] = ()) -> None:
+        self.index = index
+        self.bits = bytearray((len(index.regions) + 7) >> 3)
+        self.size = 0
+        for region in initial:
+            self.add(region)
+
+    @classmethod
+    def _from_iterable(cls, regions: Iterable[Region]) -> Set[Region]:
+        # results of set operators are not bound to an index, so fall back to a regular set
+        return set(regions)
+
+    def __contains__(self, region: object) -> bool:
+        region_id = self.index.region_ids.get(region)  # type: ignore[call-overload]
+        if region_id is None:
+            return False
+        byte = region_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (region_id & 7) & 1)
+
+    def __iter__(self) -> Iterator[Region]:
+        regions = self.index.regions
+        for byte, value in enumerate(self.bits):
+            if value:
+                for bit in range(8):
+                    if value >> bit & 1:
+                        yield regions[(byte << 3) | bit]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({set(self)})"
+
+    def add(self, region: Region) -> None:
+        region_id = self.index.intern_region(region)
+        byte = region_id >> 3
+        bits = self.bits
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        mask = 1 << (region_id & 7)
+        if not bits[byte] & mask:
+            bits[byte] |= mask
+            self.size += 1
+
+    def discard(self, region: Region) -> None:
+        if region in self:
+            region_id = self.index.region_ids[region]
+            self.bits[region_id >> 3] &= ~(1 << (region_id & 7)) & 0xFF
+            self.size -= 1
+
+    def clear(self) -> None:
+        self.bits = bytearray(len(self.bits))
+        self.size = 0
+
+    def copy(self) -> RegionBitSet:
+        ret = RegionBitSet.__new__(RegionBitSet)
+        ret.index = self.index
+        ret.bits = bytearray(self.bits)
+        ret.size = self.size
+        return ret
+
+    def update(self, *others: Iterable[Region]) -> None:
+        for regions in others:
+            for region in regions:
+                self.add(region)
+
+    def difference(self, *others: Iterable[Region]) -> Set[Region]:
+        ret = set(self)
+        ret.difference_update(*others)
+        return ret
+
+    def intersection(self, *others: Iterable[Region]) -> Set[Region]:
+        return set(self).intersection(*others)
+
+
+class SphereCache:
+    """
+    Logical spheres of the filled locations of a MultiWorld, computed lazily and shared between everything that
+    replays the finished placement (accessibility check, sendable spheres, spoiler playthrough, world output).
+
+    Each computed sphere keeps a snapshot of the state it was reached with. Whenever the cache is retrieved through
+    MultiWorld.get_sphere_cache, the current placement is compared to the one the spheres were computed for. Changed
+    locations, for example after Fill.swap_location_item, only discard the spheres from the earliest one affected
+    by the change, which are then recomputed on demand.
+    """
+    multiworld: MultiWorld
+    sendable: bool
+    """only sphere multiserver sendable locations, collecting events as soon as they are reachable"""
+    spheres: List[Set[Location]]
+    states: List[CollectionState]
+    """states[n] is the state sphere n was computed with"""
+    unreachable: Set[Location]
+    """locations left over once no further sphere could be found"""
+    complete: bool
+    placements: Dict[Location, Tuple[Item, bool]]
+    """item and its advancement flag per location, as the spheres were computed for"""
+
+    def __init__(self, multiworld: MultiWorld, sendable: bool = False) -> None:
+        self.multiworld = multiworld
+        self.sendable = sendable
+        self.lock = threading.RLock()
+        self.spheres = []
+        self.states = []
+        self.placements = {}
+        self._location_sphere: Dict[Location, int] = {}
+        self._truncate(0)
+
+    def is_sphere_location(self, location: Location) -> bool:
+        """Whether the location is part of the spheres, as opposed to being collected as an event."""
+        return not self.sendable or (type(location.item.code) is int and type(location.address) is int)
+
+    def __iter__(self) -> Iterator[Set[Location]]:
+        """
+        yields a set of locations for each logical sphere, computing them as needed
+
+        If there are unreachable locations, the last sphere of reachable
+        locations is followed by an empty set, and then a set of all of the
+        unreachable locations.
+        """
+        index = 0
+        while True:
+            with self.lock:
+                if index >= len(self.spheres) and not self.complete:
+                    self._next_sphere()
+                if index < len(self.spheres):
+                    sphere = set(self.spheres[index])
+                else:
+                    unreachable = set(self.unreachable)
+                    break
+            yield sphere
+            index += 1
+        if unreachable:
+            yield set()
+            yield unreachable
+
+    def compute(self) -> None:
+        """Compute all remaining spheres."""
+        with self.lock:
+            while not self.complete:
+                self._next_sphere()
+
+    @property
+    def final_state(self) -> CollectionState:
+        """State after collecting every reachable sphere. Do not modify."""
+        self.compute()
+        return self._state
+
+    def refresh(self) -> None:
+        """Bring the spheres up to date with the current placement of items."""
+        with self.lock:
+            placements = {location: (location.item, location.item.advancement)
+                          for location in self.multiworld.get_filled_locations()}
+            if placements == self.placements:
+                return
+            start = len(self.spheres)
+            changed = False
+            for location in placements.keys() | self.placements.keys():
+                old = self.placements.get(location)
+                new = placements.get(location)
+                if old == new:
+                    continue
+                changed = True
+                sphere = self._location_sphere.get(location)
+                if sphere is None:
+                    sphere = self._first_reaching_sphere(location) if new else len(self.spheres)
+                if (old and old[1]) or (new and new[1]) or self.sendable:
+                    start = min(start, sphere)
+                elif sphere < len(self.spheres):
+                    # filler moving in or out of an already computed sphere does not affect any later sphere
+                    if new:
+                        self.spheres[sphere].add(location)
+                        self._location_sphere[location] = sphere
+                    else:
+                        self.spheres[sphere].discard(location)
+                        del self._location_sphere[location]
+            self.placements = placements
+            if changed:
+                self._truncate(start)
+
+    def _first_reaching_sphere(self, location: Location) -> int:
+        """Binary search the earliest computed sphere whose state can reach the location."""
+        low, high = 0, len(self.states)
+        while low < high:
+            mid = (low + high) // 2
+            if location.can_reach(self.states[mid]):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def _truncate(self, start: int) -> None:
+        """Discard all spheres from start onwards, they will be recomputed from the current placement."""
+        if start < len(self.states):
+            self._state = self.states[start].copy()
+        elif not self.states:
+            self._state = CollectionState(self.multiworld)
+        del self.spheres[start:]
+        del self.states[start:]
+        self._location_sphere = {location: sphere for location, sphere in self._location_sphere.items()
+                                 if sphere < start}
+        if not self.placements:
+            self.placements = {location: (location.item, location.item.advancement)
+                               for location in self.multiworld.get_filled_locations()}
+        self._remaining: Set[Location] = set()
+        self._events: Set[Location] = set()
+        for location in self.placements:
+            if location in self._location_sphere:
+                continue
+            if self.is_sphere_location(location):
+                self._remaining.add(location)
+            else:
+                self._events.add(location)
+        self.unreachable = set()
+        self.complete = not self._remaining
+
+    def _next_sphere(self) -> None:
+        index = len(self.spheres)
+        state = self._state
+        self.states.append(state.copy())
+
+        if self._events:
+            # cull events out
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in self._events:
+                    if event.can_reach(state):
+                        state.collect(event.item, True, event)
+                        self._location_sphere[event] = index
+                        done_events.add(event)
+                self._events -= done_events
+
+        sphere = {location for location in self._remaining if location.can_reach(state)}
+        if not sphere:
+            self.unreachable = self._remaining
+            self._remaining = set()
+            self.complete = True
+            return
+
+        for location in sphere:
+            state.collect(location.item, True, location)
+            self._location_sphere[location] = index
+        self._remaining -= sphere
+        self.spheres.append(sphere)
+        self.complete = not self._remaining
+
+
 class CollectionState():
-    prog_items: Dict[int, Counter[str]]
+    prog_items: Dict[int, Union[Counter[str], CompactItemCounter]]
     multiworld: MultiWorld
-    reachable_regions: Dict[int, Set[Region]]
+    reachable_regions: Dict[int, Union[Set[Region], RegionBitSet]]
     blocked_connections: Dict[int, Set[Entrance]]
+    region_entrances: Dict[int, Dict[Region, Optional[Entrance]]]
+    """For players with decremental reachability, the Entrance each reachable Region was first reached through, in the
+    order the Regions were reached. The origin Region maps to None."""
     advancements: Set[Location]
-    path: Dict[Union[Region, Entrance], PathValue]
+    path: MutableMapping[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     stale: Dict[int, bool]
     allow_partial_entrances: bool
@@ -734,10 +1146,15 @@ class CollectionState():
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        state_indices = parent.state_indices
+        self.prog_items = {player: CompactItemCounter(state_indices[player]) if player in state_indices else Counter()
+                           for player in parent.get_all_ids()}
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
+        self.reachable_regions = {player: RegionBitSet(state_indices[player]) if player in state_indices else set()
+                                  for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.region_entrances = {player: {} for player in parent.get_all_ids()
+                                 if parent.worlds[player].decremental_reachability}
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
@@ -761,6 +1178,8 @@ class CollectionState():
             reachable_regions.add(start)
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
+            if player in self.region_entrances:
+                self.region_entrances[player][start] = None
 
         if world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
@@ -770,6 +1189,7 @@ class CollectionState():
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        region_entrances = self.region_entrances.get(player)
         # run BFS on all connections, and keep track of those blocked by missing items
         while queue:
             connection = queue.popleft()
@@ -781,6 +1201,8 @@ class CollectionState():
                     continue
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
                 reachable_regions.add(new_region)
+                if region_entrances is not None:
+                    region_entrances[new_region] = connection
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
@@ -797,6 +1219,7 @@ class CollectionState():
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        region_entrances = self.region_entrances.get(player)
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
@@ -811,6 +1234,8 @@ class CollectionState():
                         continue
                     assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
                     reachable_regions.add(new_region)
+                    if region_entrances is not None:
+                        region_entrances[new_region] = connection
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
@@ -827,6 +1252,8 @@ class CollectionState():
                                  self.reachable_regions.items()}
         ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
                                    self.blocked_connections.items()}
+        ret.region_entrances = {player: region_entrances.copy() for player, region_entrances in
+                                self.region_entrances.items()}
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
@@ -835,6 +1262,37 @@ class CollectionState():
             ret = function(self, ret)
         return ret
 
+    def copy_for_player(self, player: int) -> CollectionState:
+        """
+        A copy for speculative changes that only affect player's logic, such as testing a connection during entrance
+        randomization. Only player's items and region reachability are copied, those of every other player are shared
+        with this state, so the copy must only collect and remove player's own items. Other players' region
+        reachability is brought up to date in this state first, so that the copy never has to update the shared sets.
+        Checked locations and advancements are still copied in full, so this is not a cheap copy for states with many
+        checked locations.
+        """
+        for other, stale in self.stale.items():
+            if stale and other != player:
+                self.update_reachable_regions(other)
+        ret = self.__class__.__new__(self.__class__)
+        ret.multiworld = self.multiworld
+        ret.prog_items = {**self.prog_items, player: self.prog_items[player].copy()}
+        ret.reachable_regions = {**self.reachable_regions, player: self.reachable_regions[player].copy()}
+        ret.blocked_connections = {**self.blocked_connections, player: self.blocked_connections[player].copy()}
+        ret.region_entrances = self.region_entrances.copy()
+        if player in self.region_entrances:
+            ret.region_entrances[player] = self.region_entrances[player].copy()
+        ret.advancements = self.advancements.copy()
+        ret.path = collections.ChainMap({}, self.path)
+        ret.locations_checked = self.locations_checked.copy()
+        ret.stale = self.stale.copy()
+        ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
+        for function in self.additional_copy_functions:
+            ret = function(self, ret)
+        return ret
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -878,6 +1336,20 @@ class CollectionState():
         # under this assumption, an extra sweep iteration is performed that checks every player, to confirm that the
         # sweep is finished.
         checking_if_finished = False
+        # Locations with rules that report their dependencies are only re-checked once one of the item names or regions
+        # they depend on changed, see _SweepIndex. The first iteration and the confirmation iteration check everything.
+        check_all = True
+        sweep_indices: Dict[int, _SweepIndex] = {}
+        # Worlds that opted into compiled rules have all of their locations evaluated in one pass when everything is
+        # checked.
+        compiled_rules: Dict[int, CompiledRules] = {}
+        for player, locations in advancements_per_player:
+            sweep_index = _SweepIndex.build(self, player, locations)
+            if sweep_index:
+                sweep_indices[player] = sweep_index
+            world = self.multiworld.worlds.get(player)
+            if world and world.compile_rules:
+                compiled_rules[player] = world.compiled_rules
         while players_to_check:
             next_advancements_per_player: List[Tuple[int, List[Location]]] = []
             next_players_to_check = set()
@@ -887,18 +1359,32 @@ class CollectionState():
                     next_advancements_per_player.append((player, locations))
                     continue
 
+                sweep_index = sweep_indices.get(player)
+                if sweep_index and not check_all:
+                    locations_to_check = sweep_index.affected(self, locations)
+                else:
+                    locations_to_check = locations
+
                 # Accessibility of each location is checked first because a player's region accessibility cache becomes
                 # stale whenever one of their own items is collected into the state.
                 reachable_locations: List[Location] = []
                 unreachable_locations: List[Location] = []
-                for location in locations:
-                    if location.can_reach(self):
-                        # Locations containing items that do not belong to `player` could be collected immediately
-                        # because they won't stale `player`'s region accessibility cache, but, for simplicity, all the
-                        # items at reachable locations are collected in a single loop.
-                        reachable_locations.append(location)
-                    else:
-                        unreachable_locations.append(location)
+                if player in compiled_rules and locations_to_check is locations:
+                    reachable_locations, unreachable_locations = \
+                        compiled_rules[player].split_reachable(self, locations)
+                else:
+                    for location in locations_to_check:
+                        if location.can_reach(self):
+                            # Locations containing items that do not belong to `player` could be collected immediately
+                            # because they won't stale `player`'s region accessibility cache, but, for simplicity, all
+                            # the items at reachable locations are collected in a single loop.
+                            reachable_locations.append(location)
+                        else:
+                            unreachable_locations.append(location)
+                if locations_to_check is not locations:
+                    # the locations that were skipped are still unreachable
+                    reached = set(reachable_locations)
+                    unreachable_locations = [location for location in locations if location not in reached]
                 if unreachable_locations:
                     next_advancements_per_player.append((player, unreachable_locations))
 
@@ -912,6 +1398,8 @@ class CollectionState():
                 # more performant to instead discard `player` from `next_players_to_check` once their locations have
                 # been processed.
                 next_players_to_check.discard(player)
+                if sweep_index:
+                    sweep_index.checked(self)
 
                 # Collect the items from the reachable locations.
                 for advancement in reachable_locations:
@@ -922,12 +1410,18 @@ class CollectionState():
                         # The player the item belongs to may be able to reach additional locations in the next sweep
                         # iteration.
                         next_players_to_check.add(item.player)
+                        if item.player in sweep_indices:
+                            sweep_indices[item.player].collected(item)
 
+            check_all = False
             if not next_players_to_check:
                 if not checking_if_finished:
                     # It is assumed that each player's world only logically depends on itself, which may not be the
                     # case, so confirm that the sweep is finished by doing an extra iteration that checks every player.
+                    # Every location is checked in this iteration, which also covers dependencies that rules did not
+                    # report, such as counters added by a world's collect override.
                     checking_if_finished = True
+                    check_all = True
                     next_players_to_check = all_players
             else:
                 checking_if_finished = False
@@ -1139,13 +1633,62 @@ class CollectionState():
         self.prog_items[player][item] += count
 
     def remove(self, item: Item):
+        if item.player in self.region_entrances:
+            player_prog_items = self.prog_items[item.player]
+            previous_items = player_prog_items.copy()
+            if self.multiworld.worlds[item.player].remove(self, item):
+                removed_items = {item_name for item_name, count in previous_items.items()
+                                 if player_prog_items[item_name] != count}
+                self._invalidate_reachable_regions(item.player, removed_items)
+            return
+
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
-            self.reachable_regions[item.player] = set()
+            self.reachable_regions[item.player].clear()
             self.blocked_connections[item.player] = set()
             self.stale[item.player] = True
 
+    def _invalidate_reachable_regions(self, player: int, removed_items: AbstractSet[str]) -> None:
+        """
+        Drops only the reachable Regions whose entry path may have depended on the removed items, along with everything
+        that was reached through them, and queues their entrances from still reachable Regions to be retried.
+        """
+        reachable_regions = self.reachable_regions[player]
+        region_entrances = self.region_entrances[player]
+        lost_regions: List[Region] = []
+        lost_region_names: Set[str] = set()
+        # regions are stored in the order they were reached, so every region an entry depends on is visited before it
+        for region, entrance in region_entrances.items():
+            if region not in reachable_regions:
+                # something outside of this mechanism already dropped the region
+                lost = True
+            elif entrance is None:
+                lost = False
+            else:
+                lost = entrance.parent_region.name in lost_region_names or \
+                    _dependencies_may_include(self.multiworld.get_rule_dependencies(entrance), removed_items,
+                                              lost_region_names)
+            if lost:
+                lost_regions.append(region)
+                lost_region_names.add(region.name)
+
+        if not lost_regions:
+            return
+
+        world = self.multiworld.worlds[player]
+        blocked_connections = self.blocked_connections[player]
+        for region in lost_regions:
+            del region_entrances[region]
+            reachable_regions.discard(region)
+            blocked_connections.difference_update(region.exits)
+            world.lost_region(self, region)
+        for region in lost_regions:
+            for entrance in region.entrances:
+                if entrance.parent_region in reachable_regions:
+                    blocked_connections.add(entrance)
+        self.stale[player] = True
+
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
         """
         Removes the item from state.
@@ -1178,6 +1721,101 @@ CollectionRule = Callable[[CollectionState], bool]
 DEFAULT_COLLECTION_RULE: CollectionRule = staticmethod(lambda state: True)
 
 
+def _access_rule_dependencies(rule: CollectionRule) -> Optional[Tuple[frozenset[str], frozenset[str]]]:
+    """The item names and region names an access rule depends on, use MultiWorld.get_rule_dependencies to cache them.
+    Only rule builder rules report their dependencies, None is returned for any other rule."""
+    if rule is DEFAULT_COLLECTION_RULE.__func__:
+        return frozenset(), frozenset()
+    if not hasattr(rule, "item_dependencies") or rule.force_recalculate or rule.location_dependencies() \
+            or rule.entrance_dependencies():
+        # reaching a location or entrance also depends on its own rule, which is not reported here
+        return None
+    return frozenset(rule.item_dependencies()), frozenset(rule.region_dependencies())
+
+
+def _dependencies_may_include(dependencies: Optional[Tuple[frozenset[str], frozenset[str]]],
+                              item_names: AbstractSet[str], region_names: AbstractSet[str]) -> bool:
+    """Whether an access rule with the given dependencies may have a different result without the given items or
+    regions. Rules that do not report their dependencies are assumed to depend on everything."""
+    if dependencies is None:
+        return True
+    rule_items, rule_regions = dependencies
+    return not (rule_items.isdisjoint(item_names) and rule_regions.isdisjoint(region_names))
+
+
+class _SweepIndex:
+    """
+    Reverse index from item names and region names to the sweep locations of one player whose access rules depend on
+    them, so a sweep iteration only re-checks locations that could have become reachable.
+    Locations with rules that do not report their dependencies are re-checked every time.
+    """
+    __slots__ = ("player", "by_item", "by_region", "opaque", "new_items", "seen_regions", "item_mapping")
+    player: int
+    by_item: Dict[str, List[Location]]
+    by_region: Dict[str, List[Location]]
+    opaque: List[Location]
+    new_items: Set[str]
+    """item names collected since the player's locations were last checked"""
+    seen_regions: Set[Region]
+    """reachable regions as of the last time the player's locations were checked"""
+    item_mapping: Mapping[str, str]
+
+    @classmethod
+    def build(cls, state: CollectionState, player: int, locations: Iterable[Location]) -> Optional[_SweepIndex]:
+        """Returns None if none of the locations' rules report dependencies, in which case indexing does not help."""
+        multiworld = state.multiworld
+        by_item: Dict[str, List[Location]] = defaultdict(list)
+        by_region: Dict[str, List[Location]] = defaultdict(list)
+        opaque: List[Location] = []
+        for location in locations:
+            dependencies = multiworld.get_rule_dependencies(location)
+            if dependencies is None or location.parent_region is None:
+                opaque.append(location)
+                continue
+            item_names, region_names = dependencies
+            for item_name in item_names:
+                by_item[item_name].append(location)
+            for region_name in region_names:
+                by_region[region_name].append(location)
+            by_region[location.parent_region.name].append(location)
+        if not by_item and not by_region:
+            return None
+        sweep_index = cls()
+        sweep_index.player = player
+        sweep_index.by_item = by_item
+        sweep_index.by_region = by_region
+        sweep_index.opaque = opaque
+        sweep_index.new_items = set()
+        sweep_index.seen_regions = set()
+        sweep_index.item_mapping = getattr(multiworld.worlds.get(player), "item_mapping", {})
+        return sweep_index
+
+    def collected(self, item: Item) -> None:
+        self.new_items.add(item.name)
+        mapped_name = self.item_mapping.get(item.name)
+        if mapped_name:
+            self.new_items.add(mapped_name)
+
+    def checked(self, state: CollectionState) -> None:
+        """Called once the player's locations were checked against the current state."""
+        self.new_items.clear()
+        self.seen_regions = set(state.reachable_regions[self.player])
+
+    def affected(self, state: CollectionState, locations: List[Location]) -> Iterable[Location]:
+        """The subset of the still unreached locations that may have become reachable since they were last checked."""
+        if state.stale[self.player]:
+            state.update_reachable_regions(self.player)
+        reachable_regions = state.reachable_regions[self.player]
+        candidates: Set[Location] = set(self.opaque)
+        for item_name in self.new_items:
+            candidates.update(self.by_item.get(item_name, ()))
+        if len(reachable_regions) != len(self.seen_regions):
+            for region in reachable_regions:
+                if region not in self.seen_regions:
+                    candidates.update(self.by_region.get(region.name, ()))
+        return [location for location in locations if location in candidates]
+
+
 class EntranceType(IntEnum):
     ONE_WAY = 1
     TWO_WAY = 2
@@ -1674,6 +2312,48 @@ class EntranceInfo(TypedDict, total=False):
     direction: str
 
 
+_T = TypeVar("_T")
+
+
+def cull_in_order(candidates: List[_T], try_remove: Callable[[List[_T]], bool]) -> List[bool]:
+    """
+    Removes each candidate in order if the game can still be beaten without it, the same as testing them one at a time,
+    and returns whether each candidate was removed.
+    try_remove removes a batch of candidates on top of the ones removed before and returns True if that is fine,
+    otherwise it restores the batch and returns False.
+    As removing candidates can only make beating the game harder, a successful batch means each of its candidates would
+    have been removed on its own, so candidates are tested in batches that only get split when they fail. The batch
+    size follows the share of required candidates so far, as failed batches cost more tests than they save.
+    """
+    removed = [False] * len(candidates)
+    required_count = 0
+
+    def cull(start: int, end: int, known_to_fail: bool) -> bool:
+        """Culls candidates[start:end] and returns whether all of them were removed."""
+        nonlocal required_count
+        if not known_to_fail and try_remove(candidates[start:end]):
+            removed[start:end] = [True] * (end - start)
+            return True
+        if end - start == 1:
+            required_count += 1
+            return False
+        middle = (start + end) // 2
+        first_half_removed = cull(start, middle, False)
+        # if the first half could be removed, the second half has to contain a required candidate
+        cull(middle, end, first_half_removed)
+        return False
+
+    index = 0
+    while index < len(candidates):
+        # expecting half of the batches to fail
+        required_share = (required_count + 1) / (index + 2)
+        batch_size = 1 if required_share >= 0.5 else max(1, int(math.log(0.5) / math.log(1 - required_share)))
+        end = min(index + batch_size, len(candidates))
+        cull(index, end, False)
+        index = end
+    return removed
+
+
 class Spoiler:
     multiworld: MultiWorld
     hashes: Dict[int, str]
@@ -1701,79 +2381,80 @@ class Spoiler:
     def create_playthrough(self, create_paths: bool = True) -> None:
         """Destructive to the multiworld while it is run, damage gets repaired afterwards."""
         from itertools import chain
-        # get locations containing progress items
         multiworld = self.multiworld
-        prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
-        collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
+        # the logical spheres are shared with the rest of the output, only the locations containing progress items
+        # and the state each of their spheres was reached with are of interest here
+        sphere_cache = multiworld.get_sphere_cache()
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-
-            sphere_candidates -= sphere
-            collection_spheres.append(sphere)
-            state_cache.append(state.copy())
-
-            logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
-                          len(sphere),
-                          len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if not multiworld.has_beaten_game(state):
-                    raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
-                                       "Something went terribly wrong here. "
-                                       f"Unreachable progression items: {sphere_candidates}")
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+        sphere_cache.compute()
+        state_cache: List[CollectionState] = []
+        collection_spheres: List[Set[Location]] = []
+        for sphere, sphere_state in zip(sphere_cache.spheres, sphere_cache.states):
+            sphere = {location for location in sphere if location.item.advancement}
+            if sphere:
+                collection_spheres.append(sphere)
+                state_cache.append(sphere_state)
+                logging.debug('Calculated sphere %i, containing %i progress items.', len(collection_spheres),
+                              len(sphere))
+
+        sphere_candidates = {location for location in sphere_cache.unreachable if location.item.advancement}
+        if sphere_candidates:
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if not multiworld.has_beaten_game(sphere_cache.final_state):
+                raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
+                                   "Something went terribly wrong here. "
+                                   f"Unreachable progression items: {sphere_candidates}")
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
-            to_delete: Set[Location] = set()
-            for location in sphere:
-                # we remove the location from required_locations to sweep from, and check if the game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                required_locations.remove(location)
+            def try_remove_locations(locations: List[Location]) -> bool:
+                # we remove the locations from required_locations to sweep from, and check if the game is still beatable
+                logging.debug('Checking if %i progress items starting with %s (Player %d) are required to beat the '
+                              'game.', len(locations), locations[0].item.name, locations[0].item.player)
+                required_locations.difference_update(locations)
                 if multiworld.can_beat_game(state_cache[num], required_locations):
-                    to_delete.add(location)
-                else:
-                    # still required, got to keep it around
-                    required_locations.add(location)
+                    return True
+                # still required, got to keep them around
+                required_locations.update(locations)
+                return False
 
             # cull entries in spheres for spoiler walkthrough at end
-            sphere -= to_delete
+            candidates = list(sphere)
+            sphere.difference_update(location for location, removed in
+                                     zip(candidates, cull_in_order(candidates, try_remove_locations)) if removed)
 
         # second phase, sphere 0
-        removed_precollected: List[Item] = []
+        def try_remove_precollected(items: List[Item]) -> bool:
+            logging.debug('Checking if %i precollected items starting with %s (Player %d) are required to beat the '
+                          'game.', len(items), items[0].name, items[0].player)
+            for item in items:
+                multiworld.state.remove(item)
+            if multiworld.can_beat_game(multiworld.state, required_locations):
+                return True
+            for item in items:
+                multiworld.state.collect(item, True)
+            return False
 
+        removed_precollected: List[Item] = []
+        precollected_candidates = [item for precollected_items in multiworld.precollected_items.values()
+                                   for item in precollected_items if item.advancement]
+        removed = iter(cull_in_order(precollected_candidates, try_remove_precollected))
         for precollected_items in multiworld.precollected_items.values():
-            # The list of items is mutated by removing one item at a time to determine if each item is required to beat
-            # the game, and re-adding that item if it was required, so a copy needs to be made before iterating.
-            for item in precollected_items.copy():
-                if not item.advancement:
-                    continue
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', item.name, item.player)
+            # order the items the same as removing each one and re-adding it at the end if it was required would
+            required_items: List[Item] = []
+            for item in [item for item in precollected_items if item.advancement]:
                 precollected_items.remove(item)
-                multiworld.state.remove(item)
-                if not multiworld.can_beat_game(multiworld.state, required_locations):
-                    # Add the item back into `precollected_items` and collect it into `multiworld.state`.
-                    multiworld.push_precollected(item)
-                else:
+                if next(removed):
                     removed_precollected.append(item)
+                else:
+                    required_items.append(item)
+            precollected_items += required_items
 
         # we are now down to just the required progress items in collection_spheres. Unfortunately
         # the previous pruning stage could potentially have made certain items dependant on others
@@ -1,10 +1,13 @@
+import bisect
 import collections
+import functools
 import itertools
 import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import (CollectionState, Item, ItemClassification, Location, LocationProgressType, MultiWorld,
+                         PlandoItemBlock)
 from Options import Accessibility
 
 from worlds.AutoWorld import call_all
@@ -33,6 +36,141 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class _LocationBucket:
+    """Locations of one player that share everything deciding whether an item may be placed there, except for
+    reachability."""
+    __slots__ = ("number", "player", "locations", "shared", "head", "state", "placements", "cursor", "reachable")
+    number: int
+    player: int
+    locations: typing.List[Location]
+    shared: bool
+    """False for a location with its own can_fill, which is then the only location of the bucket"""
+    head: int
+    """index of the first location that has not been filled yet"""
+    state: typing.Optional[CollectionState]
+    """the state reachability was checked against, further scans resume at cursor for the same state"""
+    placements: int
+    """the number of placements made when reachability was checked, any placement restarts the scan"""
+    cursor: int
+    reachable: typing.Optional[Location]
+
+    def __init__(self, number: int, player: int, shared: bool) -> None:
+        self.number = number
+        self.player = player
+        self.locations = []
+        self.shared = shared
+        self.head = 0
+        self.state = None
+        self.placements = 0
+        self.cursor = 0
+        self.reachable = None
+
+    def first_fillable(self, state: CollectionState, item: Item, check_access: bool,
+                       filled: typing.Set[Location], placements: int) -> typing.Optional[Location]:
+        """The first location of the bucket item can be placed at, mirroring Location.can_fill."""
+        location = self.locations[self.head]
+        if not self.shared:
+            return location if location.can_fill(state, item, check_access) else None
+        if location.always_allow(state, item) and \
+                item.name not in state.multiworld.worlds[item.player].options.non_local_items:
+            return location
+        if not ((location.progress_type != LocationProgressType.EXCLUDED or not (item.advancement or item.useful))
+                and location.item_rule(item)):
+            return None
+        if not check_access:
+            return location
+        return self.first_reachable(state, filled, placements)
+
+    def first_reachable(self, state: CollectionState, filled: typing.Set[Location],
+                        placements: int) -> typing.Optional[Location]:
+        if state is not self.state or placements != self.placements:
+            self.state = state
+            self.placements = placements
+            self.cursor = self.head
+            self.reachable = None
+        if self.reachable is not None and self.reachable not in filled:
+            return self.reachable
+        self.reachable = None
+        while self.cursor < len(self.locations):
+            location = self.locations[self.cursor]
+            self.cursor += 1
+            if location not in filled and location.can_reach(state):
+                self.reachable = location
+                return location
+        return None
+
+
+class _PlacementIndex:
+    """
+    The remaining locations of a fill_restrictive call, bucketed by player and by their fill rules and progress type.
+    Finding a spot evaluates the rules once per bucket instead of once per location and checks each location's
+    reachability at most once per exploration state and placement, while still returning the same location as
+    scanning the remaining locations in their original, randomized, order would. Filled locations are removed in O(1).
+    """
+    position: typing.Dict[Location, int]
+    buckets: typing.List[_LocationBucket]
+    bucket_of: typing.Dict[Location, _LocationBucket]
+    heads: typing.List[typing.Tuple[int, int]]
+    """sorted (position of the bucket's first remaining location, bucket number) of all non-empty buckets"""
+    filled: typing.Set[Location]
+
+    def __init__(self, locations: typing.Iterable[Location]) -> None:
+        self.position = {}
+        self.buckets = []
+        self.bucket_of = {}
+        self.filled = set()
+        buckets_by_signature: typing.Dict[typing.Hashable, _LocationBucket] = {}
+        for location in locations:
+            self.position[location] = len(self.position)
+            shared = type(location).can_fill is Location.can_fill
+            signature = (location.player, location.always_allow, location.item_rule, location.progress_type) \
+                if shared else location
+            bucket = buckets_by_signature.get(signature)
+            if bucket is None:
+                bucket = buckets_by_signature[signature] = _LocationBucket(len(self.buckets), location.player, shared)
+                self.buckets.append(bucket)
+            bucket.locations.append(location)
+            self.bucket_of[location] = bucket
+        self.heads = [(self.position[bucket.locations[0]], bucket.number) for bucket in self.buckets]
+
+    def __len__(self) -> int:
+        return len(self.position) - len(self.filled)
+
+    def find(self, state: CollectionState, item: Item, check_access: bool,
+             player: typing.Optional[int] = None) -> typing.Optional[Location]:
+        """The first remaining location that item can be placed at, optionally only considering player's locations."""
+        spot: typing.Optional[Location] = None
+        spot_position = len(self.position)
+        for head_position, number in self.heads:
+            if head_position >= spot_position:
+                break
+            bucket = self.buckets[number]
+            if player is not None and bucket.player != player:
+                continue
+            location = bucket.first_fillable(state, item, check_access, self.filled, len(self.filled))
+            if location is not None and self.position[location] < spot_position:
+                spot = location
+                spot_position = self.position[location]
+        return spot
+
+    def remove(self, location: Location) -> None:
+        self.filled.add(location)
+        bucket = self.bucket_of[location]
+        if bucket.locations[bucket.head] is location:
+            del self.heads[bisect.bisect_left(self.heads, (self.position[location], bucket.number))]
+            while bucket.head < len(bucket.locations) and bucket.locations[bucket.head] in self.filled:
+                bucket.head += 1
+            if bucket.head < len(bucket.locations):
+                bisect.insort(self.heads, (self.position[bucket.locations[bucket.head]], bucket.number))
+
+
+def _can_never_fill(location: Location, item: Item) -> bool:
+    """Whether item can not be placed at location in any state, judged without evaluating state dependent rules."""
+    return type(location).can_fill is Location.can_fill and location.always_allow is Location.always_allow and not (
+        (location.progress_type != LocationProgressType.EXCLUDED or not (item.advancement or item.useful))
+        and location.item_rule(item))
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -55,6 +193,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     placements: typing.List[Location] = []
     cleanup_required = False
     swapped_items: typing.Counter[typing.Tuple[int, str, bool]] = Counter()
+    # number of sweeps each swap phase needed, successful or not
+    swap_sweeps: typing.List[int] = []
     reachable_items: typing.Dict[int, typing.Deque[Item]] = {}
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
@@ -63,7 +203,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     total = min(len(item_pool), len(locations))
     placed = 0
 
-    while any(reachable_items.values()) and locations:
+    placement_index = _PlacementIndex(locations)
+    while any(reachable_items.values()) and placement_index:
         if one_item_per_player:
             # grab one item per player
             items_to_place = [items.pop()
@@ -90,7 +231,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not placement_index:
                 unplaced_items += items_to_place
                 break
             item_to_place = items_to_place.pop(0)
@@ -105,23 +246,26 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
+            spot_to_fill = placement_index.find(maximum_exploration_state, item_to_place, perform_access_check,
+                                                item_to_place.player if single_player_placement else None)
+            if spot_to_fill:
+                placement_index.remove(spot_to_fill)
+                locations.remove(spot_to_fill)
             else:
                 # we filled all reachable spots.
                 if swap:
+                    # The remaining items swept from `base_state` with every placed item where it is. Taking an item
+                    # out of a location this state did not collect from does not change the sweep, so a safe swap at
+                    # such a location can be tested against this state as is, and an unsafe one only needs to sweep on
+                    # from it.
+                    pool_state: typing.Optional[CollectionState] = None
                     # Keep a cache of previous safe swap states that might be usable to sweep from to produce the next
                     # swap state, instead of sweeping from `base_state` each time.
                     previous_safe_swap_state_cache: typing.Deque[CollectionState] = deque()
                     # Almost never are more than 2 states needed. The rare cases that do are usually highly restrictive
                     # single_player_placement=True pre-fills which can go through more than 10 states in some seeds.
                     max_swap_base_state_cache_length = 3
+                    sweeps = 0
 
                     # try swapping this item with previously placed items in a safe way then in an unsafe way
                     swap_attempts = ((i, location, unsafe)
@@ -138,38 +282,60 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                         swap_count = swapped_items[placed_item.player, placed_item.name, unsafe]
                         if swap_count > 1:
                             continue
+                        if single_player_placement and location.player != item_to_place.player \
+                                or _can_never_fill(location, item_to_place):
+                            # No swap state could change the outcome, so skip sweeping for one.
+                            continue
+
+                        if pool_state is None:
+                            pool_state = sweep_from_pool(base_state, item_pool,
+                                                         multiworld.get_filled_locations(item.player)
+                                                         if single_player_placement else None)
+                            sweeps += 1
 
                         location.item = None
                         placed_item.location = None
 
-                        for previous_safe_swap_state in previous_safe_swap_state_cache:
-                            # If a state has already checked the location of the swap, then it cannot be used.
-                            if location not in previous_safe_swap_state.advancements:
-                                # Previous swap states will have collected all items in `item_pool`, so the new
-                                # `swap_state` can skip having to collect them again.
-                                # Previous swap states will also have already checked many locations, making the sweep
-                                # faster.
-                                swap_state = sweep_from_pool(previous_safe_swap_state, (placed_item,) if unsafe else (),
+                        if location not in pool_state.advancements:
+                            if unsafe:
+                                swap_state = sweep_from_pool(pool_state, (placed_item,),
                                                              multiworld.get_filled_locations(item.player)
                                                              if single_player_placement else None)
-                                break
+                                sweeps += 1
+                            else:
+                                swap_state = pool_state
                         else:
-                            # No previous swap_state was usable as a base state to sweep from, so create a new one.
-                            swap_state = sweep_from_pool(base_state, [placed_item, *item_pool] if unsafe else item_pool,
-                                                         multiworld.get_filled_locations(item.player)
-                                                         if single_player_placement else None)
-                            # Unsafe states should not be added to the cache because they have collected `placed_item`.
-                            if not unsafe:
-                                if len(previous_safe_swap_state_cache) >= max_swap_base_state_cache_length:
-                                    # Remove the oldest cached state.
-                                    previous_safe_swap_state_cache.pop()
-                                # Add the new state to the start of the cache.
-                                previous_safe_swap_state_cache.appendleft(swap_state)
+                            for previous_safe_swap_state in previous_safe_swap_state_cache:
+                                # If a state has already checked the location of the swap, then it cannot be used.
+                                if location not in previous_safe_swap_state.advancements:
+                                    # Previous swap states will have collected all items in `item_pool`, so the new
+                                    # `swap_state` can skip having to collect them again.
+                                    # Previous swap states will also have already checked many locations, making the
+                                    # sweep faster.
+                                    swap_state = sweep_from_pool(previous_safe_swap_state,
+                                                                 (placed_item,) if unsafe else (),
+                                                                 multiworld.get_filled_locations(item.player)
+                                                                 if single_player_placement else None)
+                                    break
+                            else:
+                                # No previous swap_state was usable as a base state to sweep from, so create a new one.
+                                swap_state = sweep_from_pool(base_state,
+                                                             [placed_item, *item_pool] if unsafe else item_pool,
+                                                             multiworld.get_filled_locations(item.player)
+                                                             if single_player_placement else None)
+                                # Unsafe states should not be added to the cache because they have collected
+                                # `placed_item`.
+                                if not unsafe:
+                                    if len(previous_safe_swap_state_cache) >= max_swap_base_state_cache_length:
+                                        # Remove the oldest cached state.
+                                        previous_safe_swap_state_cache.pop()
+                                    # Add the new state to the start of the cache.
+                                    previous_safe_swap_state_cache.appendleft(swap_state)
+                            sweeps += 1
                         # unsafe means swap_state assumes we can somehow collect placed_item before item_to_place
                         # by continuing to swap, which is not guaranteed. This is unsafe because there is no mechanic
                         # to clean that up later, so there is a chance generation fails.
-                        if (not single_player_placement or location.player == item_to_place.player) \
-                                and location.can_fill(swap_state, item_to_place, perform_access_check):
+                        if location.can_fill(swap_state, item_to_place, perform_access_check):
                             # Add this item to the existing placement, and
                             # add the old item to the back of the queue
                             spot_to_fill = placements.pop(i)
@@ -184,12 +350,16 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
 
+                            logging.debug(f"Swapped {placed_item} out of {spot_to_fill} for {item_to_place}"
+                                          f"{' unsafely' if unsafe else ''} after {sweeps} sweeps.")
                             break
 
                         # Item can't be placed here, restore original item
                         location.item = placed_item
                         placed_item.location = location
 
+                    swap_sweeps.append(sweeps)
+
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
@@ -208,6 +378,9 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
     if total > 1000:
         _log_fill_progress(name, placed, total)
+    if swap_sweeps:
+        logging.debug(f"Fill step ({name}) needed {len(swap_sweeps)} swap phases, "
+                      f"costing {sum(swap_sweeps)} sweeps, at most {max(swap_sweeps)} for one item.")
 
     if cleanup_required:
         # validate all placements and remove invalid ones
@@ -730,13 +903,65 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
-def balance_multiworld_progression(multiworld: MultiWorld) -> None:
+def _find_items_to_replace(state: CollectionState, items_to_test: typing.List[Location],
+                           locations_to_test: typing.Set[Location],
+                           still_fulfilled: typing.Callable[[CollectionState], bool]) -> typing.List[Location]:
+    """
+    Decides which of the candidate items, tested from the end of items_to_test, have to be moved into earlier spheres.
+    A candidate has to be moved if the player falls short without it, while keeping every candidate that had to be
+    moved so far and every candidate that is yet to be tested. This is the same outcome as testing each candidate
+    against a freshly built state, given that logic is monotonic:
+    * A candidate that had to be moved leaves the kept items unchanged, and removing items from the kept items never
+      helps, so every other copy of the same item has to be moved as well.
+    * If the player is still fine without the next few candidates at once, each of them would pass on its own, so
+      runs of candidates that can stay are tested in growing batches.
+    The candidates that had to be moved are collected into a cached state that the tested states are copied from.
+    """
+    moved_state = state.copy()
+    items_to_replace: typing.List[Location] = []
+    # (name, classification) of items that could not be taken out of the kept items
+    failed: typing.Set[typing.Tuple[str, ItemClassification]] = set()
+    batch_size = 1
+    while items_to_test:
+        testing = items_to_test[-1]
+        key = testing.item.name, testing.item.classification
+        if key not in failed:
+            # a batch containing an item that had to be moved would fail as well
+            batch_size = min(batch_size, len(items_to_test))
+            for size in range(2, batch_size + 1):
+                batch_item = items_to_test[-size].item
+                if (batch_item.name, batch_item.classification) in failed:
+                    batch_size = size - 1
+                    break
+            reducing_state = moved_state.copy()
+            for location in itertools.islice(items_to_test, len(items_to_test) - batch_size):
+                reducing_state.collect(location.item, True, location)
+            reducing_state.sweep_for_advancements(locations=locations_to_test)
+            if still_fulfilled(reducing_state):
+                del items_to_test[-batch_size:]
+                batch_size *= 2
+                continue
+            if batch_size > 1:
+                batch_size = 1
+                continue
+            failed.add(key)
+        items_to_test.pop()
+        items_to_replace.append(testing)
+        moved_state.collect(testing.item, True, testing)
+    return items_to_replace
+
+
+def balance_multiworld_progression(multiworld: MultiWorld,
+                                   balancing_method: typing.Literal["incremental", "compatibility"] = "incremental"
+                                   ) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
     # Gather up all locations in a sphere.
     # Define a threshold value based on the player with the most available locations.
     # If other players are below the threshold value, swap progression in this sphere into earlier spheres,
     #   which gives more locations available by this sphere.
+    if balancing_method not in ("incremental", "compatibility"):
+        raise ValueError(f"Progression Balancing Method {balancing_method} not recognized.")
     balanceable_players: typing.Dict[int, float] = {
         player: multiworld.worlds[player].options.progression_balancing / 100
         for player in multiworld.player_ids
@@ -776,6 +1001,14 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         def item_percentage(player: int, num: int) -> float:
             return num / total_locations_count[player]
 
+        def still_fulfilled(player: int, balancing_state: CollectionState, locations_to_test: typing.Set[Location],
+                            reducing_state: CollectionState) -> bool:
+            if multiworld.has_beaten_game(balancing_state):
+                return multiworld.has_beaten_game(reducing_state)
+            reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
+            p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
+            return p >= threshold_percentages[player]
+
         # If there are no locations that aren't locked, there's no point in attempting to balance progression.
         if len(total_locations_count) == 0:
             return
@@ -855,6 +1088,11 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        if balancing_method == "incremental":
+                            items_to_replace += _find_items_to_replace(
+                                state, items_to_test, locations_to_test,
+                                functools.partial(still_fulfilled, player, balancing_state, locations_to_test))
+                            continue
                         while items_to_test:
                             testing = items_to_test.pop()
                             reducing_state = state.copy()
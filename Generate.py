@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
+import functools
+import hashlib
+import inspect
 import logging
 import os
+import pickle
 import random
 import string
 import sys
+import traceback
 import urllib.parse
 import urllib.request
 from collections import Counter
 from itertools import chain
-from typing import Any
+from typing import Any, Callable, NamedTuple, TypeVar
 
 import ModuleUpdate
 
@@ -23,6 +29,12 @@ from BaseClasses import seeddigits, get_seed, PlandoOptions
 from Utils import parse_yamls, version_tuple, __version__, tuplize_version
 
 
+parallel_threshold = 16
+"""number of player files or option rolls from which they are read or rolled in a process pool"""
+yaml_cache_size = 1000
+"""number of parsed player files kept in the cache, the least recently used ones are removed beyond that"""
+
+
 def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
     from settings import get_settings
     settings = get_settings()
@@ -122,26 +134,31 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     player_id: int = 1
     player_files: dict[int, str] = {}
     player_errors: list[str] = []
+    fnames: list[str] = []
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and not fname.lower().endswith(".ini") and \
                 os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
-            try:
-                weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
-                    if yaml is None:
-                        logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
-                    else:
-                        weights_for_file.append(yaml)
-                weights_cache[fname] = tuple(weights_for_file)
-
-            except Exception as e:
-                logging.exception(f"Exception reading weights in file {fname}")
-                player_errors.append(
-                    f"{len(player_errors) + 1}. "
-                    f"File {fname} is invalid. Please fix your yaml.\n{Utils.get_all_causes(e)}"
-                )
+            fnames.append(fname)
+
+    read_results = _map_parallel(read_weights_yamls_reporting,
+                                 [(os.path.join(args.player_files_path, fname),) for fname in fnames])
+    for fname, (yamls, error) in zip(fnames, read_results):
+        if error:
+            logging.error(f"Exception reading weights in file {fname}\n{error.trace}")
+            player_errors.append(
+                f"{len(player_errors) + 1}. "
+                f"File {fname} is invalid. Please fix your yaml.\n{error.causes}"
+            )
+            continue
+        weights_for_file = []
+        for doc_idx, yaml in enumerate(yamls):
+            if yaml is None:
+                logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
+            else:
+                weights_for_file.append(yaml)
+        weights_cache[fname] = tuple(weights_for_file)
+    _prune_yaml_cache(Utils.cache_path("yaml"))
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -205,29 +222,12 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                             else:
                                 yaml[category_name][key] = option
 
-    settings_cache: dict[str, tuple[argparse.Namespace, ...] | None] = {fname: None for fname in weights_cache}
-    if args.sameoptions:
-        for fname, yamls in weights_cache.items():
-            try:
-                settings_cache[fname] = tuple(roll_settings(yaml, args.plando) for yaml in yamls)
-            except Exception as e:
-                logging.exception(f"Exception reading settings in file {fname}")
-                player_errors.append(
-                    f"{len(player_errors) + 1}. "
-                    f"File {fname} is invalid. Please fix your yaml.\n{Utils.get_all_causes(e)}"
-                )
-        # Exit early here to avoid throwing the same errors again later
-        if player_errors:
-            errors = "\n\n".join(player_errors)
-            raise ValueError(f"Encountered {len(player_errors)} error(s) in player files. "
-                             f"See logs for full tracebacks.\n\n{errors}")
-
     player_path_cache: dict[int, str] = {}
     for player in range(1, args.multi + 1):
         player_path_cache[player] = player_files.get(player, args.weights_file_path)
-    name_counter: Counter[str] = Counter()
-    args.player_options = {}
 
+    # every (player, path, doc_index) to roll, each document of a file going to the next player
+    player_documents: list[tuple[int, str, int]] = []
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
@@ -235,15 +235,59 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
             player_errors.append(f'No weights specified for player {player}')
             player += 1
             continue
+        for doc_index in range(len(weights_cache[path])):
+            player_documents.append((player, path, doc_index))
+            # increment for each yaml document in the file
+            player += 1
 
-        for doc_index, yaml in enumerate(weights_cache[path]):
-            name = yaml.get("name")
-            try:
-                # Use the cached settings object if it exists, otherwise roll settings within the try-catch
-                # Invariant: settings_cache[path] and weights_cache[path] have the same length
-                cached = settings_cache[path]
-                settings_object: argparse.Namespace = (cached[doc_index] if cached else roll_settings(yaml, args.plando))
+    # roll every document with its own seed drawn in the sorted order above, so results don't depend on which process
+    # rolls them or in what order
+    random_state = random.getstate()
+    if args.sameoptions:
+        rolls = [(fname, doc_index) for fname, yamls in weights_cache.items() for doc_index in range(len(yamls))]
+    else:
+        rolls = [(path, doc_index) for _, path, doc_index in player_documents]
+    roll_results = []
+    resolved_options = get_resolved_options()
+    try:
+        for settings_object, error, new_options in _map_parallel(
+                roll_settings_reporting, [(weights_cache[path][doc_index], args.plando, random.getrandbits(64))
+                                          for path, doc_index in rolls]):
+            roll_results.append((settings_object, error))
+            resolved_options.merge(new_options)
+        resolved_options.save()
+    finally:
+        clear_resolved_options()
+    random.setstate(random_state)
+
+    if args.sameoptions:
+        settings_cache: dict[str, list[argparse.Namespace]] = {fname: [] for fname in weights_cache}
+        file_errors: dict[str, RollError] = {}
+        for (fname, doc_index), (settings_object, error) in zip(rolls, roll_results):
+            if error:
+                file_errors.setdefault(fname, error)
+            else:
+                settings_cache[fname].append(settings_object)
+        for fname, error in file_errors.items():
+            logging.error(f"Exception reading settings in file {fname}\n{error.trace}")
+            player_errors.append(
+                f"{len(player_errors) + 1}. "
+                f"File {fname} is invalid. Please fix your yaml.\n{error.causes}"
+            )
+        # Exit early here to avoid throwing the same errors again later
+        if player_errors:
+            errors = "\n\n".join(player_errors)
+            raise ValueError(f"Encountered {len(player_errors)} error(s) in player files. "
+                             f"See logs for full tracebacks.\n\n{errors}")
+        roll_results = [(settings_cache[path][doc_index], None) for _, path, doc_index in player_documents]
+
+    name_counter: Counter[str] = Counter()
+    args.player_options = {}
 
+    for (player, path, doc_index), (settings_object, error) in zip(player_documents, roll_results):
+        name = weights_cache[path][doc_index].get("name")
+        if not error:
+            try:
                 for k, v in vars(settings_object).items():
                     if v is not None:
                         try:
@@ -262,17 +306,16 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                         # use the filename
                         args.name[player] = os.path.splitext(os.path.split(path)[-1])[0]
                 args.name[player] = handle_name(args.name[player], player, name_counter)
-
             except Exception as e:
-                logging.exception(f"Exception reading settings in file {path} document #{doc_index + 1} "
-                                  f"(name: {args.name.get(player, name)})")
-                player_errors.append(
-                    f"{len(player_errors) + 1}. "
-                    f"File {path} document #{doc_index + 1} (name: {args.name.get(player, name)}) is invalid. "
-                    f"Please fix your yaml.\n{Utils.get_all_causes(e)}")
+                error = RollError.from_exception(e)
 
-            # increment for each yaml document in the file
-            player += 1
+        if error:
+            logging.error(f"Exception reading settings in file {path} document #{doc_index + 1} "
+                          f"(name: {args.name.get(player, name)})\n{error.trace}")
+            player_errors.append(
+                f"{len(player_errors) + 1}. "
+                f"File {path} document #{doc_index + 1} (name: {args.name.get(player, name)}) is invalid. "
+                f"Please fix your yaml.\n{error.causes}")
 
     if len(set(name.lower() for name in args.name.values())) != len(args.name):
         player_errors.append(
@@ -288,6 +331,229 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     return args, seed
 
 
+class RollError(NamedTuple):
+    """An exception while reading or rolling a player file, in a form that can be sent between processes."""
+    trace: str
+    causes: str
+
+    @classmethod
+    def from_exception(cls, ex: Exception) -> RollError:
+        return cls("".join(traceback.format_exception(type(ex), ex, ex.__traceback__)), Utils.get_all_causes(ex))
+
+
+T = TypeVar("T")
+
+
+def _map_parallel(function: Callable[..., T], jobs: list[tuple[Any, ...]]) -> list[T]:
+    """Call function with the arguments of each job, in a process pool if there are at least parallel_threshold jobs.
+    Results are in the order of jobs."""
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if len(jobs) < parallel_threshold or workers < 2:
+        return [function(*job) for job in jobs]
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(function, *job) for job in jobs]
+        results: list[T] = []
+        for job, future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # the job or its result could not be sent between processes, run it here instead
+                logging.debug(f"Running {function.__name__} in the main process: {e}")
+                results.append(function(*job))
+        return results
+
+
+def read_weights_yamls_reporting(path: str) -> tuple[tuple[Any, ...], RollError | None]:
+    """read_weights_yamls, returning the error instead of raising it."""
+    try:
+        return read_weights_yamls(path), None
+    except Exception as e:
+        return (), RollError.from_exception(e)
+
+
+ResolvedOptions = dict[str, dict[str, bytes]]
+"""pickled option objects by game and ResolvedOptionCache.get_key"""
+
+
+class ResolvedOptionCache:
+    """
+    Options resolved and verified from a yaml value without any randomness, kept on disk per game, so repeat
+    generations with the same player pool skip from_any and verify for them.
+    The entries of a game are dropped when the version or data package of the game changes, and each entry is keyed on
+    the source of its option class, so editing an option does not reuse options verified by its old code.
+    Entries are stored pickled, so every use gets its own copy of the option.
+    """
+    games: ResolvedOptions
+    new: ResolvedOptions
+    """entries added since the last take_new"""
+
+    def __init__(self) -> None:
+        self.games = {}
+        self.new = {}
+
+    @staticmethod
+    def get_key(option_key: str, option: type[Options.Option], value: Any, plando_options: PlandoOptions) -> str | None:
+        """None if the option can't be cached, as the source of its class is not available."""
+        source_hash = _get_option_source_hash(option)
+        if source_hash is None:
+            return None
+        return hashlib.sha256(repr((option_key, source_hash, value, int(plando_options))).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _get_path(game: str) -> str:
+        return Utils.cache_path("options", f"{hashlib.sha256(game.encode('utf-8')).hexdigest()}.pickle")
+
+    @staticmethod
+    def _get_version(game: str) -> tuple[str, str, str]:
+        from worlds import AutoWorldRegister, network_data_package
+        return (__version__, AutoWorldRegister.world_types[game].world_version.as_simple_string(),
+                network_data_package["games"][game]["checksum"])
+
+    def _load(self, game: str) -> dict[str, bytes]:
+        try:
+            with open(self._get_path(game), "rb") as f:
+                version, options = pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:  # damaged file, start over
+            logging.debug(f"Could not load resolved options of {game}: {e}")
+            return {}
+        return options if version == self._get_version(game) else {}
+
+    def _get_game(self, game: str) -> dict[str, bytes]:
+        if game not in self.games:
+            self.games[game] = self._load(game)
+        return self.games[game]
+
+    def get(self, game: str, key: str) -> Options.Option | None:
+        data = self._get_game(game).get(key)
+        return None if data is None else pickle.loads(data)
+
+    def add(self, game: str, key: str, option: Options.Option) -> None:
+        try:
+            data = pickle.dumps(option, pickle.HIGHEST_PROTOCOL)
+        except Exception:  # can't be stored, resolve it every time
+            return
+        self._get_game(game)[key] = data
+        self.new.setdefault(game, {})[key] = data
+
+    def take_new(self) -> ResolvedOptions:
+        new, self.new = self.new, {}
+        return new
+
+    def merge(self, new: ResolvedOptions) -> None:
+        """Add entries taken from the cache of another process."""
+        for game, options in new.items():
+            self._get_game(game).update(options)
+            self.new.setdefault(game, {}).update(options)
+
+    def save(self) -> None:
+        """Write new entries to disk, keeping the entries other runs stored meanwhile."""
+        for game, options in self.take_new().items():
+            path = self._get_path(game)
+            try:
+                Utils.write_file_atomic(path, pickle.dumps((self._get_version(game), {**self._load(game), **options}),
+                                                           pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                logging.debug(f"Could not store resolved options of {game}: {e}")
+
+
+@functools.cache
+def _get_option_source_hash(option: type[Options.Option]) -> str | None:
+    """Hash of the source of the option class and the option classes it derives from, None if it is not available."""
+    source_hash = hashlib.sha256()
+    for cls in option.__mro__:
+        if issubclass(cls, Options.Option):
+            try:
+                source_hash.update(inspect.getsource(cls).encode("utf-8"))
+            except (OSError, TypeError):
+                return None
+    return source_hash.hexdigest()
+
+
+_resolved_options: ResolvedOptionCache | None = None
+"""used by handle_option once get_resolved_options was called, which Generate.main does while rolling options"""
+
+
+def get_resolved_options() -> ResolvedOptionCache:
+    global _resolved_options
+    if _resolved_options is None:
+        _resolved_options = ResolvedOptionCache()
+    return _resolved_options
+
+
+def clear_resolved_options() -> None:
+    """Stop using the resolved options, so the next generation loads them again."""
+    global _resolved_options
+    _resolved_options = None
+
+
+class _WarningCounter(logging.Handler):
+    """Counts warnings logged while it is entered, which may name the player, so the result can't be reused."""
+    count: int
+
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+    def __enter__(self) -> _WarningCounter:
+        logging.getLogger().addHandler(self)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        logging.getLogger().removeHandler(self)
+
+
+def roll_settings_reporting(weights: dict, plando_options: PlandoOptions, roll_seed: int
+                            ) -> tuple[argparse.Namespace | None, RollError | None, ResolvedOptions]:
+    """roll_settings seeded with roll_seed, returning the error instead of raising it and the options newly added to
+    the resolved option cache."""
+    resolved_options = get_resolved_options()
+    random.seed(roll_seed)
+    try:
+        return roll_settings(weights, plando_options), None, resolved_options.take_new()
+    except Exception as e:
+        return None, RollError.from_exception(e), resolved_options.take_new()
+
+
+def _parse_yamls_cached(yaml: str) -> tuple[Any, ...]:
+    """parse_yamls, reusing the result of an earlier run for the same file content."""
+    content_hash = hashlib.sha256(f"{__version__}\n{yaml}".encode("utf-8")).hexdigest()
+    path = Utils.cache_path("yaml", f"{content_hash}.pickle")
+    try:
+        with open(path, "rb") as f:
+            result = Utils.restricted_loads(f.read())
+        os.utime(path)  # mark as recently used for _prune_yaml_cache
+        return result
+    except Exception:  # not cached yet or damaged, parse it again
+        pass
+    result = tuple(parse_yamls(yaml))
+    try:
+        Utils.write_file_atomic(path, Utils.restricted_dumps(result))
+    except Exception as e:
+        logging.debug(f"Could not cache parsed yaml {path}: {e}")
+    return result
+
+
+def _prune_yaml_cache(directory: str) -> None:
+    """Remove the least recently used parsed yamls beyond yaml_cache_size, once all yamls of a run were read."""
+    try:
+        entries = [(entry.stat().st_mtime, entry.path) for entry in os.scandir(directory)
+                   if entry.name.endswith(".pickle")]
+    except OSError as e:
+        logging.debug(f"Could not prune parsed yaml cache {directory}: {e}")
+        return
+    if len(entries) > yaml_cache_size:
+        entries.sort()
+        for _, path in entries[:len(entries) - yaml_cache_size]:
+            try:
+                os.remove(path)
+            except OSError:  # removed by another run or still in use
+                pass
+
+
 def read_weights_yamls(path) -> tuple[Any, ...]:
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
@@ -300,7 +566,7 @@ def read_weights_yamls(path) -> tuple[Any, ...]:
 
     from yaml.error import MarkedYAMLError
     try:
-        return tuple(parse_yamls(yaml))
+        return _parse_yamls_cached(yaml)
     except MarkedYAMLError as ex:
         if ex.problem_mark:
             lines = yaml.splitlines()
@@ -504,17 +770,33 @@ def handle_option(ret: argparse.Namespace, game_weights: dict, option_key: str,
     try:
         if option_key in game_weights:
             if not option.supports_weighting:
-                player_option = option.from_any(game_weights[option_key])
+                value = game_weights[option_key]
             else:
-                player_option = option.from_any(get_choice(option_key, game_weights))
+                value = get_choice(option_key, game_weights)
         else:
-            player_option = option.from_any(option.default)  # call the from_any here to support default "random"
+            value = option.default  # call the from_any here to support default "random"
+        resolved_options = _resolved_options
+        cache_key = None if resolved_options is None else \
+            resolved_options.get_key(option_key, option, value, plando_options)
+        if resolved_options is not None and cache_key is not None:
+            player_option = resolved_options.get(ret.game, cache_key)
+            if player_option is not None:  # already verified
+                setattr(ret, option_key, player_option)
+                return
+        random_state = random.getstate()
+        warnings = _WarningCounter()
+        with warnings:
+            player_option = option.from_any(value)
         setattr(ret, option_key, player_option)
     except Exception as e:
         raise Options.OptionError(f"Error generating option {option_key} in {ret.game}") from e
     else:
         from worlds import AutoWorldRegister
-        player_option.verify(AutoWorldRegister.world_types[ret.game], ret.name, plando_options)
+        with warnings:
+            player_option.verify(AutoWorldRegister.world_types[ret.game], ret.name, plando_options)
+        if resolved_options is not None and cache_key is not None and not warnings.count \
+                and random.getstate() == random_state:
+            resolved_options.add(ret.game, cache_key, player_option)
 
 
 def roll_settings(weights: dict, plando_options: PlandoOptions = PlandoOptions.bosses):
@@ -1,6 +1,7 @@
 import collections
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 import concurrent.futures
+import contextlib
 import logging
 import os
 import tempfile
@@ -23,6 +24,31 @@ from worlds.generic.Rules import exclusion_rules, locality_rules
 __all__ = ["main"]
 
 
+@contextlib.contextmanager
+def _create_archive(path: str) -> Iterator[zipfile.ZipFile]:
+    """Opens the final archive for writing, removing it again if output fails before it is complete."""
+    archive = zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+    try:
+        with archive:
+            yield archive
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def _add_to_archive(archive: zipfile.ZipFile, directory: str) -> None:
+    """
+    Adds the files in directory to the archive. Files that are zip archives themselves, such as patch containers,
+    are stored as they are, as compressing them again only costs time. Raises FileExistsError if another output
+    task already added a file of the same name.
+    """
+    for file in os.scandir(directory):
+        if file.name in archive.NameToInfo:
+            raise FileExistsError(f"Multiple output files are named {file.name}.")
+        compress_type = zipfile.ZIP_STORED if file.is_file() and zipfile.is_zipfile(file.path) else None
+        archive.write(file.path, arcname=file.name, compress_type=compress_type)
+
+
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
@@ -73,7 +99,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if not args.skip_output and not args.spoiler_only:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
+    world_processes = get_settings().generator.world_processes
+    AutoWorld.call_all_parallel(multiworld, "generate_early", world_processes)
 
     logger.info('')
 
@@ -109,13 +136,14 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.local_items.value = set()
 
     logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    AutoWorld.call_all_parallel(multiworld, "create_regions", world_processes)
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    AutoWorld.call_all_parallel(multiworld, "create_items", world_processes)
+    multiworld.build_state_indices()
 
     logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+    AutoWorld.call_all_parallel(multiworld, "set_rules", world_processes)
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -142,7 +170,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.plando_item_blocks = parse_planned_blocks(multiworld)
 
     AutoWorld.call_all(multiworld, "connect_entrances")
-    AutoWorld.call_all(multiworld, "generate_basic")
+    AutoWorld.call_all_parallel(multiworld, "generate_basic", world_processes)
 
     # remove starting inventory from pool items.
     # Because some worlds don't actually create items during create_items this has to be as late as possible.
@@ -203,7 +231,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        balance_multiworld_progression(multiworld, get_settings().generator.balancing_method)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -215,6 +243,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         return multiworld
 
     logger.info(f'Beginning output...')
+    # placement is final, from here on the logical spheres are only computed once and shared
+    multiworld.cache_spheres()
     outfilebase = 'AP_' + multiworld.seed_name
 
     if args.spoiler_only:
@@ -226,23 +256,37 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
+    zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+    logger.info(f"Creating final archive at {zipfilename}")
     output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
+    with output as temp_dir, _create_archive(zipfilename) as archive:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
+        # every output task gets its own directory, so its files can be archived as soon as it is done
+        output_directories = {player: tempfile.mkdtemp(dir=temp_dir) for player in output_players}
+        # forked before the thread pool is started
+        output_process_futures = AutoWorld.submit_output_parallel(multiworld, output_directories, world_processes)
         with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+            stage_directory = tempfile.mkdtemp(dir=temp_dir)
+            output_file_futures = {
+                pool.submit(AutoWorld.call_stage, multiworld, "generate_output", stage_directory): stage_directory
+            }
             for player in output_players:
-                # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                if player in output_process_futures:
+                    output_file_futures[output_process_futures[player]] = output_directories[player]
+                else:
+                    # skip starting a thread for methods that say "pass".
+                    output_file_futures[pool.submit(AutoWorld.call_single, multiworld, "generate_output", player,
+                                                    output_directories[player])] = output_directories[player]
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
             AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
 
+            multidata_directory = tempfile.mkdtemp(dir=temp_dir)
+
             def write_multidata():
                 import NetUtils
                 from NetUtils import HintStatus
@@ -261,6 +305,11 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                     games[slot] = multiworld.game[slot]
                     slot_info[slot] = NetUtils.NetworkSlot(names[0][slot - 1], multiworld.game[slot],
                                                            multiworld.player_types[slot])
+                multidata_format = get_settings().generator.multidata_format
+                if multidata_format >= 4:
+                    # format 4 can only be read by servers of this version or newer
+                    minimum_versions["server"] = max(minimum_versions["server"],
+                                                     (version_tuple.major, version_tuple.minor, version_tuple.build))
                 for slot, group in multiworld.groups.items():
                     games[slot] = multiworld.game[slot]
                     slot_info[slot] = NetUtils.NetworkSlot(group["name"], multiworld.game[slot], multiworld.player_types[slot],
@@ -350,13 +399,14 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
-
-                with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
+                with open(os.path.join(multidata_directory, f'{outfilebase}.archipelago'), 'wb') as f:
+                    if multidata_format >= 4:
+                        f.write(NetUtils.encode_multidata(multidata))
+                    else:
+                        f.write(bytes([3]))  # version of format
+                        f.write(zlib.compress(restricted_dumps(multidata), 9))
 
-            output_file_futures.append(pool.submit(write_multidata))
+            output_file_futures[pool.submit(write_multidata)] = multidata_directory
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
@@ -368,20 +418,16 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
+                _add_to_archive(archive, output_file_futures[future])
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
-
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
-        logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+            spoiler_directory = tempfile.mkdtemp(dir=temp_dir)
+            multiworld.spoiler.to_file(os.path.join(spoiler_directory, '%s_Spoiler.txt' % outfilebase))
+            _add_to_archive(archive, spoiler_directory)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
@@ -13,6 +13,7 @@ import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import shlex
@@ -43,7 +44,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+    SlotType, LocationStore, LazyMultiData, MultiData, Hint, HintStatus
 from BaseClasses import ItemClassification
 
 
@@ -139,6 +140,70 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+class SaveJournal:
+    """
+    Savegame file holding a snapshot of the save followed by records of the changes made since, so that saving only
+    writes what changed. Loading replays the records onto the snapshot, ignoring a last record cut short by a crash.
+    Once the records outgrow the snapshot, they get compacted into a new snapshot.
+    """
+    magic: typing.ClassVar[bytes] = b"APSJ"
+    path: str
+    snapshot_size: int
+    changes_size: int
+    started: bool
+    """whether the file holds a snapshot this journal wrote, that changes can be appended to"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.snapshot_size = 0
+        self.changes_size = 0
+        self.started = False
+
+    @property
+    def needs_snapshot(self) -> bool:
+        return not self.started or self.changes_size > self.snapshot_size
+
+    @staticmethod
+    def _encode(data: dict) -> bytes:
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        record = zlib.compress(pickle.dumps(data))
+        return len(record).to_bytes(4, "little") + record
+
+    def read(self) -> typing.Tuple[dict, typing.List[dict]]:
+        """Returns the snapshot and the changes recorded after it, oldest first."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data.startswith(self.magic):  # plain save, written before journaling
+            return restricted_loads(zlib.decompress(data)), []
+        records: typing.List[dict] = []
+        offset = len(self.magic)
+        while offset + 4 <= len(data):
+            end = offset + 4 + int.from_bytes(data[offset:offset + 4], "little")
+            if end > len(data):
+                break  # cut short while being written
+            records.append(restricted_loads(zlib.decompress(data[offset + 4:end])))
+            offset = end
+        # a new snapshot has to be written before appending, as there may be a partial record at the end
+        return records[0], records[1:]
+
+    def write_snapshot(self, savedata: dict) -> None:
+        record = self._encode(savedata)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.magic)
+            f.write(record)
+        os.replace(temp_path, self.path)
+        self.snapshot_size = len(record)
+        self.changes_size = 0
+        self.started = True
+
+    def append(self, changes: dict) -> None:
+        record = self._encode(changes)
+        with open(self.path, "ab") as f:
+            f.write(record)
+        self.changes_size += len(record)
+
+
 class Client(Endpoint):
     __slots__ = (
         "__weakref__",
@@ -212,6 +277,75 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class ClientRegistry:
+    """Authenticated clients indexed by team and the game, tags and slot that Bounce targets, kept up to date on
+    Connect, ConnectUpdate and disconnect, along with the stored data keys each client gets SetNotify replies for."""
+    by_game: typing.DefaultDict[typing.Tuple[int, str], typing.Set[Client]]
+    by_tag: typing.DefaultDict[typing.Tuple[int, str], typing.Set[Client]]
+    by_slot: typing.DefaultDict[team_slot, typing.Set[Client]]
+    notification_clients: typing.Dict[str, typing.MutableSet[Client]]
+    _indexed: typing.Dict[Client, typing.Tuple[int, int, str, typing.FrozenSet[str]]]
+    _notification_keys: typing.Dict[Client, typing.Set[str]]
+
+    def __init__(self, notification_clients: typing.Dict[str, typing.MutableSet[Client]]):
+        self.by_game = collections.defaultdict(set)
+        self.by_tag = collections.defaultdict(set)
+        self.by_slot = collections.defaultdict(set)
+        self.notification_clients = notification_clients
+        self._indexed = {}
+        self._notification_keys = {}
+
+    def add(self, client: Client, game: str):
+        """Index client by its current team, slot and tags, replacing what it was indexed by before."""
+        self._unindex(client)
+        tags = frozenset(client.tags)
+        self._indexed[client] = client.team, client.slot, game, tags
+        self.by_game[client.team, game].add(client)
+        self.by_slot[client.team, client.slot].add(client)
+        for tag in tags:
+            self.by_tag[client.team, tag].add(client)
+
+    def remove(self, client: Client):
+        """Forget client and release its SetNotify subscriptions."""
+        self._unindex(client)
+        for key in self._notification_keys.pop(client, ()):
+            clients = self.notification_clients.get(key)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self.notification_clients[key]
+
+    def _unindex(self, client: Client):
+        indexed = self._indexed.pop(client, None)
+        if indexed:
+            team, slot, game, tags = indexed
+            self._discard(self.by_game, (team, game), client)
+            self._discard(self.by_slot, (team, slot), client)
+            for tag in tags:
+                self._discard(self.by_tag, (team, tag), client)
+
+    @staticmethod
+    def _discard(index: typing.Dict[typing.Any, typing.Set[Client]], key: typing.Any, client: Client):
+        clients = index.get(key)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del index[key]
+
+    def add_notification(self, client: Client, key: str):
+        self.notification_clients.setdefault(key, weakref.WeakSet()).add(client)
+        self._notification_keys.setdefault(client, set()).add(key)
+
+    def get_bounce_targets(self, team: int, games: typing.Iterable[str], tags: typing.Iterable[str],
+                           slots: typing.Iterable[int]) -> typing.Set[Client]:
+        """Clients of team playing any of games, having any of tags or connected to any of slots."""
+        targets: typing.Set[Client] = set()
+        for index, keys in ((self.by_game, games), (self.by_tag, tags), (self.by_slot, slots)):
+            for key in keys:
+                targets.update(index.get((team, key), ()))
+        return targets
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -234,6 +368,9 @@ class Context:
     hints_used: typing.Dict[typing.Tuple[int, int], int]
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
+    journaled_save_keys: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "connect_names", "received_items", "location_checks", "hints", "stored_data")
+    """keys of get_save() that get_save_changes only includes the changed entries of, or nothing for connect_names"""
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
@@ -264,7 +401,9 @@ class Context:
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
+        self.lazy_multidata: typing.Optional[LazyMultiData] = None
         self.save_filename = None
+        self.save_journal: typing.Optional[SaveJournal] = None
         self.saving = False
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
@@ -284,6 +423,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # current version of each remembered hint by (team, finding_player, location), see index_hints
+        self.hints_by_location: typing.Dict[typing.Tuple[int, int, int], Hint] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -303,6 +444,19 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        # entries of journaled_save_keys changed since the last save, except received_items, which is only appended to
+        self.changed_save_entries: typing.DefaultDict[str, typing.Set[typing.Any]] = collections.defaultdict(set)
+        # the auto saver thread takes changed_save_entries while the event loop adds to it
+        self.changed_save_entries_lock = threading.Lock()
+        self.saved_received_items_counts: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+        # get_unjournaled_save() as of the last save, get_save_changes only includes the keys that changed since
+        self.saved_unjournaled_save: typing.Dict[str, typing.Any] = {}
+        # messages of location check bursts, sent together by send_queued, see queue_texts
+        self.queued_texts: typing.DefaultDict[int, typing.List[dict]] = collections.defaultdict(list)
+        self.queued_room_updates: typing.Dict[team_slot, dict] = {}
+        self.slots_with_new_items: typing.Set[team_slot] = set()
+        self.slots_with_changed_hints: typing.Set[team_slot] = set()
+        self.send_queued_handle: typing.Optional[asyncio.Handle] = None
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -312,6 +466,7 @@ class Context:
         self.random = random.Random()
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.client_registry = ClientRegistry(self.stored_data_notification_clients)
         self.read_data = {}
         self.spheres = []
 
@@ -446,9 +601,76 @@ class Context:
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
+    # Queued networking, coalescing what a burst of location checks sends until the event loop gets to send_queued
+    def queue_texts(self, team: int, msgs: typing.List[dict]):
+        """Queue PrintJSON messages for all clients of team."""
+        self.queued_texts[team].extend(msgs)
+        self.schedule_send_queued()
+
+    def queue_room_update(self, team: int, slot: int, update: dict):
+        """Queue RoomUpdate fields for the clients of team/slot, merged with the fields already queued for them."""
+        queued = self.queued_room_updates.setdefault((team, slot), {"cmd": "RoomUpdate"})
+        if "checked_locations" in update and "checked_locations" in queued:
+            checked_locations = set(queued["checked_locations"]) | set(update["checked_locations"])
+            update = {**update, "checked_locations": checked_locations}
+        queued.update(update)
+        self.schedule_send_queued()
+
+    def queue_new_items(self, team: int, slot: int):
+        """Queue sending the items team/slot received that its clients did not get yet."""
+        self.slots_with_new_items.add((team, slot))
+        self.schedule_send_queued()
+
+    def queue_changed_hints(self, team: int, slot: int):
+        """Queue notifying the clients watching the hints of team/slot, after the items and room updates queued."""
+        self.slots_with_changed_hints.add((team, slot))
+        self.schedule_send_queued()
+
+    def schedule_send_queued(self):
+        if self.send_queued_handle is None:
+            self.send_queued_handle = asyncio.get_running_loop().call_soon(self.send_queued)
+
+    def send_queued(self):
+        """Send everything queued, encoding each message once for all clients it goes to."""
+        self.send_queued_handle = None
+        queued_texts, self.queued_texts = self.queued_texts, collections.defaultdict(list)
+        for team, msgs in queued_texts.items():
+            for start in range(0, len(msgs), 140):
+                # split into chunks that are close to compression window of 64K but not too big on the wire
+                # (roughly 1300-2600 bytes after compression depending on repetitiveness)
+                self.broadcast_team(team, msgs[start:start + 140])
+
+        slots_with_new_items, self.slots_with_new_items = self.slots_with_new_items, set()
+        for team, slot in slots_with_new_items:
+            encoded: typing.Dict[typing.Tuple[int, bool, bool], str] = {}
+            for client in self.clients.get(team, {}).get(slot, ()):
+                if client.no_items:
+                    continue
+                start_inventory = get_start_inventory(self, slot, client.remote_start_inventory)
+                items = get_received_items(self, team, slot, client.remote_items)
+                if len(start_inventory) + len(items) > client.send_index:
+                    key = client.send_index, client.remote_items, client.remote_start_inventory
+                    if key not in encoded:
+                        first_new_item = max(0, client.send_index - len(start_inventory))
+                        encoded[key] = self.dumper([{
+                            "cmd": "ReceivedItems",
+                            "index": client.send_index,
+                            "items": start_inventory[client.send_index:] + items[first_new_item:]}])
+                    async_start(self.send_encoded_msgs(client, encoded[key]))
+                    client.send_index = len(start_inventory) + len(items)
+
+        queued_room_updates, self.queued_room_updates = self.queued_room_updates, {}
+        for (team, slot), update in queued_room_updates.items():
+            self.broadcast(self.clients[team][slot], [update])
+
+        slots_with_changed_hints, self.slots_with_changed_hints = self.slots_with_changed_hints, set()
+        for team, slot in slots_with_changed_hints:
+            self.on_changed_hints(team, slot)
+
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
+        self.client_registry.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
             self.clients[endpoint.team][endpoint.slot].remove(endpoint)
         await on_client_disconnected(self, endpoint)
@@ -478,17 +700,36 @@ class Context:
                 else:
                     raise Exception("No .archipelago found in archive.")
         else:
+            import mmap
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[0] == 4:
+                # format 4 sections are inflated on demand, straight from the mapped file,
+                # so the file stays mapped (and locked on Windows) until close_multidata
+                data = mapped
+            else:
+                with mapped:
+                    data = mapped[:]
 
-        self._load(self.decompress(data), {}, use_embedded_server_options)
+        decoded_obj = self.decompress(data)
+        if isinstance(decoded_obj, LazyMultiData):
+            self.lazy_multidata = decoded_obj
+        self._load(decoded_obj, {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
+    def close_multidata(self) -> None:
+        """Releases the loaded multidata file. Sections that were not inflated yet can not be read afterwards."""
+        if self.lazy_multidata:
+            self.lazy_multidata.close()
+            self.lazy_multidata = None
+
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > 4:
             raise Utils.VersionException("Incompatible multidata.")
+        if format_version == 4:
+            return LazyMultiData(data)
         return restricted_loads(zlib.decompress(data[1:]))
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
@@ -526,7 +767,7 @@ class Context:
             self.player_names[0, slot_id] = slot_info.name
             self.player_name_lookup[slot_info.name] = 0, slot_id
             self.read_data[f"hints_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
-                list(self.get_rechecked_hints(local_team, local_player))
+                list(self.hints[local_team, local_player])
             self.read_data[f"client_status_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
                 self.client_game_state[local_team, local_player]
 
@@ -535,8 +776,8 @@ class Context:
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -546,6 +787,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self.index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -558,9 +800,12 @@ class Context:
             self._set_options(server_options)
 
         # embedded data package
-        for game_name, data in decoded_obj.get("datapackage", {}).items():
+        embedded_data_packages = decoded_obj.get("datapackage", {})
+        for game_name in embedded_data_packages:
             if game_name in game_data_packages:
                 data = game_data_packages[game_name]
+            else:
+                data = embedded_data_packages[game_name]
             self.logger.info(f"Loading embedded data package for game {game_name}")
             self.gamespackage[game_name] = data
             self.item_name_groups[game_name] = data["item_name_groups"]
@@ -592,11 +837,13 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            if exit_save or self.save_journal.needs_snapshot:
+                self.reset_save_changes()
+                self.save_journal.write_snapshot(self.get_save())
+            else:
+                self.save_journal.append(self.get_save_changes())
         except Exception as e:
+            self.save_journal.started = False  # changes taken by a failed save are only in the next snapshot
             self.logger.exception(e)
             return False
         else:
@@ -606,14 +853,15 @@ class Context:
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            self.save_journal = SaveJournal(self.save_filename)
             try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                save_data, save_changes = self.save_journal.read()
+                for changes in save_changes:
+                    self.apply_save_changes(save_data, changes)
+                self.set_save(save_data)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -652,23 +900,30 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
-            "version": self.save_version,
             "connect_names": self.connect_names,
             "received_items": self.received_items,
-            "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
             "location_checks": dict(self.location_checks),
-            "name_aliases": self.name_aliases,
+            "stored_data": self.stored_data,
+            **self.get_unjournaled_save(),
+        }
+
+        return d
+
+    def get_unjournaled_save(self) -> dict:
+        """The keys of get_save() that are not journaled_save_keys, copied so that they can be compared to later ones."""
+        d = {
+            "version": self.save_version,
+            "hints_used": dict(self.hints_used),
+            "name_aliases": dict(self.name_aliases),
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
                 (key, value.timestamp()) for key, value in self.client_activity_timers.items()),
             "client_connection_timers": tuple(
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
-            "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
+            "group_collected": {group: set(players) for group, players in self.group_collected.items()},
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -680,6 +935,57 @@ class Context:
 
         return d
 
+    def reset_save_changes(self) -> None:
+        """Start tracking changes anew, for a save that is about to include everything."""
+        with self.changed_save_entries_lock:
+            self.changed_save_entries = collections.defaultdict(set)
+        self.saved_received_items_counts = {key: len(items) for key, items in self.received_items.items()}
+        self.saved_unjournaled_save = self.get_unjournaled_save()
+
+    def change_save_entries(self, key: str, *entries: typing.Any) -> None:
+        """Record entries of a journaled_save_key as changed, for the next get_save_changes.
+        Nothing is recorded without a save journal, as every save then includes everything."""
+        if self.save_journal is None:
+            return
+        with self.changed_save_entries_lock:
+            self.changed_save_entries[key].update(entries)
+
+    def get_save_changes(self) -> dict:
+        """
+        The parts of get_save() that changed since the last call or reset_save_changes, which apply_save_changes merges
+        into the save before them. For journaled_save_keys only changed entries are included.
+        """
+        with self.changed_save_entries_lock:
+            changed, self.changed_save_entries = self.changed_save_entries, collections.defaultdict(set)
+        unjournaled_save = self.get_unjournaled_save()
+        changes = {key: value for key, value in unjournaled_save.items()
+                   if key not in self.saved_unjournaled_save or self.saved_unjournaled_save[key] != value}
+        self.saved_unjournaled_save = unjournaled_save
+        received_items: typing.Dict[typing.Tuple[int, int, bool], typing.Tuple[int, typing.List[NetworkItem]]] = {}
+        for key, items in self.received_items.items():
+            saved_count = self.saved_received_items_counts.get(key, 0)
+            if len(items) > saved_count:
+                new_items = items[saved_count:]
+                received_items[key] = saved_count, new_items
+                self.saved_received_items_counts[key] = saved_count + len(new_items)
+        changes["received_items"] = received_items
+        for key, entries in (("location_checks", self.location_checks), ("hints", self.hints),
+                             ("stored_data", self.stored_data)):
+            changes[key] = {entry: entries[entry] for entry in changed[key] if entry in entries}
+        return changes
+
+    @staticmethod
+    def apply_save_changes(savedata: dict, changes: dict) -> None:
+        """Merges the result of get_save_changes into an earlier save. Applying the same changes again is harmless."""
+        for key, value in changes.items():
+            if key == "received_items":
+                for items_key, (start, items) in value.items():
+                    savedata[key].setdefault(items_key, [])[start:] = items
+            elif key in Context.journaled_save_keys:
+                savedata.setdefault(key, {}).update(value)
+            else:
+                savedata[key] = value
+
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
@@ -698,6 +1004,8 @@ class Context:
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
+        self.recheck_hints()  # older saves may hold hints that were found after they were last rechecked
+        self.index_hints()
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -729,6 +1037,27 @@ class Context:
             return max(1, int(self.hint_cost * 0.01 * len(self.locations[slot])))
         return 0
 
+    def index_hints(self) -> None:
+        """Rebuilds hints_by_location from hints, after hints were replaced as a whole."""
+        self.hints_by_location = {(team, hint.finding_player, hint.location): hint
+                                  for (team, slot), hints in self.hints.items() for hint in hints}
+
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int]) -> typing.Set[team_slot]:
+        """Updates the hints pointing at newly checked locations of team/slot.
+        Returns each (team, slot) pair that has at least one hint modified."""
+        changed: typing.Set[team_slot] = set()
+        for location in locations:
+            hint = self.hints_by_location.get((team, slot, location))
+            if hint is None:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                self.replace_hint(team, player, hint, new_hint)
+                changed.add((team, player))
+        return changed
+
     def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None,
                       changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
         """Refreshes the hints for the specified team/slot. Providing 'None' for either team or slot
@@ -746,6 +1075,8 @@ class Context:
                 new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                self.change_save_entries("hints", (hint_team, hint_slot))
+                self.hints_by_location[hint_team, new_hint.finding_player, new_hint.location] = new_hint
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
@@ -753,10 +1084,6 @@ class Context:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
 
-    def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
-        return self.hints[team, slot]
-
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
@@ -823,10 +1150,12 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.hints_by_location[team, hint.finding_player, hint.location] = hint
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
                         new_hint_events.add(player)
+                    self.change_save_entries("hints", *((team, player) for player in new_hint_events))
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
         for slot in new_hint_events:
@@ -841,15 +1170,14 @@ class Context:
                     async_start(self.send_msgs(client, client_hints))
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.hints_by_location.get((team, finding_player, seeked_location))
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.hints_by_location[team, new_hint.finding_player, new_hint.location] = new_hint
+            self.change_save_entries("hints", (team, slot))
     
     # "events"
 
@@ -872,13 +1200,13 @@ class Context:
 
     def on_changed_hints(self, team: int, slot: int):
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = set(self.stored_data_notification_clients.get(key, ()))
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = set(self.stored_data_notification_clients.get(key, ()))
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
@@ -1083,8 +1411,7 @@ def send_new_items(ctx: Context):
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
-    ctx.broadcast(ctx.clients[team][slot],
-                  [{"cmd": "RoomUpdate", "checked_locations": get_checked_checks(ctx, team, slot)}])
+    ctx.queue_room_update(team, slot, {"checked_locations": get_checked_checks(ctx, team, slot)})
 
 
 def release_player(ctx: Context, team: int, slot: int):
@@ -1127,6 +1454,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.queue_new_items(team, target)
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1153,27 +1481,19 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
                 team + 1, ctx.player_names[(team, slot)], ctx.item_names[ctx.slot_info[target_player].game][item_id],
                 ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
-            if len(info_texts) >= 140:
-                # split into chunks that are close to compression window of 64K but not too big on the wire
-                # (roughly 1300-2600 bytes after compression depending on repetitiveness)
-                ctx.broadcast_team(team, info_texts)
-                info_texts.clear()
             info_texts.append(json_format_send_event(new_item, target_player))
-        ctx.broadcast_team(team, info_texts)
+        ctx.queue_texts(team, info_texts)
         del info_texts
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
-        ctx.broadcast(ctx.clients[team][slot], [{
-            "cmd": "RoomUpdate",
+        ctx.change_save_entries("location_checks", (team, slot))
+        ctx.queue_room_update(team, slot, {
             "hint_points": get_slot_points(ctx, team, slot),
             "checked_locations": new_locations,  # send back new checks only
-        }])
-        updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
-        for hint_team, hint_slot in updated_slots:
-            ctx.on_changed_hints(hint_team, hint_slot)
+        })
+        for hint_team, hint_slot in ctx.recheck_location_hints(team, slot, new_locations):
+            ctx.queue_changed_hints(hint_team, hint_slot)
         ctx.save()
 
 
@@ -1683,9 +2003,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.hints[self.client.team, self.client.slot]
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1908,6 +2226,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.no_locations = bool(client.tags & _non_game_messages.keys())
             # set NoText for old PopTracker clients that predate the tag to save traffic
             client.no_text = "NoText" in client.tags or ("PopTracker" in client.tags and client.version < (0, 5, 1))
+            ctx.client_registry.add(client, ctx.games[slot])
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1983,6 +2302,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                     client.no_text = "NoText" in client.tags or (
                         "PopTracker" in client.tags and client.version < (0, 5, 1)
                     )
+                    ctx.client_registry.add(client, ctx.games[client.slot])
                     ctx.broadcast_text_all(
                         f"{ctx.get_aliased_name(client.team, client.slot)} (Team #{client.team + 1}) has changed tags "
                         f"from {old_tags} to {client.tags}.",
@@ -2142,13 +2462,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             tags = set(args.get("tags", []))
             slots = set(args.get("slots", []))
             args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
-
-            for bounceclient in ctx.endpoints:
-                if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
-                                                         set(bounceclient.tags) & tags or
-                                                         bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+            targets = ctx.client_registry.get_bounce_targets(client.team, games, tags, slots)
+            if targets:
+                await ctx.broadcast_send_encoded_msgs(targets, ctx.dumper([args]))
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -2178,7 +2494,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
+            ctx.change_save_entries("stored_data", args["key"])
+            targets = set(ctx.stored_data_notification_clients.get(args["key"], ()))
             if args.get("want_reply", False):
                 targets.add(client)
             if targets:
@@ -2191,7 +2508,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
             for key in args["keys"]:
-                ctx.stored_data_notification_clients[key].add(client)
+                ctx.client_registry.add_notification(client, key)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2733,6 +3050,7 @@ async def main(args: argparse.Namespace):
     console_task.cancel()
     if ctx.shutdown_task:
         await ctx.shutdown_task
+    ctx.close_multidata()
 
 
 client_message_processor = ClientMessageProcessor
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from collections.abc import Mapping, Sequence
+import array
+import mmap
+import sys
 import typing
 import enum
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, restricted_dumps, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -532,3 +536,208 @@ else:
             warnings.warn("_speedups not available. Falling back to pure python LocationStore. "
                           "Install a matching C++ compiler for your platform to compile _speedups.")
             LocationStore = _LocationStore
+
+
+multidata_sections: typing.Final = ("locations", "slot_data", "er_hint_data", "precollected_hints", "spheres",
+                                    "datapackage")
+"""multidata keys that get sections of their own in format version 4, all other keys share the "main" section"""
+
+
+def _pack_locations(locations: Mapping[int, Mapping[int, tuple[int, int, int]]]) -> bytes:
+    """Packs locations into the arrays LocationStore indexes them by: per sender, the entries sorted by location."""
+    senders = array.array("I", sorted(locations))
+    counts = array.array("I", (len(locations[sender]) for sender in senders))
+    location_ids, item_ids, receivers, flags = array.array("q"), array.array("q"), array.array("I"), array.array("I")
+    for sender in senders:
+        for location_id, (item_id, receiver, item_flags) in sorted(locations[sender].items()):
+            location_ids.append(location_id)
+            item_ids.append(item_id)
+            receivers.append(receiver)
+            flags.append(item_flags)
+    columns = (senders, counts, location_ids, item_ids, receivers, flags)
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+    return len(senders).to_bytes(4, "little") + b"".join(column.tobytes() for column in columns)
+
+
+def _unpack_locations(data: bytes) -> dict[int, dict[int, tuple[int, int, int]]]:
+    offset = 4
+
+    def read_column(type_code: str, count: int) -> array.array[int]:
+        nonlocal offset
+        column = array.array(type_code)
+        column.frombytes(data[offset:offset + count * column.itemsize])
+        if sys.byteorder != "little":
+            column.byteswap()
+        offset += count * column.itemsize
+        return column
+
+    sender_count = int.from_bytes(data[:4], "little")
+    senders = read_column("I", sender_count)
+    counts = read_column("I", sender_count)
+    total = sum(counts)
+    location_ids = read_column("q", total)
+    item_ids = read_column("q", total)
+    receivers = read_column("I", total)
+    flags = read_column("I", total)
+
+    locations: dict[int, dict[int, tuple[int, int, int]]] = {}
+    start = 0
+    for sender, count in zip(senders, counts):
+        end = start + count
+        locations[sender] = dict(zip(location_ids[start:end],
+                                     zip(item_ids[start:end], receivers[start:end], flags[start:end])))
+        start = end
+    return locations
+
+
+def encode_multidata(multidata: Mapping[str, typing.Any]) -> bytes:
+    """
+    Encodes multidata in format version 4: a section index followed by separately compressed sections, so that readers
+    only have to inflate what they use. Slot data gets a section per slot, data packages one per checksum and locations
+    are stored as packed arrays.
+    Servers and tools older than this format can not read it, so generation only writes it when the generator's
+    multidata_format setting asks for it.
+    """
+    sections: dict[str, bytes] = {
+        "main": restricted_dumps({key: multidata[key] for key in multidata if key not in multidata_sections})
+    }
+    if "locations" in multidata:
+        sections["locations"] = _pack_locations(multidata["locations"])
+    if "slot_data" in multidata:
+        sections["slot_data"] = restricted_dumps(list(multidata["slot_data"]))
+        for slot, slot_data in multidata["slot_data"].items():
+            sections[f"slot_data/{slot}"] = restricted_dumps(slot_data)
+    for key in ("er_hint_data", "precollected_hints", "spheres"):
+        if key in multidata:
+            sections[key] = restricted_dumps(multidata[key])
+    if "datapackage" in multidata:
+        package_sections: dict[str, str] = {}
+        for game, game_data in multidata["datapackage"].items():
+            name = f"datapackage/{game_data.get('checksum') or game}"
+            package_sections[game] = name
+            sections[name] = restricted_dumps(game_data)
+        sections["datapackage"] = restricted_dumps(package_sections)
+
+    index: dict[str, tuple[int, int]] = {}
+    compressed: list[bytes] = []
+    offset = 0
+    for name, section in sections.items():
+        section = zlib.compress(section, 9)
+        index[name] = offset, len(section)
+        offset += len(section)
+        compressed.append(section)
+    encoded_index = restricted_dumps(index)
+    return b"".join((bytes([4]), len(encoded_index).to_bytes(4, "little"), encoded_index, *compressed))
+
+
+_section_placeholder: typing.Final = object()
+
+
+class LazyMultiData(typing.MutableMapping[str, typing.Any]):
+    """
+    Multidata of format version 4, inflating each section the first time it is accessed.
+    data can be anything supporting the buffer protocol, like a memory mapped file.
+    Slot data and data packages are mappings that inflate each slot's or game's section on access.
+    """
+    _data: memoryview
+    _index: dict[str, tuple[int, int]]
+    _start: int
+    _values: dict[str, typing.Any]
+    _main_loaded: bool
+
+    def __init__(self, data: bytes | bytearray | memoryview | typing.Any) -> None:
+        self._data = memoryview(data)
+        if self._data[0] != 4:
+            raise ValueError(f"Expected multidata format version 4, got {self._data[0]}")
+        index_length = int.from_bytes(self._data[1:5], "little")
+        self._start = 5 + index_length
+        self._index = restricted_loads(self._data[5:self._start].tobytes())
+        self._values = {}
+        self._main_loaded = False
+
+    def close(self) -> None:
+        """Releases data, closing it if it is a memory mapped file. Sections not inflated yet can not be read after."""
+        data = self._data.obj
+        self._data.release()
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    def read_section(self, name: str) -> bytes:
+        offset, length = self._index[name]
+        return zlib.decompress(self._data[self._start + offset:self._start + offset + length])
+
+    def load_section(self, name: str) -> typing.Any:
+        return restricted_loads(self.read_section(name))
+
+    def _load_main(self) -> None:
+        if not self._main_loaded:
+            self._main_loaded = True
+            for key, value in self.load_section("main").items():
+                self._values.setdefault(key, value)
+            for key in multidata_sections:
+                if key in self._index:
+                    self._values.setdefault(key, _section_placeholder)
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key not in self._values:
+            self._load_main()
+        value = self._values[key]
+        if value is _section_placeholder:
+            if key == "locations":
+                value = _unpack_locations(self.read_section(key))
+            elif key == "slot_data":
+                value = _LazySections(self, {slot: f"slot_data/{slot}" for slot in self.load_section(key)})
+            elif key == "datapackage":
+                value = _LazySections(self, self.load_section(key))
+            else:
+                value = self.load_section(key)
+            self._values[key] = value
+        return value
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._load_main()
+        self._values[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self._load_main()
+        del self._values[key]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        self._load_main()
+        return iter(list(self._values))
+
+    def __len__(self) -> int:
+        self._load_main()
+        return len(self._values)
+
+
+class _LazySections(typing.MutableMapping[typing.Any, typing.Any]):
+    """Mapping of keys to sections of a LazyMultiData, inflating each section on first access."""
+
+    def __init__(self, multidata: LazyMultiData, sections: Mapping[typing.Any, str]) -> None:
+        self._multidata = multidata
+        self._sections: dict[typing.Any, str | None] = dict(sections)
+        self._values: dict[typing.Any, typing.Any] = {}
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        if key not in self._values:
+            section = self._sections[key]
+            assert section is not None
+            self._values[key] = self._multidata.load_section(section)
+        return self._values[key]
+
+    def __setitem__(self, key: typing.Any, value: typing.Any) -> None:
+        self._sections[key] = None
+        self._values[key] = value
+
+    def __delitem__(self, key: typing.Any) -> None:
+        del self._sections[key]
+        self._values.pop(key, None)
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(list(self._sections))
+
+    def __len__(self) -> int:
+        return len(self._sections)
@@ -15,6 +15,7 @@ import io
 import collections
 import importlib
 import logging
+import tempfile
 import warnings
 
 from argparse import Namespace
@@ -388,6 +389,26 @@ def store_data_package_for_checksum(game: str, data: typing.Dict[str, Any]) -> N
             logging.debug(f"Could not store data package: {e}")
 
 
+def write_file_atomic(path: str, data: bytes) -> None:
+    """
+    Write data to path through a temporary file in the same directory, creating the directory if needed.
+    Readers never see a partial file and concurrent writers don't share a temporary file; the last one to finish wins.
+    """
+    directory = os.path.dirname(path) or os.curdir
+    os.makedirs(directory, exist_ok=True)
+    f = tempfile.NamedTemporaryFile(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False)
+    try:
+        with f:
+            f.write(data)
+        os.replace(f.name, path)
+    except BaseException:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+        raise
+
+
 def read_apignore(filename: str | pathlib.Path) -> PathSpec | None:
     try:
         with open(filename) as ignore_file:
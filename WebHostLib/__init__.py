@@ -40,6 +40,11 @@ app.config["HOSTERS"] = 8  # maximum concurrent room hosters
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
+# local UDP port the web process uses to wake the Room launcher. Set to None to only poll the database.
+app.config["LAUNCHER_NOTIFY_PORT"] = 38280
+# seconds between hosted Rooms checking the database for commands they were not woken up for.
+# The Room launcher also wakes Rooms with pending commands whenever it polls the database.
+app.config["ROOM_COMMAND_POLL_INTERVAL"] = 60
 app.config["SELFGEN"] = True  # application process is in charge of scheduling Generations.
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
@@ -82,4 +82,7 @@ def wait_seed_api(seed: UUID):
         return {"text": "Generation not found"}, 404
     elif generation.state == STATE_ERROR:
         return {"text": "Generation failed"}, 500
+    progress = json.loads(generation.meta).get("progress")
+    if progress:
+        return {"text": f"Generation running: {progress}"}, 202
     return {"text": "Generation running"}, 202
@@ -224,7 +224,7 @@ def static_tracker_data(tracker: UUID) -> dict[str, Any]:
 
     return {
         "groups": groups,
-        "datapackage": tracker_data._multidata["datapackage"],
+        "datapackage": dict(tracker_data._multidata["datapackage"]),
         "player_locations_total": player_locations_total,
         "player_game": player_game,
     }
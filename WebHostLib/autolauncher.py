@@ -3,19 +3,32 @@ from __future__ import annotations
 import json
 import logging
 import multiprocessing
+import time
 import typing
 from datetime import timedelta, datetime
-from threading import Event, Thread
+from threading import Event, Thread, Timer
 from typing import Any
 from uuid import UUID
 
-from pony.orm import db_session, select, commit, PrimaryKey
+from pony.orm import db_session, select, commit
 
 from Utils import restricted_loads
 from .locker import Locker, AlreadyRunningException
+from .notifications import ROOM_COMMAND, NotificationListener
 
 _stop_event = Event()
 
+ROOM_POLL_INTERVAL = 10
+"""seconds between checking the database for Rooms to start, when notifications are received"""
+GENERATION_CHECK_INTERVAL = 1
+"""seconds between checking the database for cancelled Generations"""
+GENERATOR_MAX_JOBS = 10
+"""Generations a generator process runs before it is replaced by a fresh one"""
+PROGRESS_UPDATE_INTERVAL = 1
+"""minimum seconds between writing the progress of a Generation to the database"""
+GENERATION_ERROR_GRACE_PERIOD = 5
+"""seconds a generator process has to report a Generation it marked as errored as done before it counts as cancelled"""
+
 
 def stop() -> None:
     """Stops previously launched threads"""
@@ -36,39 +49,201 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def _mp_gen_game(
-    gen_options: dict,
-    meta: dict[str, Any] | None = None,
-    owner=None,
-    sid=None,
-    timeout: int|None = None,
-) -> PrimaryKey | None:
+class GenerationProgress(logging.Handler):
+    """
+    Writes the stages Main logs into the meta of the running Generation, for the wait page to show.
+    Stages logged less than PROGRESS_UPDATE_INTERVAL after the last write are held back, and the latest of them is
+    written once the interval expired.
+    """
+    sid: UUID | None
+    pending: tuple[UUID, str] | None
+    """the Generation and latest stage that were not written yet"""
+    timer: Timer | None
+
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.sid = None
+        self.next_update = 0.0
+        self.pending = None
+        self.timer = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.sid is None or record.module != "Main":
+            return
+        try:
+            stage = record.getMessage().strip().split("\n", 1)[0]
+            if not stage:
+                return
+            self.pending = self.sid, stage
+            delay = self.next_update - time.monotonic()
+            if delay <= 0:
+                self.flush()
+            elif self.timer is None:
+                self.timer = Timer(delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            self.timer = None
+            pending, self.pending = self.pending, None
+            if pending is None:
+                return
+            self.next_update = time.monotonic() + PROGRESS_UPDATE_INTERVAL
+            sid, stage = pending
+            with db_session:
+                generation = Generation.get(id=sid)
+                if generation is not None and generation.state == STATE_STARTED:
+                    meta = json.loads(generation.meta)
+                    meta["progress"] = stage
+                    generation.meta = json.dumps(meta)
+
+
+def _run_generator(config: dict[str, Any], connection: multiprocessing.connection.Connection) -> None:
+    """Generate the Generations received through connection, reporting back the id of each one finished."""
+    init_generator(config)
     from setproctitle import setproctitle
 
-    setproctitle(f"Generator ({sid})")
-    try:
-        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
-    finally:
-        setproctitle(f"Generator (idle)")
+    progress = GenerationProgress()
+    root_logger = logging.getLogger()
+    if not root_logger.handlers and logging.lastResort:
+        root_logger.addHandler(logging.lastResort)  # keep printing warnings, which adding a handler would stop
+    root_logger.addHandler(progress)
+    if root_logger.getEffectiveLevel() > logging.INFO:
+        root_logger.setLevel(logging.INFO)
 
+    for _ in range(GENERATOR_MAX_JOBS):
+        try:
+            gen_options, meta, owner, sid = connection.recv()
+        except EOFError:
+            return
+        setproctitle(f"Generator ({sid})")
+        progress.sid = sid
+        try:
+            # the time limit is enforced by killing this process, see GeneratorWorker
+            handle_generation_success(gen_game(gen_options, meta=meta, owner=owner, sid=sid))
+        except Exception as e:
+            handle_generation_failure(e)  # gen_game stored the error in the Generation
+        progress.sid = None
+        setproctitle("Generator (idle)")
+        connection.send(sid)
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
-    try:
+
+def _set_generation_error(sid: UUID, error: str) -> None:
+    with db_session:
+        generation = Generation.get(id=sid)
+        if generation is not None and generation.state == STATE_STARTED and not Seed.get(id=sid):
+            generation.state = STATE_ERROR
+            meta = json.loads(generation.meta)
+            meta["error"] = error
+            generation.meta = json.dumps(meta)
+
+
+class GeneratorWorker:
+    """
+    A generator process that runs one Generation at a time, limited in memory by init_generator and in time by
+    JOB_TIME. The process is replaced when it has to be stopped or after GENERATOR_MAX_JOBS Generations.
+    Deleting the running Generation or marking it as errored cancels it.
+    """
+    sid: UUID | None
+    """the Generation being run, None while idle"""
+    deadline: float | None
+    process: multiprocessing.Process
+    connection: multiprocessing.connection.Connection
+
+    def __init__(self, config: dict[str, Any], number: int) -> None:
+        self.config = config
+        self.number = number
+        self.sid = None
+        self.deadline = None
+        self.errored_at: float | None = None
+        self.jobs_started = 0
+        self._start_process()
+
+    def _start_process(self) -> None:
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_run_generator, args=(self.config, child_connection),
+                                               name=f"Generator-{self.number}", daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.jobs_started = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.sid is None
+
+    def start(self, generation: Generation, timeout: int | None) -> None:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
         logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(
-            _mp_gen_game,
-            (options,),
-            {
-                "meta": meta,
-                "sid": generation.id,
-                "owner": generation.owner,
-                "timeout": timeout,
-            },
-            handle_generation_success,
-            handle_generation_failure,
-        )
+        self.connection.send((options, meta, generation.owner, generation.id))
+        self.sid = generation.id
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.errored_at = None
+        self.jobs_started += 1
+
+    def check(self) -> None:
+        """Collect a finished Generation, stop one that ran out of time and replace the process if it ended."""
+        if self.sid is not None:
+            if self.connection.poll():
+                try:
+                    self.connection.recv()
+                except EOFError:
+                    pass  # process ended, handled below
+                else:
+                    self.sid = None
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                logging.info(f"Generation {self.sid} exceeded its time and was stopped")
+                self.stop("Allowed time for Generation exceeded, please consider generating locally instead.")
+                return
+        if not self.process.is_alive():
+            self.process.join()
+            if self.sid is not None:
+                # errors raised during generation are stored by gen_game, this covers the process being killed
+                _set_generation_error(self.sid, f"Generator process ended unexpectedly ({self.process.exitcode})")
+                self.sid = None
+            self._start_process()
+        elif self.sid is None and self.jobs_started >= GENERATOR_MAX_JOBS:
+            self.process.join()  # finishes on its own after its last job
+            self._start_process()
+
+    def cancelled(self) -> bool:
+        """
+        Whether the running Generation was deleted or marked as errored, requires a db_session.
+        gen_game marks a failed Generation as errored itself, right before the process reports it done, so an error
+        only counts as a cancellation if the process did not report the Generation done within
+        GENERATION_ERROR_GRACE_PERIOD.
+        """
+        if self.sid is None:
+            return False
+        generation = Generation.get(id=self.sid)
+        if generation is None:
+            return not Seed.get(id=self.sid)
+        if generation.state != STATE_ERROR or self.connection.poll():
+            return False
+        if self.errored_at is None:
+            self.errored_at = time.monotonic()
+        return time.monotonic() - self.errored_at >= GENERATION_ERROR_GRACE_PERIOD
+
+    def stop(self, error: str | None = None) -> None:
+        """Stop the running Generation, marking it as errored if error is given, and start a fresh process."""
+        self.kill()
+        if self.sid is not None and error:
+            _set_generation_error(self.sid, error)
+        self.sid = None
+        self._start_process()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+def launch_generator(worker: GeneratorWorker, generation: Generation, timeout: int | None) -> None:
+    try:
+        worker.start(generation, timeout)
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
@@ -80,7 +255,7 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
 def init_generator(config: dict[str, Any]) -> None:
     from setproctitle import setproctitle
 
-    setproctitle("Generator (idle)")
+    setproctitle("Generator (starting)")
 
     try:
         import resource
@@ -125,7 +300,29 @@ def autohost(config: dict):
                     hosters.append(hoster)
                     hoster.start()
 
-                while not stop_event.wait(0.1):
+                listener = NotificationListener.open(config["LAUNCHER_NOTIFY_PORT"])
+                poll_interval = 0.1 if listener is None else ROOM_POLL_INTERVAL
+                next_poll = time.monotonic() + 0.1
+                while not stop_event.is_set():
+                    if listener is None:
+                        stop_event.wait(max(0.0, next_poll - time.monotonic()))
+                    else:
+                        # wake up at least once a second to notice the stop event
+                        notification = listener.receive(min(1.0, max(0.0, next_poll - time.monotonic())))
+                        if notification:
+                            kind, room_id = notification
+                            hoster = hosters[room_id.int % len(hosters)]
+                            if kind == ROOM_COMMAND:
+                                hoster.notify_command(room_id)
+                            else:
+                                with db_session:
+                                    room = Room.get(id=room_id)
+                                    if room and room.last_activity >= \
+                                            datetime.utcnow() - timedelta(seconds=room.timeout + 5):
+                                        hoster.start_room(room_id)
+                    if time.monotonic() < next_poll:
+                        continue
+                    next_poll = time.monotonic() + poll_interval
                     with db_session:
                         rooms = select(
                             room for room in Room if
@@ -134,6 +331,11 @@ def autohost(config: dict):
                             # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
                             if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
                                 hosters[room.id.int % len(hosters)].start_room(room.id)
+                        # wake up hosted rooms for commands they were not notified about
+                        for room_id in set(select(command.room.id for command in Command)):
+                            hosters[room_id.int % len(hosters)].notify_command(room_id)
+                if listener:
+                    listener.close()
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -146,33 +348,49 @@ def autogen(config: dict):
         stop_event = _stop_event
         try:
             with Locker("autogen"):
-
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
-                    job_time = config["JOB_TIME"]
-                    with db_session:
-                        to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
-
-                        if to_start:
-                            logging.info("Resuming generation")
-                            for generation in to_start:
-                                sid = Seed.get(id=generation.id)
-                                if sid:
-                                    generation.delete()
-                                else:
-                                    launch_generator(generator_pool, generation, timeout=job_time)
-
-                            commit()
-                        select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
-
+                job_time = config["JOB_TIME"]
+                with db_session:
+                    to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
+
+                    if to_start:
+                        logging.info("Resuming generation")
+                        for generation in to_start:
+                            sid = Seed.get(id=generation.id)
+                            if sid:
+                                generation.delete()
+                            else:
+                                generation.state = STATE_QUEUED
+
+                        commit()
+                    select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
+
+                workers = [GeneratorWorker(config, number) for number in range(config["GENERATORS"])]
+                next_check = time.monotonic() + GENERATION_CHECK_INTERVAL
+                try:
                     while not stop_event.wait(0.1):
+                        for worker in workers:
+                            worker.check()
+                        if time.monotonic() >= next_check:
+                            next_check = time.monotonic() + GENERATION_CHECK_INTERVAL
+                            with db_session:
+                                for worker in workers:
+                                    if worker.cancelled():
+                                        logging.info(f"Generation {worker.sid} was cancelled")
+                                        worker.stop()
+                        idle_workers = [worker for worker in workers if worker.idle]
+                        if not idle_workers:
+                            continue  # queued Generations wait in the database until a generator is free
                         with db_session:
                             # for update locks the database row(s) during transaction, preventing writes from elsewhere
                             to_start = select(
                                 generation for generation in Generation
-                                if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation, timeout=job_time)
+                                if generation.state == STATE_QUEUED).for_update().limit(len(idle_workers))
+                            for worker, generation in zip(idle_workers, to_start):
+                                launch_generator(worker, generation, timeout=job_time)
+                finally:
+                    # unfinished Generations stay started and are resumed on the next start
+                    for worker in workers:
+                        worker.kill()
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -189,6 +407,8 @@ class MultiworldInstance():
         self.host = config["HOST_ADDRESS"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.rooms_with_commands = multiprocessing.Queue()
+        self.command_poll_interval = config["ROOM_COMMAND_POLL_INTERVAL"]
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -198,20 +418,30 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down,
+                                                self.rooms_with_commands, self.command_poll_interval),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def _collect_shut_down_rooms(self):
         while not self.rooms_shutting_down.empty():
             self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+
+    def start_room(self, room_id):
+        self._collect_shut_down_rooms()
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
             self.room_ids.add(room_id)
             self.rooms_to_start.put(room_id)
 
+    def notify_command(self, room_id):
+        """Wake up a hosted room to process its new commands. Rooms that are not hosted process them when they start."""
+        self._collect_shut_down_rooms()
+        if room_id in self.room_ids:
+            self.rooms_with_commands.put(room_id)
+
     def stop(self):
         if self.process:
             self.process.terminate()
@@ -225,6 +455,6 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .models import Command, Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
 from .customserver import run_server_process, get_static_server_data
 from .generate import gen_game
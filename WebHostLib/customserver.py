@@ -13,6 +13,7 @@ import threading
 import time
 import typing
 import sys
+import weakref
 
 import websockets
 from pony.orm import commit, db_session, select
@@ -24,8 +25,9 @@ from MultiServer import (
     server_per_message_deflate_factory,
 )
 from Utils import restricted_loads, cache_argsless
+from .data_packages import get_data_package
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, Room, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -60,10 +62,29 @@ class DBCommandProcessor(ServerCommandProcessor):
         self.ctx.logger.info(text)
 
 
+class _SharedGameTables:
+    """Name tables built from one version of a game's data package, shared by the rooms of a process hosting it."""
+    __slots__ = ("item_names", "location_names", "item_and_group_names", "location_and_group_names", "__weakref__")
+
+    def __init__(self, item_names, location_names, item_and_group_names, location_and_group_names):
+        self.item_names = item_names
+        self.location_names = location_names
+        self.item_and_group_names = item_and_group_names
+        self.location_and_group_names = location_and_group_names
+
+
+# keyed by game and Archipelago checksum, as Archipelago's names are merged into every game's tables
+_shared_game_tables: weakref.WeakValueDictionary[typing.Tuple[str, str], _SharedGameTables] = \
+    weakref.WeakValueDictionary()
+
+
 class WebHostContext(Context):
     room_id: int
+    command_poll_interval: float
+    """seconds between checking the DB for commands without being woken up"""
+    commands_pending: asyncio.Event
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
+    def __init__(self, static_server_data: dict, logger: logging.Logger, command_poll_interval: float = 60):
         # static server data is used during _load_game_data to load required data,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
@@ -72,6 +93,8 @@ class WebHostContext(Context):
                                              "enabled", 0, 2, logger=logger)
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
+        self.command_poll_interval = command_poll_interval
+        self.commands_pending = asyncio.Event()
         self.video = {}
         self.tags = ["AP", "WebHost"]
 
@@ -89,15 +112,49 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
+    def _init_game_data(self):
+        # Only build the tables of games no other room in this process is using the same data package of.
+        # Unknown ids get added to the shared tables on lookup, which is fine as every room names them the same.
+        gamespackage = self.gamespackage
+        archipelago_checksum = gamespackage.get("Archipelago", {}).get("checksum")
+        shared: typing.Dict[str, _SharedGameTables] = {}
+        if archipelago_checksum:
+            for game_name, game_package in gamespackage.items():
+                if game_name != "Archipelago" and "checksum" in game_package:
+                    tables = _shared_game_tables.get((game_package["checksum"], archipelago_checksum))
+                    if tables:
+                        shared[game_name] = tables
+        self.gamespackage = {game_name: game_package for game_name, game_package in gamespackage.items()
+                             if game_name not in shared}
+        super()._init_game_data()
+        self.gamespackage = gamespackage
+
+        self.shared_game_tables = list(shared.values())  # keeps them alive for as long as this room is
+        for game_name, tables in shared.items():
+            self.checksums[game_name] = gamespackage[game_name]["checksum"]
+            self.item_names[game_name] = tables.item_names
+            self.location_names[game_name] = tables.location_names
+            self.all_item_and_group_names[game_name] = tables.item_and_group_names
+            self.all_location_and_group_names[game_name] = tables.location_and_group_names
+        if archipelago_checksum:
+            for game_name, game_package in gamespackage.items():
+                if game_name != "Archipelago" and game_name not in shared and "checksum" in game_package:
+                    tables = _SharedGameTables(self.item_names[game_name], self.location_names[game_name],
+                                               self.all_item_and_group_names[game_name],
+                                               self.all_location_and_group_names[game_name])
+                    _shared_game_tables[game_package["checksum"], archipelago_checksum] = tables
+                    self.shared_game_tables.append(tables)
+
     async def listen_to_db_commands(self):
         cmdprocessor = DBCommandProcessor(self)
 
         while not self.exit_event.is_set():
+            self.commands_pending.clear()
             await self.main_loop.run_in_executor(None, self._process_db_commands, cmdprocessor)
-            try:
-                await asyncio.wait_for(self.exit_event.wait(), 5)
-            except asyncio.TimeoutError:
-                pass
+            waiters = {asyncio.create_task(self.exit_event.wait()), asyncio.create_task(self.commands_pending.wait())}
+            await asyncio.wait(waiters, timeout=self.command_poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
 
     def _process_db_commands(self, cmdprocessor):
         with db_session:
@@ -136,9 +193,10 @@ class WebHostContext(Context):
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = restricted_loads(row.data)
+                    package = get_data_package(game_data["checksum"])
+                    if package:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+                        # shallow copy, as _load removes the name groups from it
+                        game_data_packages[game] = dict(package)
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
@@ -170,13 +228,14 @@ class WebHostContext(Context):
         room = Room.get(id=self.room_id)
         # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
         room.multisave = pickle.dumps(self.get_save())
+        room.save_version += 1
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
         return True
 
-    def get_save(self) -> dict:
-        d = super(WebHostContext, self).get_save()
+    def get_unjournaled_save(self) -> dict:
+        d = super(WebHostContext, self).get_unjournaled_save()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
         return d
 
@@ -247,7 +306,9 @@ def tear_down_logging(room_id):
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       rooms_with_commands: typing.Optional[multiprocessing.Queue] = None,
+                       command_poll_interval: float = 60):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -291,12 +352,14 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    hosted_rooms: typing.Dict[typing.Any, WebHostContext] = {}
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
+                ctx = WebHostContext(static_server_data, logger, command_poll_interval)
+                hosted_rooms[room_id] = ctx
                 ctx.load(room_id)
                 ctx.init_save()
                 assert ctx.server is None
@@ -373,9 +436,19 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     tear_down_logging(room_id)
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
+                    hosted_rooms.pop(room_id, None)
                     await asyncio.sleep(5)
                     rooms_shutting_down.put(room_id)
 
+    def wake_room(room_id):
+        ctx = hosted_rooms.get(room_id)
+        if ctx:
+            ctx.commands_pending.set()
+
+    def listen_for_commands():
+        while 1:
+            loop.call_soon_threadsafe(wake_room, rooms_with_commands.get(block=True, timeout=None))
+
     class Starter(threading.Thread):
         _tasks: typing.List[asyncio.Future]
 
@@ -400,6 +473,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    if rooms_with_commands is not None:
+        threading.Thread(target=listen_for_commands, name="CommandListener", daemon=True).start()
     try:
         loop.run_forever()
     finally:
@@ -0,0 +1,94 @@
+"""
+Read-only store of game data packages by checksum, shared by room hosters and tracker requests.
+
+A package is written once to a file named after its checksum and memory mapped whenever a process loads it, so only the
+first process to need a checksum reads it from the database. Each process keeps the packages it used most recently, so
+rooms and requests using a checksum share one copy. Returned objects are shared and must not be modified.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import mmap
+import string
+import typing
+
+from pony.orm import db_session
+
+from NetUtils import GamesPackage
+from Utils import cache_path, restricted_loads, write_file_atomic
+from .models import GameDataPackage
+
+_checksum_characters: typing.Final = frozenset(string.ascii_letters + string.digits)
+
+
+def _get_store_path(checksum: str) -> str | None:
+    """File of the checksum in the store, None if the checksum can not be used as a file name."""
+    if not checksum or not _checksum_characters.issuperset(checksum):
+        return None
+    return cache_path("datapackages", f"{checksum}.pickle")
+
+
+def _read_stored(path: str) -> GamesPackage | None:
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return restricted_loads(data)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # damaged file, replace it from the database
+        logging.warning(f"Could not load stored data package {path}: {e}")
+        return None
+
+
+def _store(path: str, data: bytes) -> None:
+    try:
+        write_file_atomic(path, data)
+    except OSError as e:
+        logging.warning(f"Could not store data package {path}: {e}")
+
+
+@functools.lru_cache(maxsize=32)
+def _load_data_package(checksum: str) -> GamesPackage:
+    """Raises KeyError for unknown checksums, so they are not cached and can be found once they are uploaded."""
+    path = _get_store_path(checksum)
+    if path:
+        package = _read_stored(path)
+        if package is not None:
+            return package
+    with db_session:
+        row = GameDataPackage.get(checksum=checksum)
+        data = row.data if row else None
+    if data is None:
+        raise KeyError(checksum)
+    if path:
+        _store(path, data)
+    return restricted_loads(data)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_id_to_name(checksum: str) -> tuple[dict[int, str], dict[int, str]]:
+    package = _load_data_package(checksum)
+    return ({item_id: name for name, item_id in package["item_name_to_id"].items()},
+            {location_id: name for name, location_id in package["location_name_to_id"].items()})
+
+
+def get_data_package(checksum: str) -> GamesPackage | None:
+    """The data package with checksum, None if it is not known."""
+    try:
+        return _load_data_package(checksum)
+    except KeyError:
+        return None
+
+
+def get_id_to_name(checksum: str) -> tuple[dict[int, str], dict[int, str]] | None:
+    """Item and location id to name tables of the data package with checksum, None if it is not known."""
+    try:
+        return _load_id_to_name(checksum)
+    except KeyError:
+        return None
+
+
+def cache_clear() -> None:
+    """Forget the packages and tables loaded by this process."""
+    _load_data_package.cache_clear()
+    _load_id_to_name.cache_clear()
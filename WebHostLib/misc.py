@@ -13,6 +13,7 @@ from worlds.AutoWorld import AutoWorldRegister, World
 from . import app, cache
 from .markdown import render_markdown
 from .models import Seed, Room, Command, UUID, uuid4
+from .notifications import ROOM_ACTIVE, ROOM_COMMAND, notify
 from Utils import title_sorted
 
 class WebWorldTheme(StrEnum):
@@ -175,6 +176,7 @@ def new_room(seed: UUID):
         abort(404)
     room = Room(seed=seed, owner=session["_id"], tracker=uuid4())
     commit()
+    notify(app.config["LAUNCHER_NOTIFY_PORT"], ROOM_ACTIVE, room.id)
     return redirect(url_for("host_room", room=room.id))
 
 
@@ -224,6 +226,7 @@ def host_room_command(room: UUID):
         if cmd:
             Command(room=room, commandtext=cmd)
             commit()
+            notify(app.config["LAUNCHER_NOTIFY_PORT"], ROOM_COMMAND, room.id)
     return redirect(url_for("host_room", room=room.id))
 
 
@@ -242,6 +245,8 @@ def host_room(room: UUID):
         # we only set last_activity if needed, otherwise parallel access on /room will cause an internal server error
         # due to "pony.orm.core.OptimisticCheckError: Object Room was updated outside of current transaction"
         room.last_activity = now  # will trigger a spinup, if it's not already running
+        commit()  # the launcher has to see the new activity when it gets notified
+        notify(app.config["LAUNCHER_NOTIFY_PORT"], ROOM_ACTIVE, room.id)
 
     browser_tokens = "Mozilla", "Chrome", "Safari"
     automated = ("update" in request.args
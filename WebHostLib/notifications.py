@@ -0,0 +1,80 @@
+"""
+Wake-ups sent from the web process to the room launcher over a local UDP socket, so that rooms start and room commands
+run without the launcher and every room having to poll the DB for them. Notifications are best effort: the launcher and
+rooms still poll the DB, just rarely, to pick up anything sent while nobody was listening.
+"""
+from __future__ import annotations
+
+import logging
+import socket
+import typing
+from uuid import UUID
+
+from Utils import cache_argsless
+
+ROOM_ACTIVE: typing.Final = b"A"
+"""a room was created or visited and should be running"""
+ROOM_COMMAND: typing.Final = b"C"
+"""a command for a room was added to the DB"""
+
+_kinds: typing.Final = (ROOM_ACTIVE, ROOM_COMMAND)
+_host: typing.Final = "127.0.0.1"
+_message_length: typing.Final = 17  # kind + room UUID
+
+
+@cache_argsless
+def _get_send_socket() -> socket.socket:
+    return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+
+def notify(port: int | None, kind: bytes, room_id: UUID) -> None:
+    """Tell the launcher listening on port about a room. Does nothing if port is None."""
+    if port is None:
+        return
+    try:
+        _get_send_socket().sendto(kind + room_id.bytes, (_host, port))
+    except OSError as e:
+        logging.debug(f"Could not notify room launcher: {e}")
+
+
+class NotificationListener:
+    """Receiving end of notify, owned by the room launcher."""
+    _socket: socket.socket
+
+    def __init__(self, port: int) -> None:
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self._socket.bind((_host, port))
+        except OSError:
+            self._socket.close()
+            raise
+
+    @classmethod
+    def open(cls, port: int | None) -> NotificationListener | None:
+        """Listen on port, or return None if notifications are disabled or the port is not available."""
+        if port is None:
+            return None
+        try:
+            return cls(port)
+        except OSError as e:
+            logging.warning(f"Could not listen for room notifications on port {port}, falling back to polling: {e}")
+            return None
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def receive(self, timeout: float) -> tuple[bytes, UUID] | None:
+        """Wait up to timeout seconds for a notification, returning its kind and room id."""
+        self._socket.settimeout(timeout)
+        try:
+            data = self._socket.recv(_message_length)
+        except (socket.timeout, BlockingIOError):
+            return None
+        kind = data[:1]
+        if len(data) != _message_length or kind not in _kinds:
+            return None
+        return kind, UUID(bytes=data[1:])
+
+    def close(self) -> None:
+        self._socket.close()
@@ -1,7 +1,8 @@
 import datetime
 import collections
+import threading
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
@@ -12,10 +13,19 @@ from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .data_packages import get_data_package, get_id_to_name
+from .models import Room
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Decoded multidata of the most recently tracked seeds and tracker models of the most recently tracked rooms kept in
+# memory.
+TRACKER_SEED_CACHE_SIZE = 32
+TRACKER_ROOM_CACHE_SIZE = 128
+
+_seed_multidata: "collections.OrderedDict[UUID, Tuple[None, Dict[str, Any]]]" = collections.OrderedDict()
+_room_models: "collections.OrderedDict[UUID, Tuple[int, _RoomModel]]" = collections.OrderedDict()
+_decoded_lock = threading.Lock()
 
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
@@ -24,61 +34,144 @@ TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
 
 
-def _cache_results(func: Callable) -> Callable:
-    """Stores the results of any computationally expensive methods after the initial call in TrackerData.
-    If called again, returns the cached result instead, as results will not change for the lifetime of TrackerData.
-    """
+class _NameLookup(Mapping[int, str]):
+    """Read-only view of an id to name table shared between requests, naming ids missing from it instead of raising."""
+
+    def __init__(self, names: Dict[int, str], unknown: str) -> None:
+        self._names = names
+        self._unknown = unknown
+
+    def __getitem__(self, code: int) -> str:
+        name = self._names.get(code)
+        return self._unknown.format(code) if name is None else name
+
+    def get(self, code: int, default: Any = None) -> Any:
+        return self._names.get(code, default)
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._names
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def _get_decoded(decoded: collections.OrderedDict, key: UUID, version: Any, decode: Callable[[], Any],
+                 max_size: int) -> Any:
+    """Returns what is kept for key if it is of version, otherwise decodes and keeps it, dropping the least recently
+    used entries above max_size. Kept values are shared between requests and must not be modified."""
+    with _decoded_lock:
+        entry = decoded.get(key)
+        if entry is not None and entry[0] == version:
+            decoded.move_to_end(key)
+            return entry[1]
+    value = decode()
+    with _decoded_lock:
+        decoded[key] = version, value
+        decoded.move_to_end(key)
+        while len(decoded) > max_size:
+            decoded.popitem(last=False)
+    return value
+
+
+class _RoomModel:
+    """The decoded multidata and multisave of a room and the lookup tables and results trackers derive from them.
+    Kept for as long as the room's save_version does not change and shared between requests, so nothing in it may be
+    modified."""
+
+    def __init__(self, room: Room) -> None:
+        self.multidata: Dict[str, Any] = _get_decoded(_seed_multidata, room.seed.id, None,
+                                                      lambda: Context.decompress(room.seed.multidata),
+                                                      TRACKER_SEED_CACHE_SIZE)
+        self.multisave: Dict[str, Any] = restricted_loads(room.multisave) if room.multisave else {}
+        self.results: Dict[str, Any] = {}
+
+        self.item_name_to_id: Dict[str, Dict[str, int]] = {}
+        self.location_name_to_id: Dict[str, Dict[str, int]] = {}
+
+        # Generate inverse lookup tables from data package, useful for trackers.
+        self.item_id_to_name: Dict[str, Mapping[int, str]] = KeyedDefaultDict(lambda game_name: {
+            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
+        })
+        self.location_id_to_name: Dict[str, Mapping[int, str]] = KeyedDefaultDict(lambda game_name: {
+            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
+        })
+        for game, game_package in self.multidata["datapackage"].items():
+            # the packages and tables are shared with other requests, so they are not copied or modified here
+            checksum = game_package["checksum"]
+            game_package = get_data_package(checksum)
+            id_to_name = get_id_to_name(checksum)
+            if game_package is None or id_to_name is None:  # unknown checksum, ids are shown as unknown names
+                game_package = {"item_name_to_id": {}, "location_name_to_id": {}}
+                id_to_name = {}, {}
+            item_id_to_name, location_id_to_name = id_to_name
+            self.item_id_to_name[game] = _NameLookup(item_id_to_name, "Unknown Item (ID: {})")
+            self.location_id_to_name[game] = _NameLookup(location_id_to_name, "Unknown Location (ID: {})")
+
+            # Normal lookup tables as well.
+            self.item_name_to_id[game] = game_package["item_name_to_id"]
+            self.location_name_to_id[game] = game_package["location_name_to_id"]
+
+
+def _cache_in(cache_name: str, func: Callable) -> Callable:
     def method_wrapper(self: "TrackerData", *args):
+        cache = getattr(self, cache_name)
         cache_key = f"{func.__name__}{''.join(f'_[{arg.__repr__()}]' for arg in args)}"
-        if cache_key in self._tracker_cache:
-            return self._tracker_cache[cache_key]
+        if cache_key in cache:
+            return cache[cache_key]
 
         result = func(self, *args)
-        self._tracker_cache[cache_key] = result
+        cache[cache_key] = result
         return result
 
     return method_wrapper
 
 
+def _cache_results(func: Callable) -> Callable:
+    """Stores the results of any computationally expensive methods after the initial call in TrackerData.
+    If called again, returns the cached result instead, as results only change when the room saves. Results are shared
+    by every TrackerData of the same save and must not be modified.
+    """
+    return _cache_in("_tracker_cache", func)
+
+
+def _cache_request_results(func: Callable) -> Callable:
+    """Like _cache_results, for methods whose results also depend on the time of the request."""
+    return _cache_in("_request_cache", func)
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
-    subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    subsequent helper method calls do not need to recompute results. The decoded data, lookup tables and cached results
+    are kept per room and shared with later requests until the room saves again.
     """
     room: Room
     _multidata: Dict[str, Any]
     _multisave: Dict[str, Any]
     _tracker_cache: Dict[str, Any]
+    _request_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
-        self._tracker_cache = {}
-
-        self.item_name_to_id: Dict[str, Dict[str, int]] = {}
-        self.location_name_to_id: Dict[str, Dict[str, int]] = {}
-
-        # Generate inverse lookup tables from data package, useful for trackers.
-        self.item_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
-        })
-        self.location_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
-        })
-        for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
-
-            # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+        # A seed's multidata never changes and a room's multisave only when it saves, which increments save_version,
+        # so the room's model is only built again when that happens.
+        model: _RoomModel = _get_decoded(_room_models, room.id, room.save_version,
+                                         lambda: _RoomModel(room), TRACKER_ROOM_CACHE_SIZE)
+        self._multidata = model.multidata
+        self._multisave = model.multisave
+        self._tracker_cache = model.results
+        self._request_cache = {}
+
+        self.item_name_to_id = model.item_name_to_id
+        self.location_name_to_id = model.location_name_to_id
+        self.item_id_to_name = model.item_id_to_name
+        self.location_id_to_name = model.location_id_to_name
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -139,7 +232,7 @@ class TrackerData:
         """Retrieves a set of all hints relevant for a particular player."""
         return self._multisave.get("hints", {}).get((team, player), set())
 
-    @_cache_results
+    @_cache_request_results
     def get_player_last_activity(self, team: int, player: int) -> Optional[datetime.timedelta]:
         """Retrieves the relative timedelta for when a particular player was last active.
         Returns None if no activity was ever recorded.
@@ -267,7 +360,7 @@ class TrackerData:
 
         return long_player_names
 
-    @_cache_results
+    @_cache_request_results
     def get_room_last_activity(self) -> Dict[TeamPlayer, datetime.timedelta]:
         """Retrieves a dictionary of all players and the timedelta from now to their last activity.
         Does not include players who have no activity recorded.
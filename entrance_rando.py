@@ -2,8 +2,7 @@ import itertools
 import logging
 import random
 import time
-from collections import deque
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator
 
 from BaseClasses import CollectionState, Entrance, Region, EntranceType
 from Options import Accessibility
@@ -16,7 +15,8 @@ class EntranceRandomizationError(RuntimeError):
 
 class EntranceLookup:
     class GroupLookup:
-        _lookup: dict[int, list[Entrance]]
+        _lookup: dict[int, dict[Entrance, None]]
+        """the entrances of each group, kept in insertion order so removal is O(1) and iteration is deterministic"""
 
         def __init__(self):
             self._lookup = {}
@@ -28,29 +28,44 @@ class EntranceLookup:
             return bool(self._lookup)
 
         def __getitem__(self, item: int) -> list[Entrance]:
-            return self._lookup.get(item, [])
+            return list(self._lookup.get(item, ()))
 
         def __iter__(self):
             return itertools.chain.from_iterable(self._lookup.values())
 
         def __repr__(self):
-            return str(self._lookup)
+            return str({group: list(entrances) for group, entrances in self._lookup.items()})
 
         def add(self, entrance: Entrance) -> None:
-            self._lookup.setdefault(entrance.randomization_group, []).append(entrance)
+            self._lookup.setdefault(entrance.randomization_group, {})[entrance] = None
 
         def remove(self, entrance: Entrance) -> None:
             group = self._lookup[entrance.randomization_group]
-            group.remove(entrance)
+            del group[entrance]
             if not group:
                 del self._lookup[entrance.randomization_group]
 
+        def shuffle(self, group: int, rng: random.Random) -> None:
+            """Shuffles the stored order of a group"""
+            entrances = self[group]
+            if entrances:
+                rng.shuffle(entrances)
+                self._lookup[group] = dict.fromkeys(entrances)
+
     dead_ends: GroupLookup
     others: GroupLookup
     _random: random.Random
     _expands_graph_cache: dict[Entrance, bool]
+    """The classification of each target, decided once when it is first seen. Targets are not reclassified when
+    connecting exits turns them into dead ends or lets them expand the graph, so this is only the initial
+    classification through the condensed graph, not one maintained as placements change it."""
     _coupled: bool
     _usable_exits: set[Entrance]
+    _component_of: dict[Region, int]
+    """The strongly connected component of each region in the graph of connected exits, only kept while classifying"""
+    _components: list[tuple[bool, tuple[Entrance, ...]]]
+    """For each component, whether progression can be reached from it and up to two differently named usable unconnected
+    exits that can be reached from it, which is enough to tell if there is one other than the reverse of a target."""
 
     def __init__(self, rng: random.Random, coupled: bool, usable_exits: set[Entrance], targets: Iterable[Entrance]):
         self.dead_ends = EntranceLookup.GroupLookup()
@@ -59,8 +74,86 @@ class EntranceLookup:
         self._expands_graph_cache = {}
         self._coupled = coupled
         self._usable_exits = usable_exits
+        self._component_of = {}
+        self._components = []
         for target in targets:
-            self.add(target)
+            self._add(target)
+        self._drop_index()
+
+    def _drop_index(self) -> None:
+        """Drops the region graph index, which is not updated when exits get connected"""
+        self._component_of.clear()
+        self._components.clear()
+
+    def _index_regions(self, start: Region) -> None:
+        """Condenses the regions reachable from start that are not indexed yet, using Tarjan's algorithm."""
+        index_of: dict[Region, int] = {start: 0}
+        low: dict[Region, int] = {start: 0}
+        stack: list[Region] = [start]
+        on_stack: set[Region] = {start}
+        work: list[tuple[Region, Iterator[Region]]] = [(start, self._get_successors(start))]
+        while work:
+            region, successors = work[-1]
+            for successor in successors:
+                if successor in self._component_of:
+                    continue
+                if successor not in index_of:
+                    index_of[successor] = low[successor] = len(index_of)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, self._get_successors(successor)))
+                    break
+                if successor in on_stack:
+                    low[region] = min(low[region], index_of[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[region])
+                if low[region] == index_of[region]:
+                    members: list[Region] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        members.append(member)
+                        if member is region:
+                            break
+                    self._add_component(members)
+
+    @staticmethod
+    def _get_successors(region: Region) -> Iterator[Region]:
+        return (exit_.connected_region for exit_ in region.exits if exit_.connected_region)
+
+    def _add_component(self, members: list[Region]) -> None:
+        """Annotates a component, all components reachable from it have been added already"""
+        component = len(self._components)
+        for region in members:
+            self._component_of[region] = component
+        progression = False
+        open_exits: list[Entrance] = []
+
+        def add_open_exits(exits: Iterable[Entrance]) -> None:
+            for exit_ in exits:
+                if len(open_exits) == 2:
+                    return
+                if all(exit_.name != other.name for other in open_exits):
+                    open_exits.append(exit_)
+
+        for region in members:
+            # check if the region itself is progression, or any placed locations are progression
+            if region in region.multiworld.indirect_connections or any(loc.advancement for loc in region.locations):
+                progression = True
+            for exit_ in region.exits:
+                if not exit_.connected_region:
+                    if exit_ in self._usable_exits:
+                        add_open_exits((exit_,))
+                else:
+                    successor = self._component_of[exit_.connected_region]
+                    if successor != component:
+                        successor_progression, successor_exits = self._components[successor]
+                        progression = progression or successor_progression
+                        add_open_exits(successor_exits)
+        self._components.append((progression, tuple(open_exits)))
 
     def _can_expand_graph(self, entrance: Entrance) -> bool:
         """
@@ -74,45 +167,26 @@ class EntranceLookup:
         if entrance in self._expands_graph_cache:
             return self._expands_graph_cache[entrance]
 
-        seen = {entrance.connected_region}
-        q: deque[Region] = deque()
-        q.append(entrance.connected_region)
-
-        while q:
-            region = q.popleft()
-
-            # check if the region itself is progression
-            if region in region.multiworld.indirect_connections:
-                self._expands_graph_cache[entrance] = True
-                return True
-
-            # check if any placed locations are progression
-            for loc in region.locations:
-                if loc.advancement:
-                    self._expands_graph_cache[entrance] = True
-                    return True
-
-            # check if there is a randomized exit out (expands the graph directly) or else search any connected
-            # regions to see if they are/have progression
-            for exit_ in region.exits:
-                # randomizable exits which are not reverse of the incoming entrance.
-                # uncoupled mode is an exception because in this case going back in the door you just came in could
-                # actually lead somewhere new
-                if (not exit_.connected_region and (not self._coupled or exit_.name != entrance.name)
-                        and exit_ in self._usable_exits):
-                    self._expands_graph_cache[entrance] = True
-                    return True
-                elif exit_.connected_region and exit_.connected_region not in seen:
-                    seen.add(exit_.connected_region)
-                    q.append(exit_.connected_region)
-
-        self._expands_graph_cache[entrance] = False
-        return False
-
-    def add(self, entrance: Entrance) -> None:
+        region = entrance.connected_region
+        if region not in self._component_of:
+            self._index_regions(region)
+        progression, open_exits = self._components[self._component_of[region]]
+        # randomizable exits which are not reverse of the incoming entrance expand the graph directly.
+        # uncoupled mode is an exception because in this case going back in the door you just came in could
+        # actually lead somewhere new
+        expands = progression or any(not self._coupled or exit_.name != entrance.name for exit_ in open_exits)
+        self._expands_graph_cache[entrance] = expands
+        return expands
+
+    def _add(self, entrance: Entrance) -> None:
         lookup = self.others if self._can_expand_graph(entrance) else self.dead_ends
         lookup.add(entrance)
 
+    def add(self, entrance: Entrance) -> None:
+        """Adds a target, classifying it against the current graph if it has not been seen before"""
+        self._add(entrance)
+        self._drop_index()
+
     def remove(self, entrance: Entrance) -> None:
         lookup = self.others if self._can_expand_graph(entrance) else self.dead_ends
         lookup.remove(entrance)
@@ -134,7 +208,7 @@ class EntranceLookup:
         lookup = self.dead_ends if dead_end else self.others
         if preserve_group_order:
             for group in groups:
-                self._random.shuffle(lookup[group])
+                lookup.shuffle(group, self._random)
             ret = [entrance for group in groups for entrance in lookup[group]]
         else:
             ret = [entrance for group in groups for entrance in lookup[group]]
@@ -217,16 +291,37 @@ class ERPlacementState:
         self.pairings.append((source_exit.name, target_entrance.name))
         self.entrance_lookup.remove(target_entrance)
 
+    def sweep(self) -> None:
+        """
+        Collects the advancements that became reachable through new placements. Unless the world declares cross player
+        logic, only the world's own locations are swept, as nothing else can become reachable through its entrances.
+        """
+        self.collection_state.update_reachable_regions(self.world.player)
+        if self.world.cross_player_logic:
+            self.collection_state.sweep_for_advancements()
+        else:
+            self.collection_state.sweep_for_advancements(self.world.get_locations())
+
     def test_speculative_connection(self, source_exit: Entrance, target_entrance: Entrance,
                                     usable_exits: set[Entrance]) -> bool:
-        copied_state = self.collection_state.copy()
+        player = self.world.player
+        if self.world.cross_player_logic:
+            copied_state = self.collection_state.copy()
+        else:
+            # only this world's state can change, the rest is shared with the real state
+            copied_state = self.collection_state.copy_for_player(player)
         # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
         # propagate back to the real multiworld.
-        copied_state.reachable_regions[self.world.player].add(target_entrance.connected_region)
-        copied_state.blocked_connections[self.world.player].remove(source_exit)
-        copied_state.blocked_connections[self.world.player].update(target_entrance.connected_region.exits)
-        copied_state.update_reachable_regions(self.world.player)
-        copied_state.sweep_for_advancements()
+        copied_state.reachable_regions[player].add(target_entrance.connected_region)
+        copied_state.blocked_connections[player].remove(source_exit)
+        copied_state.blocked_connections[player].update(target_entrance.connected_region.exits)
+        copied_state.update_reachable_regions(player)
+        if self.world.cross_player_logic:
+            copied_state.sweep_for_advancements()
+        else:
+            # items of other players can't be collected into the shared state, and can't matter to this world's logic
+            copied_state.sweep_for_advancements([location for location in self.world.get_locations()
+                                                 if location.item and location.item.player == player])
         # test that at there are newly reachable randomized exits that are ACTUALLY reachable
         available_randomized_exits = copied_state.blocked_connections[self.world.player]
         for _exit in available_randomized_exits:
@@ -401,13 +496,11 @@ def randomize_entrances(
     def do_placement(source_exit: Entrance, target_entrance: Entrance) -> None:
         placed_exits, paired_entrances = er_state.connect(source_exit, target_entrance)
         # propagate new connections
-        er_state.collection_state.update_reachable_regions(world.player)
-        er_state.collection_state.sweep_for_advancements()
+        er_state.sweep()
         if on_connect:
             change = on_connect(er_state, placed_exits, paired_entrances)
             if change:
-                er_state.collection_state.update_reachable_regions(world.player)
-                er_state.collection_state.sweep_for_advancements()
+                er_state.sweep()
 
     def needs_speculative_sweep(dead_end: bool, require_new_exits: bool, placeable_exits: list[Entrance]) -> bool:
         # speculative sweep is expensive. We currently only do it as a last resort, if we might cap off the graph
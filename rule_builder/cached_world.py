@@ -3,7 +3,7 @@ from typing import ClassVar, cast
 
 from typing_extensions import override
 
-from BaseClasses import CollectionState, Item, MultiWorld, Region
+from BaseClasses import DEFAULT_COLLECTION_RULE, CollectionState, Item, MultiWorld, Region
 from worlds.AutoWorld import LogicMixin, World
 
 from .rules import Rule
@@ -96,12 +96,34 @@ class CachedRuleBuilderWorld(World):
             return changed
 
         player_results = cast(dict[int, bool], state.rule_builder_cache[self.player])  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        mapped_name = self.item_mapping.get(item.name, "")
         if self.rule_item_dependencies:
-            mapped_name = self.item_mapping.get(item.name, "")
             rule_ids = self.rule_item_dependencies[item.name] | self.rule_item_dependencies[mapped_name]
             for rule_id in rule_ids:
                 player_results.pop(rule_id, None)
 
+        if self.decremental_reachability:
+            # region dependent caches get trimmed as regions are lost, see lost_region,
+            # but a location or entrance can also be lost through its own rule while its region stays reachable
+            item_names = {item.name, mapped_name}
+            for location_name, rule_ids in self.rule_location_dependencies.items():
+                try:
+                    access_rule = self.get_location(location_name).access_rule
+                except KeyError:
+                    continue
+                if self._rule_may_depend_on(access_rule, item_names):
+                    for rule_id in rule_ids:
+                        player_results.pop(rule_id, None)
+            for entrance_name, rule_ids in self.rule_entrance_dependencies.items():
+                try:
+                    access_rule = self.get_entrance(entrance_name).access_rule
+                except KeyError:
+                    continue
+                if self._rule_may_depend_on(access_rule, item_names):
+                    for rule_id in rule_ids:
+                        player_results.pop(rule_id, None)
+            return changed
+
         # clear all region dependent caches as none can be trusted
         if self.rule_region_dependencies:
             for rule_ids in self.rule_region_dependencies.values():
@@ -122,6 +144,18 @@ class CachedRuleBuilderWorld(World):
 
         return changed
 
+    @staticmethod
+    def _rule_may_depend_on(access_rule: object, item_names: set[str]) -> bool:
+        """Whether an access rule may depend on any of the items, rules that are not rule builder rules or that depend
+        on other locations or entrances are assumed to"""
+        if access_rule is DEFAULT_COLLECTION_RULE.__func__:
+            return False
+        if not isinstance(access_rule, Rule.Resolved):
+            return True
+        if access_rule.location_dependencies() or access_rule.entrance_dependencies():
+            return True
+        return not item_names.isdisjoint(access_rule.item_dependencies())
+
     @override
     def reached_region(self, state: CollectionState, region: Region) -> None:
         super().reached_region(state, region)
@@ -130,6 +164,22 @@ class CachedRuleBuilderWorld(World):
             for rule_id in self.rule_region_dependencies[region.name]:
                 player_results.pop(rule_id, None)
 
+    @override
+    def lost_region(self, state: CollectionState, region: Region) -> None:
+        super().lost_region(state, region)
+        player_results = cast(dict[int, bool], state.rule_builder_cache[self.player])  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        if self.rule_region_dependencies:
+            for rule_id in self.rule_region_dependencies.get(region.name, ()):
+                player_results.pop(rule_id, None)
+        if self.rule_location_dependencies:
+            for location in region.locations:
+                for rule_id in self.rule_location_dependencies.get(location.name, ()):
+                    player_results.pop(rule_id, None)
+        if self.rule_entrance_dependencies:
+            for entrance in region.exits:
+                for rule_id in self.rule_entrance_dependencies.get(entrance.name, ()):
+                    player_results.pop(rule_id, None)
+
 
 class CachedRuleBuilderLogicMixin(LogicMixin):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
@@ -0,0 +1,175 @@
+from collections.abc import Iterable
+from typing import Final
+
+from BaseClasses import CollectionState, Location
+
+from .rules import (
+    And,
+    CanReachRegion,
+    False_,
+    Has,
+    HasAll,
+    HasAllCounts,
+    HasAny,
+    HasAnyCount,
+    HasFromList,
+    Or,
+    Rule,
+    True_,
+)
+
+_HAS: Final = 0
+_CONSTANT: Final = 1
+_AND: Final = 2
+_OR: Final = 3
+_SUM: Final = 4
+_REGION: Final = 5
+_CALL: Final = 6
+
+
+class CompiledRules:
+    """
+    A world's resolved rules lowered into one flat, deduplicated program, so that many rules can be evaluated against
+    a state in a single call instead of one rule tree at a time.
+
+    Every distinct rule is a node, so rules shared between locations are evaluated once per call. Only the nodes the
+    requested roots depend on are evaluated, and And and Or nodes stop at the first child that decides them.
+    Rule types the compiler does not know, including subclasses of the built-in rules, are called as they are.
+    """
+
+    player: int
+    nodes: dict[Rule.Resolved, int]
+    """node index of each compiled rule"""
+    definitions: list[tuple[int, object]]
+    """(kind, argument) of each node"""
+    roots: dict[Location, tuple[object, int]]
+    """access rule and node of every location compiled so far"""
+
+    def __init__(self, player: int) -> None:
+        self.player = player
+        self.nodes = {}
+        self.definitions = []
+        self.roots = {}
+        self._threshold_nodes: dict[tuple[str, float], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    def _new_node(self, kind: int, argument: object) -> int:
+        self.definitions.append((kind, argument))
+        return len(self.definitions) - 1
+
+    def _threshold(self, item_name: str, count: float) -> int:
+        node = self._threshold_nodes.get((item_name, count))
+        if node is None:
+            node = self._threshold_nodes[item_name, count] = self._new_node(_HAS, (item_name, count))
+        return node
+
+    def add(self, rule: Rule.Resolved) -> int:
+        """Compile a rule and return the node holding its result"""
+        node = self.nodes.get(rule)
+        if node is not None:
+            return node
+
+        rule_type = type(rule)
+        if rule_type is Has.Resolved:
+            return self._threshold(rule.item_name, rule.count)
+        if rule_type is True_.Resolved or rule_type is False_.Resolved:
+            node = self._new_node(_CONSTANT, rule_type is True_.Resolved)
+        elif rule_type is HasAll.Resolved:
+            node = self._new_node(_AND, tuple(self._threshold(item_name, 1) for item_name in rule.item_names))
+        elif rule_type is HasAny.Resolved:
+            node = self._new_node(_OR, tuple(self._threshold(item_name, 1) for item_name in rule.item_names))
+        elif rule_type is HasAllCounts.Resolved:
+            node = self._new_node(_AND, tuple(self._threshold(item_name, count)
+                                              for item_name, count in rule.item_counts))
+        elif rule_type is HasAnyCount.Resolved:
+            node = self._new_node(_OR, tuple(self._threshold(item_name, count)
+                                             for item_name, count in rule.item_counts))
+        elif rule_type is And.Resolved:
+            node = self._new_node(_AND, tuple(self.add(child) for child in rule.children))
+        elif rule_type is Or.Resolved:
+            node = self._new_node(_OR, tuple(self.add(child) for child in rule.children))
+        elif rule_type is HasFromList.Resolved:
+            node = self._new_node(_SUM, (rule.item_names, rule.count))
+        elif rule_type is CanReachRegion.Resolved and rule.player == self.player:
+            node = self._new_node(_REGION, rule.region_name)
+        else:
+            node = self._new_node(_CALL, rule)
+        self.nodes[rule] = node
+        return node
+
+    def root(self, location: Location) -> int | None:
+        """The node of the location's access rule, compiling it if it was not yet or has been replaced since.
+        None if the access rule is not a rule builder rule."""
+        rule = location.access_rule
+        compiled = self.roots.get(location)
+        if compiled is not None and compiled[0] is rule:
+            return compiled[1]
+        node = self.add(rule) if isinstance(rule, Rule.Resolved) and rule.player == self.player else None
+        if node is not None:
+            self.roots[location] = rule, node
+        return node
+
+    def evaluate(self, state: CollectionState, nodes: Iterable[int]) -> list[bool]:
+        """The values of the given nodes against the state, evaluating each node they depend on at most once"""
+        values: dict[int, bool] = {}
+        definitions = self.definitions
+        player_prog_items = state.prog_items[self.player]
+
+        def value_of(node: int) -> bool:
+            value = values.get(node)
+            if value is not None:
+                return value
+            kind, argument = definitions[node]
+            if kind == _HAS:
+                item_name, count = argument  # pyright: ignore[reportGeneralTypeIssues]
+                value = player_prog_items[item_name] >= count
+            elif kind == _CONSTANT:
+                value = argument  # pyright: ignore[reportAssignmentType]
+            elif kind == _AND:
+                value = all(value_of(child) for child in argument)  # pyright: ignore[reportGeneralTypeIssues]
+            elif kind == _OR:
+                value = any(value_of(child) for child in argument)  # pyright: ignore[reportGeneralTypeIssues]
+            elif kind == _SUM:
+                item_names, count = argument  # pyright: ignore[reportGeneralTypeIssues]
+                found = 0
+                for item_name in item_names:
+                    found += player_prog_items[item_name]
+                value = found >= count
+            elif kind == _REGION:
+                value = state.can_reach_region(argument, self.player)  # pyright: ignore[reportArgumentType]
+            else:
+                value = argument(state)  # pyright: ignore[reportCallIssue]
+            values[node] = value
+            return value
+
+        return [value_of(node) for node in nodes]
+
+    def split_reachable(
+        self, state: CollectionState, locations: Iterable[Location]
+    ) -> tuple[list[Location], list[Location]]:
+        """Split locations into those that can and can not be reached with the state, evaluating compiled access rules
+        in one pass. Locations with other access rules or their own can_reach are checked individually."""
+        compiled: list[tuple[Location, int]] = []
+        reachable: list[Location] = []
+        unreachable: list[Location] = []
+        for location in locations:
+            node = self.root(location) if type(location).can_reach is Location.can_reach else None
+            if node is None:
+                (reachable if location.can_reach(state) else unreachable).append(location)
+            else:
+                compiled.append((location, node))
+        if compiled:
+            # like Location.can_reach, only locations in reachable regions have their access rule evaluated
+            in_reach: list[tuple[Location, int]] = []
+            for location, node in compiled:
+                assert location.parent_region, f'called can_reach on a Location "{location}" with no parent_region'
+                if location.parent_region.can_reach(state):
+                    in_reach.append((location, node))
+                else:
+                    unreachable.append(location)
+            values = self.evaluate(state, [node for _, node in in_reach])
+            for (location, _), value in zip(in_reach, values):
+                (reachable if value else unreachable).append(location)
+        return reachable, unreachable
@@ -687,6 +687,30 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class BalancingMethod(str):
+        """
+        How progression balancing decides which items to move into earlier spheres.
+        incremental -> Test candidate items against cached states, skipping tests that can be inferred. (Default)
+        compatibility -> Test every candidate item against a freshly built state. Gives the same result for worlds with
+        monotonic logic, but can be used to reproduce seeds of older versions if a world's logic is not monotonic.
+        """
+
+    class WorldProcesses(int):
+        """
+        Number of worker processes to run per-world generation stages and output in, for worlds that declare
+        themselves independent of other slots. 0 or 1 to run all worlds in the generating process. Requires a platform
+        that supports fork.
+        """
+
+    class MultidataFormat(int):
+        """
+        Format version of the written .archipelago file.
+        3 -> Can be hosted by every server. (Default)
+        4 -> Compresses slot data, data packages and locations as separate sections that servers inflate on demand,
+             which lowers their memory use and load time. Can not be hosted by servers or read by tools older than the
+             generating version.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -696,6 +720,9 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    balancing_method: BalancingMethod = BalancingMethod("incremental")
+    world_processes: WorldProcesses = WorldProcesses(0)
+    multidata_format: MultidataFormat = MultidataFormat(3)
     loglevel: str = "info"
     logtime: bool = False
 
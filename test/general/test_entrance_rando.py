@@ -1,3 +1,4 @@
+from random import Random
 from typing import Callable
 import unittest
 from enum import IntEnum
@@ -123,6 +124,76 @@ class TestEntranceLookup(unittest.TestCase):
         self.assertTrue(dead_end in lookup.dead_ends)
         self.assertEqual(len(lookup.dead_ends), 1)
 
+    def test_dead_ends_through_connected_regions(self):
+        """tests that dead-ends are found through regions which are already connected, including cycles"""
+        multiworld = generate_test_multiworld()
+        generate_disconnected_region_grid(multiworld, 5)
+        rng = Random(0)
+        regions = [multiworld.get_region(f"region{index}", 1) for index in range(25)]
+        for _ in range(40):
+            for exit_ in rng.choice(regions).exits:
+                if not exit_.connected_region:
+                    exit_.connect(rng.choice(regions))
+                    break
+        # only few usable exits, so that there are dead-ends
+        exits_set = set(rng.sample([ex for region in multiworld.get_regions(1) for ex in region.exits
+                                    if not ex.connected_region], 3))
+        er_targets = [entrance for region in multiworld.get_regions(1)
+                      for entrance in region.entrances if not entrance.parent_region]
+        lookup = EntranceLookup(multiworld.worlds[1].random, coupled=True, usable_exits=exits_set, targets=er_targets)
+
+        def expands_graph(entrance: Entrance) -> bool:
+            seen = {entrance.connected_region}
+            queue = [entrance.connected_region]
+            while queue:
+                region = queue.pop()
+                for exit_ in region.exits:
+                    if not exit_.connected_region:
+                        if exit_ in exits_set and exit_.name != entrance.name:
+                            return True
+                    elif exit_.connected_region not in seen:
+                        seen.add(exit_.connected_region)
+                        queue.append(exit_.connected_region)
+            return False
+
+        self.assertTrue(lookup.dead_ends and lookup.others)
+        self.assertEqual({target for target in er_targets if not expands_graph(target)}, set(lookup.dead_ends))
+        self.assertEqual({target for target in er_targets if expands_graph(target)}, set(lookup.others))
+
+    def test_classification_after_connect(self):
+        """tests that connecting does not reclassify targets, but targets added later see the connected graph"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        start = Region("Start", 1, multiworld)
+        end = Region("End", 1, multiworld)
+        multiworld.regions += [start, end]
+        menu.connect(start)
+        target = start.create_er_target("Start_entrance")
+        exit_ = start.create_exit("Start_exit")
+        lookup = EntranceLookup(multiworld.worlds[1].random, coupled=True, usable_exits={exit_}, targets=[target])
+        self.assertEqual([target], list(lookup.others))
+
+        exit_.connect(end)
+        late_target = start.create_er_target("Start_late_entrance")
+        lookup.add(late_target)
+        self.assertEqual([target], list(lookup.others))
+        self.assertEqual([late_target], list(lookup.dead_ends))
+        lookup.remove(target)
+        self.assertFalse(lookup.others)
+
+    def test_group_order(self):
+        """tests that removing targets keeps the order of the remaining targets of the group"""
+        multiworld = generate_test_multiworld()
+        generate_disconnected_region_grid(multiworld, 5)
+        lookup = EntranceLookup.GroupLookup()
+        targets = [entrance for region in multiworld.get_regions(1)
+                   for entrance in region.entrances if entrance.randomization_group == ERTestGroups.LEFT]
+        for target in targets:
+            lookup.add(target)
+        lookup.remove(targets[3])
+        lookup.remove(targets[0])
+        self.assertEqual(targets[1:3] + targets[4:], lookup[ERTestGroups.LEFT])
+
     def test_find_target_by_name(self):
         """Tests that find_target can find the correct target by name only"""
         multiworld = generate_test_multiworld()
@@ -287,6 +358,40 @@ class TestRandomizeEntrances(unittest.TestCase):
             self.assertEqual(e1.parent_region.name, e1.parent_region.name)
             self.assertEqual(e1.connected_region.name, e2.connected_region.name)
 
+    def test_cross_player_logic(self):
+        """tests that sweeping only the randomizing world gives the same result as sweeping the whole multiworld"""
+        multiworld1 = generate_test_multiworld(2)
+        generate_disconnected_region_grid(multiworld1, 5, 1)
+        multiworld2 = generate_test_multiworld(2)
+        generate_disconnected_region_grid(multiworld2, 5, 1)
+        multiworld2.worlds[1].cross_player_logic = True
+
+        result1 = randomize_entrances(multiworld1.worlds[1], True, directionally_matched_group_lookup)
+        result2 = randomize_entrances(multiworld2.worlds[1], True, directionally_matched_group_lookup)
+        self.assertEqual(result1.pairings, result2.pairings)
+
+    def test_speculative_connection_keeps_state(self):
+        """tests that testing a connection does not change the real state"""
+        multiworld = generate_test_multiworld(2)
+        generate_disconnected_region_grid(multiworld, 5)
+        exits = [ex for region in multiworld.get_regions(1) for ex in region.exits if not ex.connected_region]
+        er_targets = [entrance for region in multiworld.get_regions(1)
+                      for entrance in region.entrances if not entrance.parent_region]
+        er_state = ERPlacementState(multiworld.worlds[1],
+                                    EntranceLookup(multiworld.worlds[1].random, True, set(exits), er_targets), True)
+        er_state.collection_state.update_reachable_regions(1)
+        state = er_state.collection_state
+        reachable_regions = set(state.reachable_regions[1])
+        blocked_connections = set(state.blocked_connections[1])
+        path = dict(state.path)
+
+        source_exit = multiworld.get_entrance("region0_right", 1)
+        target = er_state.entrance_lookup.find_target("region1_left")
+        self.assertTrue(er_state.test_speculative_connection(source_exit, target, set(exits)))
+        self.assertEqual(reachable_regions, set(state.reachable_regions[1]))
+        self.assertEqual(blocked_connections, set(state.blocked_connections[1]))
+        self.assertEqual(path, dict(state.path))
+
     def test_all_entrances_placed(self):
         """tests that all entrances and exits were placed, all regions are connected, and no dangling edges exist"""
         multiworld = generate_test_multiworld()
@@ -1,12 +1,14 @@
+from random import Random
 from typing import List, Iterable
 import unittest
+import unittest.mock
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
+    distribute_early_items, distribute_items_restrictive, _PlacementIndex
 from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
-    ItemClassification
+    ItemClassification, SphereCache
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
 
@@ -100,6 +102,19 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual([], player1.locations)
         self.assertEqual([], player1.prog_items)
 
+    def test_locations_removed_while_placing(self):
+        """Tests `fill_restrictive` removes each location from the list as soon as it is filled"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 4, 4)
+        locations = player1.locations
+
+        def on_place(location: Location) -> None:
+            self.assertNotIn(location, locations)
+            self.assertTrue(all(not remaining.item for remaining in locations))
+
+        fill_restrictive(multiworld, multiworld.state, locations, player1.prog_items, on_place=on_place)
+        self.assertEqual([], locations)
+
     def test_ordered_fill(self):
         """Tests `fill_restrictive` fulfills set rules"""
         multiworld = generate_test_multiworld()
@@ -433,6 +448,27 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(sphere1_loc1.item.name == one_to_two1 or
                         sphere1_loc2.item.name == one_to_two1, "Wrong item in Sphere 1")
 
+    def test_swap_reports_sweeps(self):
+        """Test that the swap phase reports its sweeps and does not sweep for locations the item is forbidden from"""
+        multiworld = generate_test_multiworld(1)
+        player1 = generate_player_data(multiworld, 1, 4, 4)
+        locations = player1.locations[:]
+        items = player1.prog_items[:]
+        for location in locations[:-1]:
+            set_rule(location, lambda state: any(state.has(item.name, player1.id) for item in items))
+        sphere1_loc = locations[-1]
+        allowed_item = items[1]
+        add_item_rule(sphere1_loc, lambda item_to_place: item_to_place == allowed_item)
+
+        with self.assertLogs(level="DEBUG") as logs:
+            fill_restrictive(multiworld, multiworld.state, player1.locations, player1.prog_items, name="Swap Test")
+        self.assertEqual(sphere1_loc.item, allowed_item, "Wrong item in Sphere 1")
+        summary = [line for line in logs.output if "swap phases" in line]
+        # every item placed before the allowed item fails on sphere 1, and each swap phase only needs a sweep for the
+        # remaining pool and one for the swapped out location, as sphere 1 itself is skipped without sweeping
+        self.assertEqual(summary, ["DEBUG:root:Fill step (Swap Test) needed 3 swap phases, "
+                                   "costing 6 sweeps, at most 2 for one item."])
+
     def test_double_sweep(self):
         """Test that sweep doesn't duplicate Event items when sweeping"""
         # test for PR1114
@@ -464,6 +500,51 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
 
+class TestPlacementIndex(unittest.TestCase):
+    def test_matches_location_scan(self):
+        """Tests that the placement index picks the same location as scanning the locations in order"""
+        multiworld = generate_test_multiworld(2)
+        random = Random(0)
+        locations: List[Location] = []
+        items: List[Item] = []
+
+        def only_advancement(item: Item) -> bool:
+            return item.advancement
+
+        for player_id in (1, 2):
+            player = generate_player_data(multiworld, player_id, 20, 10, 10)
+            unreachable = player.generate_region(player.menu, 20, lambda state: state.has("Nothing", player_id))
+            locations += player.locations
+            items += player.prog_items + player.basic_items
+            for location in player.locations:
+                roll = random.random()
+                if roll < 0.2:
+                    location.item_rule = only_advancement
+                elif roll < 0.3:
+                    add_item_rule(location, lambda item, name=location.name: len(name) % 2 == len(item.name) % 2)
+                elif roll < 0.4:
+                    location.progress_type = LocationProgressType.EXCLUDED
+                if location.parent_region is unreachable and random.random() < 0.2:
+                    location.always_allow = lambda state, item: not item.advancement
+        random.shuffle(locations)
+
+        state = multiworld.state
+        index = _PlacementIndex(locations)
+        remaining = locations.copy()
+        for _ in range(len(locations)):
+            item = random.choice(items)
+            check_access = random.random() < 0.8
+            player = random.choice((None, item.player))
+            expected = next((location for location in remaining
+                             if (player is None or location.player == player)
+                             and location.can_fill(state, item, check_access)), None)
+            self.assertIs(index.find(state, item, check_access, player), expected)
+            if expected:
+                index.remove(expected)
+                remaining.remove(expected)
+        self.assertEqual(len(index), len(remaining))
+
+
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
         """Test that distribute_items_restrictive is deterministic"""
@@ -880,3 +961,63 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+    def test_cached_spheres_follow_balancing(self) -> None:
+        """Test that cached spheres get patched to match the placement after balancing swaps items"""
+        self.multiworld.worlds[self.player1.id].options.progression_balancing.value = 50
+        self.multiworld.worlds[self.player2.id].options.progression_balancing.value = 50
+
+        self.multiworld.cache_spheres()
+        spheres_before = list(self.multiworld.get_spheres())
+        self.assertEqual(spheres_before, list(SphereCache(self.multiworld)))
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+        balance_multiworld_progression(self.multiworld)
+
+        spheres_after = list(self.multiworld.get_spheres())
+        self.assertNotEqual(spheres_before, spheres_after)
+        self.assertEqual(spheres_after, list(SphereCache(self.multiworld)))
+        self.assertEqual(list(self.multiworld.get_sendable_spheres()),
+                         list(SphereCache(self.multiworld, sendable=True)))
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+    def test_accessibility_without_cached_spheres(self) -> None:
+        """Test that checking accessibility does not compute spheres when they are not cached"""
+        with unittest.mock.patch("BaseClasses.SphereCache") as sphere_cache:
+            self.assertTrue(self.multiworld.fulfills_accessibility())
+        sphere_cache.assert_not_called()
+
+    def test_incremental_matches_compatibility(self) -> None:
+        """Test that both progression balancing methods move the same items into the same locations"""
+        def balanced_placements(balancing_method: str) -> List[tuple]:
+            multiworld = generate_test_multiworld(2)
+            multiworld.random.seed(1)
+            player1 = generate_player_data(multiworld, 1, prog_item_count=2, basic_item_count=40)
+            player2 = generate_player_data(multiworld, 2, prog_item_count=12, basic_item_count=40)
+            for player in (player1, player2):
+                multiworld.worlds[player.id].options.progression_balancing.value = 50
+            multiworld.completion_condition[player1.id] = lambda state: state.has_all(
+                names(player1.prog_items), player1.id)
+            multiworld.completion_condition[player2.id] = lambda state: state.has_all(
+                names(player2.prog_items), player2.id)
+            items = player1.basic_items + player2.basic_items
+
+            region = player1.generate_region(player1.menu, 20)
+            items = fill_region(multiworld, region, [player1.prog_items[0]] + items)
+            region = player1.generate_region(
+                player1.regions[1], 20, lambda state: state.has(player1.prog_items[0].name, player1.id))
+            items = fill_region(multiworld, region, [player1.prog_items[1], *player2.prog_items[:10]] + items)
+            # each of player 2's regions needs a few of the items placed into player 1's sphere 2
+            for i in range(5):
+                region = player2.generate_region(
+                    player2.menu, 8, lambda state, i=i: state.has_from_list(
+                        names(player2.prog_items[:10]), player2.id, i * 2 + 2))
+                items = fill_region(multiworld, region, player2.prog_items[10 + i:11 + i] + items)
+
+            balance_multiworld_progression(multiworld, balancing_method)
+            return [(location.name, location.item.name) for location in multiworld.get_filled_locations()]
+
+        compatible = balanced_placements("compatibility")
+        self.assertEqual(compatible, balanced_placements("incremental"))
+        with self.assertRaises(ValueError):
+            balance_multiworld_progression(self.multiworld, "unknown")
@@ -0,0 +1,167 @@
+import concurrent.futures
+import multiprocessing
+import os
+import tempfile
+import unittest
+import unittest.mock
+from typing import ClassVar
+
+from BaseClasses import Item, ItemClassification, Location, Region
+from worlds.AutoWorld import (AutoWorldRegister, World, _untransferable_stages, call_all, call_all_parallel,
+                              submit_output_parallel)
+from . import setup_multiworld
+
+GAME_NAME = "Parallel Generation Test Game"
+STEPS = ("generate_early", "create_regions", "create_items", "set_rules", "generate_basic")
+
+
+class ParallelItem(Item):
+    game = GAME_NAME
+
+
+class ParallelLocation(Location):
+    game = GAME_NAME
+
+
+class ParallelWorld(World):
+    game = GAME_NAME
+    item_name_to_id: ClassVar = {f"Item {i}": i for i in range(1, 11)}
+    location_name_to_id: ClassVar = {f"Location {i}": i for i in range(1, 11)}
+    hidden = True
+    independent_generation = True
+    independent_output = True
+    region_count: int
+    output_pid: int
+
+    def generate_early(self) -> None:
+        self.region_count = self.random.randint(2, 5)
+
+    def generate_basic(self) -> None:
+        if self.player == 2:
+            # not allowed for independent worlds, but has to give the same result anyway
+            self.region_count += self.multiworld.random.randint(0, 10)
+
+    def create_regions(self) -> None:
+        menu = Region("Menu", self.player, self.multiworld)
+        self.multiworld.regions.append(menu)
+        for i in range(1, self.region_count + 1):
+            region = Region(f"Region {i}", self.player, self.multiworld)
+            region.add_locations({f"Location {location}": location for location in range(i * 2 - 1, i * 2 + 1)},
+                                 ParallelLocation)
+            self.multiworld.regions.append(region)
+            menu.connect(region)
+
+    def create_items(self) -> None:
+        location_count = len(self.multiworld.get_unfilled_locations(self.player))
+        names = self.random.sample(sorted(self.item_name_to_id), location_count)
+        self.multiworld.itempool += [self.create_item(name) for name in names]
+        self.push_precollected(self.create_item("Item 10"))
+
+    def set_rules(self) -> None:
+        entrance = self.get_entrance("Menu -> Region 2")
+        if self.player % 2:
+            # lambdas can't be transferred back to the generating process
+            entrance.access_rule = lambda state: state.has("Item 1", self.player)
+
+    def generate_output(self, output_directory: str) -> None:
+        self.output_pid = os.getpid()
+        with open(os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.txt"),
+                  "w") as f:
+            f.write(str(self.output_pid))
+
+    def create_item(self, name: str) -> ParallelItem:
+        return ParallelItem(name, ItemClassification.progression, self.item_name_to_id[name], self.player)
+
+
+del AutoWorldRegister.world_types[GAME_NAME]
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "parallel world stages require fork")
+class TestParallelGeneration(unittest.TestCase):
+    def setUp(self) -> None:
+        AutoWorldRegister.world_types[GAME_NAME] = ParallelWorld
+
+    def tearDown(self) -> None:
+        del AutoWorldRegister.world_types[GAME_NAME]
+
+    def test_matches_serial(self) -> None:
+        """Ensure running independent worlds in worker processes has the same outcome as running them in turn."""
+        serial = setup_multiworld([ParallelWorld] * 4, (), seed=1)
+        parallel = setup_multiworld([ParallelWorld] * 4, (), seed=1)
+        for step in STEPS:
+            call_all(serial, step)
+            call_all_parallel(parallel, step, 2)
+
+        self.assertEqual([(item.name, item.player) for item in serial.itempool],
+                         [(item.name, item.player) for item in parallel.itempool])
+        self.assertEqual(serial.random.getstate(), parallel.random.getstate())
+        self.assertEqual({(ParallelWorld, "set_rules"), (ParallelWorld, "generate_basic")},
+                         _untransferable_stages[parallel])
+        self.assertNotIn(serial, _untransferable_stages)
+        for player in serial.player_ids:
+            with self.subTest(player=player):
+                serial_world = serial.worlds[player]
+                parallel_world = parallel.worlds[player]
+                self.assertIs(parallel_world.multiworld, parallel)
+                self.assertEqual(serial_world.region_count, parallel_world.region_count)
+                self.assertEqual(serial_world.random.random(), parallel_world.random.random())
+                self.assertEqual(sorted(serial.regions.region_cache[player]),
+                                 sorted(parallel.regions.region_cache[player]))
+                for region in parallel.get_regions(player):
+                    self.assertIs(region.multiworld, parallel)
+                    for location in region.locations:
+                        self.assertIs(parallel.get_location(location.name, player), location)
+                self.assertEqual([item.name for item in serial.precollected_items[player]],
+                                 [item.name for item in parallel.precollected_items[player]])
+                self.assertTrue(parallel.state.has("Item 10", player))
+
+    def test_duplicate_item_reference(self) -> None:
+        """Ensure the duplicate item check of call_all also applies to results of worker processes."""
+        multiworld = setup_multiworld([ParallelWorld] * 2, (), seed=1)
+        for step in STEPS[:2]:
+            call_all_parallel(multiworld, step, 2)
+
+        def create_items(world: ParallelWorld) -> None:
+            item = world.create_item("Item 1")
+            world.multiworld.itempool += [item, item]
+
+        if __debug__:
+            with unittest.mock.patch.object(ParallelWorld, "create_items", create_items), \
+                    self.assertRaises(AssertionError):
+                call_all_parallel(multiworld, "create_items", 2)
+
+    def test_no_processes_from_thread(self) -> None:
+        """Ensure stages run in this process while other threads run, as their held locks would be copied locked."""
+        multiworld = setup_multiworld([ParallelWorld] * 2, (), seed=1)
+        with unittest.mock.patch("multiprocessing.get_context", side_effect=AssertionError), \
+                concurrent.futures.ThreadPoolExecutor(1) as pool:
+            pool.submit(call_all_parallel, multiworld, "generate_early", 2).result()
+        for world in multiworld.worlds.values():
+            self.assertIn(world.region_count, range(2, 6))
+
+    def test_output_in_processes(self) -> None:
+        """Ensure independent output is generated in worker processes, into the directory given for each player."""
+        multiworld = setup_multiworld([ParallelWorld] * 3, (), seed=1)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_directories = {player: tempfile.mkdtemp(dir=temp_dir) for player in multiworld.player_ids}
+            futures = submit_output_parallel(multiworld, output_directories, 2)
+            self.assertEqual(sorted(futures), sorted(multiworld.player_ids))
+            for future in futures.values():
+                future.result()
+            for player, directory in output_directories.items():
+                with self.subTest(player=player):
+                    file_name = f"{multiworld.get_out_file_name_base(player)}.txt"
+                    self.assertEqual(os.listdir(directory), [file_name])
+                    with open(os.path.join(directory, file_name)) as f:
+                        self.assertNotEqual(int(f.read()), os.getpid())
+                    self.assertFalse(hasattr(multiworld.worlds[player], "output_pid"))
+
+        self.assertEqual(submit_output_parallel(multiworld, output_directories, 1), {})
+
+    def test_no_output_processes_from_thread(self) -> None:
+        """Ensure no workers are forked while other threads run, as their held locks would be copied locked."""
+        multiworld = setup_multiworld([ParallelWorld] * 2, (), seed=1)
+        output_directories = {player: "" for player in multiworld.player_ids}
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            futures = pool.submit(submit_output_parallel, multiworld, output_directories, 2).result()
+        self.assertEqual(futures, {})
@@ -1,6 +1,9 @@
 ﻿import unittest
+from random import Random
+from typing import List, Tuple, Union
+
 from worlds.AutoWorld import AutoWorldRegister
-from worlds.Files import AutoPatchRegister
+from worlds.Files import APPatchExtension, APProcedurePatch, APTokenMixin, APTokenTypes, AutoPatchRegister
 
 
 class TestPatches(unittest.TestCase):
@@ -9,3 +12,79 @@ class TestPatches(unittest.TestCase):
             with self.subTest(game=game_name):
                 self.assertIn(game_name, AutoWorldRegister.world_types.keys(),
                               f"Patch '{game_name}' does not match the name of any world.")
+
+
+Token = Tuple[APTokenTypes, int, Union[bytes, Tuple[int, int], int]]
+
+
+class TestTokens(unittest.TestCase):
+    @staticmethod
+    def generate_tokens(random: Random, size: int) -> List[Token]:
+        tokens: List[Token] = []
+        offset = 0
+        for _ in range(2000):
+            # mostly continue at the previous offset, so that there are runs to merge
+            if random.random() < 0.3:
+                offset = random.randrange(size - 16)
+            token_type = random.choice(list(APTokenTypes))
+            if token_type == APTokenTypes.WRITE:
+                length = random.randint(0, 4)
+                tokens.append((token_type, offset, random.randbytes(length)))
+            elif token_type in (APTokenTypes.COPY, APTokenTypes.RLE):
+                length = random.randint(0, 4)
+                value = random.randrange(size - length) if token_type == APTokenTypes.COPY else random.randrange(256)
+                tokens.append((token_type, offset, (length, value)))
+            else:
+                length = 1
+                tokens.append((token_type, offset, random.randrange(256)))
+            offset = min(offset + length, size - 16)
+        return tokens
+
+    @staticmethod
+    def apply_one_by_one(rom: bytes, tokens: List[Token]) -> bytes:
+        rom_data = bytearray(rom)
+        for token_type, offset, args in tokens:
+            if token_type == APTokenTypes.WRITE:
+                assert isinstance(args, bytes)
+                rom_data[offset:offset + len(args)] = args
+            elif token_type == APTokenTypes.COPY:
+                assert isinstance(args, tuple)
+                rom_data[offset:offset + args[0]] = rom_data[args[1]:args[1] + args[0]]
+            elif token_type == APTokenTypes.RLE:
+                assert isinstance(args, tuple)
+                rom_data[offset:offset + args[0]] = bytes([args[1]] * args[0])
+            else:
+                assert isinstance(args, int)
+                if token_type == APTokenTypes.AND_8:
+                    rom_data[offset] &= args
+                elif token_type == APTokenTypes.OR_8:
+                    rom_data[offset] |= args
+                else:
+                    rom_data[offset] ^= args
+        return bytes(rom_data)
+
+    def test_apply_tokens(self) -> None:
+        """Tests that applying a token binary gives the same result as applying each token on its own"""
+        random = Random(0)
+        rom = random.randbytes(1024)
+        tokens = self.generate_tokens(random, len(rom))
+        token_patch = APTokenMixin()
+        for token in tokens:
+            token_patch.write_token(*token)
+        token_binary = token_patch.get_token_binary()
+        self.assertLess(int.from_bytes(token_binary[:4], "little"), len(tokens))
+
+        patch = APProcedurePatch()
+        patch.write_file("tokens.bin", token_binary)
+        self.assertEqual(APPatchExtension.apply_tokens(patch, rom, "tokens.bin"), self.apply_one_by_one(rom, tokens))
+
+    def test_unmerged_tokens(self) -> None:
+        """Tests that token binaries with one token per write are still applied"""
+        rom = bytes(8)
+        token_binary = (b"\x03\x00\x00\x00"
+                        b"\x00\x02\x00\x00\x00\x01\x00\x00\x00\x11"
+                        b"\x00\x03\x00\x00\x00\x01\x00\x00\x00\x22"
+                        b"\x05\x03\x00\x00\x00\x01\x00\x00\x00\xff")
+        patch = APProcedurePatch()
+        patch.write_file("tokens.bin", token_binary)
+        self.assertEqual(APPatchExtension.apply_tokens(patch, rom, "tokens.bin"), bytes((0, 0, 0x11, 0xdd, 0, 0, 0, 0)))
@@ -0,0 +1,72 @@
+from random import Random
+from typing import List
+import unittest
+
+from BaseClasses import Spoiler, cull_in_order
+from test.general import generate_items, generate_locations, generate_test_multiworld
+
+
+class TestCullInOrder(unittest.TestCase):
+    def test_same_as_one_at_a_time(self):
+        """Tests that culling in batches removes the same candidates as testing each candidate on its own"""
+        random = Random(0)
+        for required_share in (0.0, 0.05, 0.5, 1.0):
+            with self.subTest(required_share=required_share):
+                candidates = list(range(200))
+                # beatable while at least one candidate of each group is left
+                groups = [set(random.sample(candidates, random.randint(1, 4)))
+                          for _ in range(int(len(candidates) * required_share))]
+                remaining = set(candidates)
+                tests = 0
+
+                def try_remove(batch: List[int]) -> bool:
+                    nonlocal tests
+                    tests += 1
+                    remaining.difference_update(batch)
+                    if all(group & remaining for group in groups):
+                        return True
+                    remaining.update(batch)
+                    return False
+
+                expected = []
+                expected_remaining = set(candidates)
+                for candidate in candidates:
+                    expected_remaining.remove(candidate)
+                    if all(group & expected_remaining for group in groups):
+                        expected.append(True)
+                    else:
+                        expected_remaining.add(candidate)
+                        expected.append(False)
+
+                self.assertEqual(cull_in_order(candidates, try_remove), expected)
+                self.assertEqual(remaining, expected_remaining)
+                if not groups:
+                    self.assertLess(tests, 20)
+
+
+class TestPlaythrough(unittest.TestCase):
+    def test_culls_unrequired(self):
+        """Tests that the playthrough only keeps the first of interchangeable items and required precollected items"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        locations = generate_locations(4, 1, menu)
+        items = generate_items(6, 1, True)
+        for location, item in zip(locations, items):
+            multiworld.push_item(location, item, False)
+        precollected = items[4:]
+        for item in precollected:
+            multiworld.push_precollected(item)
+        multiworld.completion_condition[1] = lambda state: (
+            state.has(items[0].name, 1) and state.has_any((items[1].name, items[2].name), 1)
+            and state.has(items[5].name, 1))
+
+        spoiler = Spoiler(multiworld)
+        spoiler.create_playthrough(create_paths=False)
+
+        self.assertEqual(spoiler.playthrough["0"], [multiworld.get_name_string_for_object(items[5])])
+        self.assertEqual(len(spoiler.playthrough["1"]), 2)
+        self.assertIn(str(locations[0]), spoiler.playthrough["1"])
+        self.assertEqual(len({str(locations[1]), str(locations[2])} & set(spoiler.playthrough["1"])), 1)
+        self.assertEqual(len(spoiler.playthrough), 2)
+        # the multiworld is repaired, with the removed precollected items added back at the end
+        self.assertEqual(multiworld.precollected_items[1], [items[5], items[4]])
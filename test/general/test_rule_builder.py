@@ -1,5 +1,6 @@
 import unittest
 from dataclasses import dataclass, fields
+from random import Random
 from typing import Any, ClassVar, cast
 
 from typing_extensions import override
@@ -8,6 +9,7 @@ from BaseClasses import CollectionState, Item, ItemClassification, Location, Mul
 from NetUtils import JSONMessagePart
 from Options import Choice, FreeText, Option, OptionSet, PerGameCommonOptions, Toggle
 from rule_builder.cached_world import CachedRuleBuilderWorld
+from rule_builder.compiled import CompiledRules
 from rule_builder.options import Operator, OptionFilter
 from rule_builder.rules import (
     And,
@@ -492,6 +494,251 @@ class TestCaching(CachedRuleBuilderTestCase):
         self.assertTrue(entrance.can_reach(self.state))
 
 
+class TestDecrementalReachability(CachedRuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def _create_world_class(self) -> None:
+        super()._create_world_class()
+        self.world_cls.decremental_reachability = True
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+
+        regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(1, 6)]
+        self.multiworld.regions.extend(regions)
+        regions[1].add_locations({"Location 1": 1}, RuleBuilderLocation)
+        regions[4].add_locations({"Location 2": 2}, RuleBuilderLocation)
+
+        world.create_entrance(regions[0], regions[1], Has("Item 1"))
+        world.create_entrance(regions[0], regions[2], Has("Item 2"))
+        world.create_entrance(regions[2], regions[3], True_(), force_creation=True)
+        world.create_entrance(regions[1], regions[4], CanReachRegion("Region 4"))
+        world.set_rule(world.get_location("Location 1"), CanReachRegion("Region 2"))
+        world.set_rule(world.get_location("Location 2"), CanReachRegion("Region 3"))
+        world.register_rule_builder_dependencies()
+
+    def _reachable_region_names(self, state: CollectionState) -> set[str]:
+        state.update_reachable_regions(self.player)
+        return {region.name for region in state.reachable_regions[self.player]}
+
+    def test_remove_keeps_unaffected_regions(self) -> None:
+        state = cast(CachedCollectionState, CollectionState(self.multiworld))
+        item_1 = self.world.create_item("Item 1")
+        item_2 = self.world.create_item("Item 2")
+        state.collect(item_1, True)
+        state.collect(item_2, True)
+        self.assertEqual(self._reachable_region_names(state), {f"Region {i}" for i in range(1, 6)})
+        location_1 = self.world.get_location("Location 1")
+        location_2 = self.world.get_location("Location 2")
+        self.assertTrue(location_1.can_reach(state))
+        self.assertTrue(location_2.can_reach(state))
+
+        state.remove(item_2)
+        # Region 3 and Region 4 behind it are lost, and Region 5 depended on reaching Region 4
+        self.assertEqual({region.name for region in state.reachable_regions[self.player]}, {"Region 1", "Region 2"})
+        self.assertTrue(state.rule_builder_cache[self.player][id(location_1.access_rule)])
+        self.assertNotIn(id(location_2.access_rule), state.rule_builder_cache[self.player])
+        self.assertFalse(location_2.can_reach(state))
+
+        fresh_state = CollectionState(self.multiworld)
+        fresh_state.collect(item_1, True)
+        self.assertEqual(self._reachable_region_names(state), self._reachable_region_names(fresh_state))
+
+        state.collect(item_2, True)
+        self.assertEqual(self._reachable_region_names(state), {f"Region {i}" for i in range(1, 6)})
+        self.assertTrue(location_2.can_reach(state))
+
+    def test_remove_unrelated_item(self) -> None:
+        state = CollectionState(self.multiworld)
+        state.collect(self.world.create_item("Item 1"), True)
+        item_3 = self.world.create_item("Item 3")
+        state.collect(item_3, True)
+        self.assertEqual(self._reachable_region_names(state), {"Region 1", "Region 2"})
+
+        state.remove(item_3)
+        self.assertFalse(state.stale[self.player])
+        self.assertEqual(self._reachable_region_names(state), {"Region 1", "Region 2"})
+
+    def test_remove_clears_opaque_location_dependencies(self) -> None:
+        region_1 = self.multiworld.get_region("Region 1", self.player)
+        region_1.add_locations({"Location 3": 3, "Location 4": 4}, RuleBuilderLocation)
+        location_3 = self.world.get_location("Location 3")
+        location_3.access_rule = lambda state: state.has("Item 3", self.player)
+        location_4 = self.world.get_location("Location 4")
+        self.world.set_rule(location_4, CanReachLocation("Location 3"))
+        state = CollectionState(self.multiworld)
+        item_3 = self.world.create_item("Item 3")
+        state.collect(item_3, True)
+        self.assertTrue(location_4.can_reach(state))
+
+        state.remove(item_3)  # Region 1 stays reachable, but Location 3 is lost through its own rule
+        self.assertFalse(location_4.can_reach(state))
+
+
+class TestIndexedSweep(RuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+
+        regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(1, 4)]
+        self.multiworld.regions.extend(regions)
+        regions[0].add_locations({f"Location {i}": i for i in (1, 3, 4, 5, 6, 7)}, RuleBuilderLocation)
+        regions[1].add_locations({"Location 2": 2}, RuleBuilderLocation)
+
+        world.create_entrance(regions[0], regions[1], Has("Item 1"))
+        world.create_entrance(regions[0], regions[2], Has("Item 2"))
+        world.set_rule(world.get_location("Location 2"), Has("Item 1"))
+        world.set_rule(world.get_location("Location 3"), CanReachRegion("Region 3"))
+        world.get_location("Location 4").access_rule = lambda state: state.has("Item 3", self.player)
+        world.set_rule(world.get_location("Location 5"), Has("Item 4"))
+        world.set_rule(world.get_location("Location 6"), Has("Item 6"))
+        world.set_rule(world.get_location("Location 7"), CanReachLocation("Location 5"))
+        for i in range(1, 8):
+            world.get_location(f"Location {i}").place_locked_item(world.create_item(f"Item {i}"))
+
+    def test_sweep_collects_chain(self) -> None:
+        state = CollectionState(self.multiworld)
+        state.sweep_for_advancements()
+        for i in (1, 2, 3, 4, 5, 7):
+            self.assertTrue(state.has(f"Item {i}", self.player), f"Item {i}")
+        self.assertFalse(state.has("Item 6", self.player))
+
+    def test_sweep_skips_unaffected_locations(self) -> None:
+        location_6 = self.world.get_location("Location 6")
+        checks = 0
+
+        def can_reach(state: CollectionState) -> bool:
+            nonlocal checks
+            checks += 1
+            return Location.can_reach(location_6, state)
+
+        location_6.can_reach = can_reach  # type: ignore[method-assign]
+        state = CollectionState(self.multiworld)
+        iterations = sum(1 for _ in state.sweep_for_advancements(yield_each_sweep=True))
+        self.assertGreater(iterations, 2)
+        # only checked by the first iteration and by the final iteration that confirms the sweep is finished
+        self.assertEqual(checks, 2)
+
+
+class TestCompiledRules(RuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+
+        regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(1, 4)]
+        self.multiworld.regions.extend(regions)
+        regions[0].add_locations({f"Location {i}": i for i in range(1, 6)}, RuleBuilderLocation)
+        regions[2].add_locations({f"Location {i}": i for i in range(6, 9)}, RuleBuilderLocation)
+        world.create_entrance(regions[0], regions[1], HasAny("Item 1", "Item 4"))
+        world.create_entrance(regions[1], regions[2], Has("Item 2", 2))
+
+    def test_matches_interpreted(self) -> None:
+        rules = [
+            True_(),
+            False_(),
+            Has("Item 1"),
+            Has("Item 2", 2),
+            HasAll("Item 1", "Item 3"),
+            HasAny("Item 4", "Item 5"),
+            HasAllCounts({"Item 1": 1, "Item 2": 2}),
+            HasAnyCount({"Item 3": 2, "Item 5": 1}),
+            HasFromList("Item 1", "Item 2", "Item 3", count=3),
+            HasGroup("Group 1", count=2),
+            CanReachRegion("Region 2"),
+            CanReachRegion("Region 3") & HasAny("Item 1", "Item 5"),
+            Or(And(Has("Item 1"), Has("Item 3", 2)), And(Has("Item 4"), CanReachRegion("Region 2"))),
+            Or(Has("Item 5"), CanReachLocation("Location 6")),
+        ]
+        resolved_rules = [rule.resolve(self.world) for rule in rules]
+        self.world.set_rule(self.world.get_location("Location 6"), HasAll("Item 4", "Item 5"))
+        compiled = CompiledRules(self.player)
+        nodes = [compiled.add(rule) for rule in resolved_rules]
+        self.assertEqual(compiled.add(resolved_rules[2]), nodes[2], "Rules should be deduplicated")
+
+        item_names = [f"Item {i}" for i in range(1, 6)]
+        for seed in range(20):
+            random = Random(seed)
+            state = CollectionState(self.multiworld)
+            for _ in range(random.randrange(8)):
+                state.collect(self.world.create_item(random.choice(item_names)), True)
+            values = compiled.evaluate(state, nodes)
+            for rule, value in zip(resolved_rules, values):
+                with self.subTest(seed=seed, rule=str(rule)):
+                    self.assertEqual(value, rule(state))
+
+    def test_evaluates_only_needed_nodes(self) -> None:
+        rule = Or(HasAll("Item 1", "Item 3"), HasAll("Item 2", "Item 4")).resolve(self.world)
+        assert isinstance(rule, Or.Resolved)
+        deciding, skipped = rule.children
+        assert isinstance(deciding, HasAll.Resolved)
+        compiled = CompiledRules(self.player)
+        node = compiled.add(rule)
+        unused = compiled.add(CanReachLocation("Location 6").resolve(self.world))
+
+        def fail(_state: CollectionState) -> bool:
+            raise AssertionError("node should not be evaluated")
+
+        call_kind = compiled.definitions[unused][0]
+        for skipped_node in (compiled.add(skipped), unused):
+            compiled.definitions[skipped_node] = (call_kind, fail)
+        state = CollectionState(self.multiworld)
+        for item_name in deciding.item_names:
+            state.collect(self.world.create_item(item_name), True)
+        self.assertEqual(compiled.evaluate(state, [node]), [True])
+
+    def test_compiled_sweep(self) -> None:
+        placements = [
+            (True_(), "Item 1"),
+            (Has("Item 1"), "Item 2"),
+            (CanReachRegion("Region 2"), "Item 3"),
+            (HasAll("Item 1", "Item 2"), "Item 4"),
+            (HasFromList("Item 1", "Item 2", "Item 3", count=3), "Item 2"),
+            (True_(), "Item 5"),
+            (Has("Item 5"), "Item 3"),
+            (Has("Item 3", 3), "Item 3"),
+        ]
+        for i, (rule, item_name) in enumerate(placements, 1):
+            location = self.world.get_location(f"Location {i}")
+            self.world.set_rule(location, rule)
+            location.place_locked_item(self.world.create_item(item_name))
+
+        interpreted_state = CollectionState(self.multiworld)
+        interpreted_state.sweep_for_advancements()
+        self.world_cls.compile_rules = True
+        compiled_state = CollectionState(self.multiworld)
+        compiled_state.sweep_for_advancements()
+
+        self.assertEqual(compiled_state.advancements, interpreted_state.advancements)
+        self.assertEqual(compiled_state.prog_items, interpreted_state.prog_items)
+        self.assertEqual(len(compiled_state.advancements), 7)
+        self.assertNotIn(self.world.get_location("Location 8"), compiled_state.advancements)
+        self.assertTrue(self.world.compiled_rules.roots)
+
+
 class TestCacheDisabled(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
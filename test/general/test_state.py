@@ -1,7 +1,8 @@
 import unittest
 
+from BaseClasses import CollectionState, CompactItemCounter, RegionBitSet
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import setup_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +28,41 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+    def test_compact_state_matches(self):
+        """Ensure compact item and region storage produces the same all_state as the default storage."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                multiworld = setup_solo_multiworld(world_type, ("generate_early", "create_regions", "create_items",
+                                                                "set_rules", "connect_entrances", "generate_basic"))
+                default_state = multiworld.get_all_state(allow_partial_entrances=True)
+                multiworld.build_state_indices((1,))
+                compact_state = multiworld.get_all_state(allow_partial_entrances=True)
+                self.assertIsInstance(compact_state.prog_items[1], CompactItemCounter)
+                self.assertIsInstance(compact_state.reachable_regions[1], RegionBitSet)
+                self.assertEqual(compact_state.prog_items[1], default_state.prog_items[1])
+                self.assertEqual(set(compact_state.reachable_regions[1]), default_state.reachable_regions[1])
+                self.assertEqual(len(compact_state.reachable_regions[1]), len(default_state.reachable_regions[1]))
+
+                copied_state = compact_state.copy()
+                for item_name in list(copied_state.prog_items[1]):
+                    copied_state.remove_item(item_name, 1, copied_state.prog_items[1][item_name])
+                    self.assertFalse(copied_state.has(item_name, 1))
+                    self.assertTrue(compact_state.has(item_name, 1))
+                copied_state.reachable_regions[1].clear()
+                self.assertFalse(copied_state.reachable_regions[1])
+                self.assertEqual(set(compact_state.reachable_regions[1]), default_state.reachable_regions[1])
+
+    def test_copy_for_player_shares_up_to_date_regions(self):
+        """Ensure the regions copy_for_player shares with the real state never have to be updated by the copy."""
+        world_type = AutoWorldRegister.world_types["DLCQuest"]
+        multiworld = setup_multiworld([world_type, world_type])
+        state = CollectionState(multiworld)
+        self.assertTrue(state.stale[2])
+        copied_state = state.copy_for_player(1)
+        self.assertFalse(state.stale[2])
+        self.assertFalse(copied_state.stale[2])
+        self.assertIs(copied_state.reachable_regions[2], state.reachable_regions[2])
+        self.assertIsNot(copied_state.reachable_regions[1], state.reachable_regions[1])
+        copied_state.sweep_for_advancements(multiworld.get_locations(1))
+        self.assertEqual(state.reachable_regions[2], CollectionState(multiworld).copy_for_player(1).reachable_regions[2])
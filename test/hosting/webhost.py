@@ -140,6 +140,7 @@ def stop_room(app_client: "FlaskClient",
 
     from WebHostLib.models import Command, Room
     from WebHostLib import app
+    from WebHostLib.notifications import ROOM_COMMAND, notify
 
     poll_interval = 2
 
@@ -162,6 +163,9 @@ def stop_room(app_client: "FlaskClient",
             room.timeout = 1  # avoid spinning it up again
             Command(room=room, commandtext="/exit")
 
+    if address:
+        notify(app.config["LAUNCHER_NOTIFY_PORT"], ROOM_COMMAND, room_uuid)
+
     try:
         if address and timeout is not None:
             print("waiting for shutdown")
@@ -259,8 +263,7 @@ def _stop_webhost_mp(name_filter: str, graceful: bool = True) -> None:
             proc.join()
 
 def stop_autogen(graceful: bool = True) -> None:
-    # FIXME: this name filter is jank, but there seems to be no way to add a custom prefix for a Pool
-    _stop_webhost_mp("SpawnPoolWorker-", graceful)
+    _stop_webhost_mp("Generator-", graceful)
 
 def stop_autohost(graceful: bool = True) -> None:
     _stop_webhost_mp("MultiHoster", graceful)
@@ -0,0 +1,81 @@
+# Tests for NetUtils.encode_multidata and NetUtils.LazyMultiData
+import mmap
+import pickle
+import tempfile
+import unittest
+import zlib
+
+from NetUtils import LazyMultiData, encode_multidata
+
+sample_multidata = {
+    "slot_info": {1: ("Player1", "Game A"), 2: ("Player2", "Game B")},
+    "connect_names": {"Player1": (0, 1), "Player2": (0, 2)},
+    "locations": {
+        2: {23: (11, 1, 0), 21: (-3, 2, 4)},
+        1: {11: (21, 2, 7), 2 ** 40: (2 ** 40, 1, 0)},
+        3: {},
+    },
+    "slot_data": {1: {"goal": 1}, 2: {"goal": 2, "options": [1, 2, 3]}},
+    "er_hint_data": {1: {11: "Somewhere"}},
+    "precollected_hints": {1: set(), 2: set()},
+    "spheres": [{1: {11}}, {2: {21, 23}}],
+    "datapackage": {
+        "Game A": {"checksum": "abc", "item_name_to_id": {"Item": 21}},
+        "Game B": {"item_name_to_id": {"Item": 11}},
+    },
+    "seed_name": "12345",
+}
+
+
+class TestMultiData(unittest.TestCase):
+    def test_roundtrip(self) -> None:
+        multidata = LazyMultiData(encode_multidata(sample_multidata))
+        self.assertEqual(set(multidata), set(sample_multidata))
+        for key, value in sample_multidata.items():
+            with self.subTest(key=key):
+                self.assertEqual(dict(multidata[key]) if key in ("slot_data", "datapackage") else multidata[key],
+                                 value)
+
+    def test_sections_are_lazy(self) -> None:
+        multidata = LazyMultiData(encode_multidata(sample_multidata))
+        self.assertEqual(multidata["seed_name"], "12345")
+        slot_data = multidata["slot_data"]
+        self.assertEqual(set(slot_data), {1, 2})
+        self.assertEqual(slot_data._values, {})
+        self.assertEqual(slot_data[2], {"goal": 2, "options": [1, 2, 3]})
+        self.assertNotIn(1, slot_data._values)
+
+    def test_modify(self) -> None:
+        multidata = LazyMultiData(encode_multidata(sample_multidata))
+        multidata["seed_name"] = "54321"
+        del multidata["er_hint_data"]
+        multidata["datapackage"]["Game B"] = {"item_name_to_id": {}}
+        del multidata["slot_data"][1]
+        reencoded = LazyMultiData(encode_multidata(multidata))
+        self.assertEqual(reencoded["seed_name"], "54321")
+        self.assertNotIn("er_hint_data", reencoded)
+        self.assertEqual(reencoded["datapackage"]["Game B"], {"item_name_to_id": {}})
+        self.assertEqual(reencoded["datapackage"]["Game A"], sample_multidata["datapackage"]["Game A"])
+        self.assertEqual(list(reencoded["slot_data"]), [2])
+
+    def test_wrong_version(self) -> None:
+        with self.assertRaises(ValueError):
+            LazyMultiData(bytes([3]) + zlib.compress(pickle.dumps(sample_multidata)))
+
+    def test_server_reads_both_versions(self) -> None:
+        from MultiServer import Context
+        legacy = Context.decompress(bytes([3]) + zlib.compress(pickle.dumps(sample_multidata)))
+        self.assertEqual(legacy, sample_multidata)
+        current = Context.decompress(encode_multidata(sample_multidata))
+        self.assertIsInstance(current, LazyMultiData)
+        self.assertEqual(current["locations"], sample_multidata["locations"])
+
+    def test_close_mapped(self) -> None:
+        with tempfile.TemporaryFile() as f:
+            f.write(encode_multidata(sample_multidata))
+            f.flush()
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            multidata = LazyMultiData(mapped)
+            self.assertEqual(multidata["slot_data"][1], {"goal": 1})
+            multidata.close()
+            self.assertTrue(mapped.closed)
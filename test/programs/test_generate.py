@@ -1,12 +1,17 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import argparse
+import concurrent.futures
 import unittest
 import os
 import os.path
+import pickle
 import sys
+import zipfile
 
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import Generate
 import Main
@@ -25,6 +30,8 @@ class TestGenerateMain(unittest.TestCase):
         output_path = Path(output_dir)
         output_files = list(output_path.glob('*.zip'))
         if len(output_files) == 1:
+            with zipfile.ZipFile(output_files[0]) as zf:
+                self.assertTrue(any(name.endswith('.archipelago') for name in zf.namelist()))
             return True
         self.fail(f"Expected {output_dir} to contain one zip, but has {len(output_files)}: "
                   f"{list(output_path.glob('*'))}")
@@ -39,8 +46,14 @@ class TestGenerateMain(unittest.TestCase):
         Generate.Utils.user_path.cached_path = Generate.Utils.local_path.cached_path = str(self.generate_dir)
         os.chdir(self.run_dir)
         self.output_tempdir = TemporaryDirectory(prefix='AP_out_')
+        # keep the parsed yaml and resolved option caches out of the real cache directory
+        self.cache_tempdir = TemporaryDirectory(prefix='AP_cache_')
+        self.cache_path = mock.patch("Utils.cache_path", lambda *path: os.path.join(self.cache_tempdir.name, *path))
+        self.cache_path.start()
 
     def tearDown(self):
+        self.cache_path.stop()
+        self.cache_tempdir.cleanup()
         self.output_tempdir.cleanup()
         os.chdir(self.original_cwd)
         sys.argv = self.original_argv
@@ -109,7 +122,7 @@ class TestGenerateWeights(TestGenerateMain):
     test_generate_absolute = None
     test_generate_relative = None
 
-    def test_generate_yaml(self):
+    def generate(self) -> argparse.Namespace:
         from settings import get_settings
         from Utils import user_path, local_path
         settings = get_settings()
@@ -123,17 +136,131 @@ class TestGenerateWeights(TestGenerateMain):
             namespace, seed = Generate.main()
         finally:
             user_path.cached_path = user_path_backup
+        self.assertEqual(seed, 1)
+        self.assertIsNone(Generate._resolved_options)  # only used while rolling
+        return namespace
 
-        # there's likely a better way to do this, but hardcode the results from seed 1 to ensure they're always this
-        expected_results = {
-            "accessibility": [0, 2, 0, 2, 2],
-            "progression_balancing": [0, 50, 99, 0, 50],
-        }
+    # there's likely a better way to do this, but hardcode the results from seed 1 to ensure they're always this
+    expected_results = {
+        "accessibility": [0, 0, 0, 2, 2],
+        "progression_balancing": [0, 99, 0, 99, 0],
+    }
 
-        self.assertEqual(seed, 1)
-        for option_name, results in expected_results.items():
+    def assertExpectedResults(self, namespace: argparse.Namespace) -> None:
+        for option_name, results in self.expected_results.items():
             for player, result in enumerate(results, 1):
                 self.assertEqual(
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+    def test_generate_yaml(self):
+        self.assertExpectedResults(self.generate())
+
+    def test_generate_yaml_parallel(self):
+        """Rolling in a process pool has to give the same results as rolling in order."""
+        with mock.patch("Generate.parallel_threshold", 1), mock.patch("os.cpu_count", return_value=2), \
+                mock.patch("concurrent.futures.ProcessPoolExecutor",
+                           wraps=concurrent.futures.ProcessPoolExecutor) as pool:
+            namespace = self.generate()
+        self.assertTrue(pool.called)
+        self.assertExpectedResults(namespace)
+
+
+class TestReadWeights(unittest.TestCase):
+    """Tests caching parsed yaml files by content."""
+
+    def test_cached(self):
+        weights_path = Path(__file__).parent / "data" / "weights" / "weights.yaml"
+        with TemporaryDirectory() as cache_dir, \
+                mock.patch("Utils.cache_path", lambda *path: os.path.join(cache_dir, *path)):
+            parsed = Generate.read_weights_yamls(str(weights_path))
+            self.assertEqual(len(os.listdir(os.path.join(cache_dir, "yaml"))), 1)
+            with mock.patch("Generate.parse_yamls") as parse_yamls:
+                self.assertEqual(Generate.read_weights_yamls(str(weights_path)), parsed)
+            parse_yamls.assert_not_called()
+
+    def test_pruned(self):
+        with TemporaryDirectory() as cache_dir, \
+                mock.patch("Utils.cache_path", lambda *path: os.path.join(cache_dir, *path)), \
+                mock.patch("Generate.yaml_cache_size", 2):
+            for index in range(4):
+                Generate._parse_yamls_cached(f"name: Player{index}")
+            self.assertEqual(len(os.listdir(os.path.join(cache_dir, "yaml"))), 4)
+            Generate._prune_yaml_cache(os.path.join(cache_dir, "yaml"))
+            self.assertEqual(len(os.listdir(os.path.join(cache_dir, "yaml"))), 2)
+
+    def test_unsafe_cache_not_loaded(self):
+        with TemporaryDirectory() as cache_dir, \
+                mock.patch("Utils.cache_path", lambda *path: os.path.join(cache_dir, *path)):
+            yaml = "name: Player"
+            Generate._parse_yamls_cached(yaml)
+            path, = (entry.path for entry in os.scandir(os.path.join(cache_dir, "yaml")))
+            with open(path, "wb") as f:
+                f.write(pickle.dumps(mock.sentinel))
+            self.assertEqual(Generate._parse_yamls_cached(yaml), ({"name": "Player"},))
+
+
+class TestResolvedOptions(unittest.TestCase):
+    """Tests reusing options resolved without randomness."""
+
+    weights = {
+        "name": "Player",
+        "game": "Archipelago",
+        "Archipelago": {"accessibility": "minimal", "progression_balancing": "random"},
+    }
+
+    def test_reused(self):
+        from Options import Accessibility, ProgressionBalancing
+        with TemporaryDirectory() as cache_dir, \
+                mock.patch("Utils.cache_path", lambda *path: os.path.join(cache_dir, *path)), \
+                mock.patch("Generate._resolved_options", Generate.ResolvedOptionCache()):
+            settings, error, new_options = Generate.roll_settings_reporting(self.weights,
+                                                                            Generate.PlandoOptions.bosses, 1)
+            self.assertIsNone(error)
+            Generate.get_resolved_options().merge(new_options)
+            Generate.get_resolved_options().save()
+
+            with mock.patch("Generate._resolved_options", Generate.ResolvedOptionCache()), \
+                    mock.patch.object(Accessibility, "from_any", wraps=Accessibility.from_any) as accessibility, \
+                    mock.patch.object(ProgressionBalancing, "from_any",
+                                      wraps=ProgressionBalancing.from_any) as progression_balancing:
+                rerolled, error, new_options = Generate.roll_settings_reporting(self.weights,
+                                                                                Generate.PlandoOptions.bosses, 1)
+            self.assertIsNone(error)
+            self.assertNotIn(mock.call("minimal"), accessibility.call_args_list)  # loaded from disk
+            progression_balancing.assert_any_call("random")  # random, so it can't be reused
+            self.assertEqual(rerolled.accessibility, settings.accessibility)
+            self.assertIsNot(rerolled.accessibility, settings.accessibility)
+            self.assertEqual(rerolled.progression_balancing, settings.progression_balancing)
+
+    def test_changed_option_source(self):
+        from Options import Accessibility
+        with TemporaryDirectory() as cache_dir, \
+                mock.patch("Utils.cache_path", lambda *path: os.path.join(cache_dir, *path)), \
+                mock.patch("Generate._resolved_options", Generate.ResolvedOptionCache()):
+            settings, error, new_options = Generate.roll_settings_reporting(self.weights,
+                                                                            Generate.PlandoOptions.bosses, 1)
+            Generate.get_resolved_options().merge(new_options)
+            Generate.get_resolved_options().save()
+
+            with mock.patch("Generate._resolved_options", Generate.ResolvedOptionCache()), \
+                    mock.patch("Generate._get_option_source_hash", lambda option: f"changed {option.__name__}"), \
+                    mock.patch.object(Accessibility, "from_any", wraps=Accessibility.from_any) as accessibility:
+                Generate.roll_settings_reporting(self.weights, Generate.PlandoOptions.bosses, 1)
+            accessibility.assert_any_call("minimal")  # verified again by the changed code
+
+
+class TestArchive(unittest.TestCase):
+    def test_duplicate_name(self):
+        with TemporaryDirectory() as temp_dir:
+            directories = [os.path.join(temp_dir, "first"), os.path.join(temp_dir, "second")]
+            for directory in directories:
+                os.mkdir(directory)
+                with open(os.path.join(directory, "output.txt"), "w") as f:
+                    f.write(directory)
+            with zipfile.ZipFile(os.path.join(temp_dir, "output.zip"), "w") as archive:
+                Main._add_to_archive(archive, directories[0])
+                with self.assertRaises(FileExistsError):
+                    Main._add_to_archive(archive, directories[1])
+                self.assertEqual(["output.txt"], archive.namelist())
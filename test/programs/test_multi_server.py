@@ -1,5 +1,13 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import threading
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import zlib
+
+from MultiServer import Client, ClientRegistry, Context, SaveJournal, ServerCommandProcessor, send_items_to
+from NetUtils import Hint, HintStatus, NetworkItem
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +46,190 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class SaveContext(Context):
+    def _load_game_data(self) -> None:
+        pass  # not needed for saving, and the data package can only be loaded into one Context
+
+
+class TestHintIndex(unittest.TestCase):
+    def test_location_check_updates_hint(self) -> None:
+        ctx = SaveContext("", 0, "", "", 0, 0, False)
+        ctx.save_journal = SaveJournal("test.apsave")  # only tracks changes, nothing is written
+        hint = Hint(2, 1, 10, 100, False)
+        other_hint = Hint(1, 1, 11, 101, False)
+        ctx.hints[0, 1] = {hint, other_hint}
+        ctx.hints[0, 2] = {hint}
+        ctx.index_hints()
+        self.assertIs(ctx.get_hint(0, 1, 10), hint)
+        self.assertIsNone(ctx.get_hint(0, 2, 10))
+
+        ctx.location_checks[0, 1] |= {10, 12}
+        self.assertEqual(ctx.recheck_location_hints(0, 1, {10, 12}), {(0, 1), (0, 2)})
+        found_hint = ctx.get_hint(0, 1, 10)
+        self.assertTrue(found_hint.found)
+        self.assertEqual(found_hint.status, HintStatus.HINT_FOUND)
+        self.assertEqual(ctx.hints[0, 1], {found_hint, other_hint})
+        self.assertEqual(ctx.hints[0, 2], {found_hint})
+        self.assertIs(ctx.get_hint(0, 1, 11), other_hint)
+        self.assertEqual(ctx.changed_save_entries["hints"], {(0, 1), (0, 2)})
+        self.assertEqual(ctx.recheck_location_hints(0, 1, {10}), set())
+
+
+class TestQueuedMessages(unittest.TestCase):
+    def test_burst_is_coalesced(self) -> None:
+        sent: list[tuple[list[Client], list[dict]]] = []
+
+        class RecordingContext(SaveContext):
+            async def send_encoded_msgs(self, endpoint: Client, msg: str) -> bool:
+                sent.append(([endpoint], self.loader(msg)))
+                return True
+
+            async def broadcast_send_encoded_msgs(self, endpoints, msg: str) -> bool:
+                sent.append((list(endpoints), self.loader(msg)))
+                return True
+
+        async def burst() -> None:
+            ctx = RecordingContext("", 0, "", "", 0, 0, False)
+            clients = [Client(None, ctx), Client(None, ctx)]
+            ctx.clients = {0: {1: clients, 2: []}}
+            ctx.stored_data_notification_clients["_read_hints_0_1"].add(clients[0])
+            for i in range(3):
+                send_items_to(ctx, 0, 1, NetworkItem(i, i, 2, 0))
+                ctx.queue_texts(0, [{"cmd": "PrintJSON", "data": [{"text": str(i)}]}])
+                ctx.queue_room_update(0, 1, {"hint_points": i, "checked_locations": {i}})
+                ctx.queue_changed_hints(0, 1)
+            self.assertEqual(sent, [])
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        asyncio.run(burst())
+        cmds = [msgs[0]["cmd"] for endpoints, msgs in sent]
+        self.assertEqual(cmds, ["PrintJSON", "ReceivedItems", "ReceivedItems", "RoomUpdate", "SetReply"])
+        self.assertEqual(len(sent[0][1]), 3)
+        self.assertEqual(len(sent[1][1][0]["items"]), 3)
+        self.assertEqual(sent[3][1], [{"cmd": "RoomUpdate", "hint_points": 2, "checked_locations": [0, 1, 2]}])
+
+
+class TestClientRegistry(unittest.TestCase):
+    def test_bounce_targets_and_notifications(self) -> None:
+        ctx = SaveContext("", 0, "", "", 0, 0, False)
+        ctx.clients = {0: {1: [], 2: []}, 1: {1: []}}
+        registry = ctx.client_registry
+        clients = []
+        for team, slot, tags in ((0, 1, ["DeathLink"]), (0, 2, ["Tracker"]), (1, 1, ["DeathLink"])):
+            client = Client(None, ctx)
+            client.team, client.slot, client.tags = team, slot, tags
+            registry.add(client, f"Game {slot}")
+            clients.append(client)
+        player, tracker, other_team = clients
+
+        self.assertEqual(registry.get_bounce_targets(0, [], ["DeathLink"], []), {player})
+        self.assertEqual(registry.get_bounce_targets(0, ["Game 2"], [], [1]), {player, tracker})
+        self.assertEqual(registry.get_bounce_targets(1, ["Game 1"], ["DeathLink"], [1]), {other_team})
+        self.assertEqual(registry.get_bounce_targets(0, ["Game 3"], ["Unused"], [3]), set())
+
+        player.tags = ["Tracker"]
+        registry.add(player, "Game 1")
+        self.assertEqual(registry.get_bounce_targets(0, [], ["DeathLink"], []), set())
+        self.assertEqual(registry.get_bounce_targets(0, [], ["Tracker"], []), {player, tracker})
+
+        registry.add_notification(player, "key")
+        registry.add_notification(tracker, "key")
+        self.assertEqual(set(ctx.stored_data_notification_clients["key"]), {player, tracker})
+        asyncio.run(ctx.disconnect(player))
+        self.assertEqual(set(ctx.stored_data_notification_clients["key"]), {tracker})
+        self.assertEqual(registry.get_bounce_targets(0, ["Game 1"], ["Tracker"], [1]), {tracker})
+        registry.remove(tracker)
+        self.assertNotIn("key", ctx.stored_data_notification_clients)
+        self.assertNotIn((0, "Tracker"), registry.by_tag)
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, "test.apsave")
+        self.ctx = SaveContext("", 0, "", "", 0, 0, False)
+        self.ctx.save_journal = SaveJournal(self.path)
+
+    def replay(self) -> dict:
+        savedata, changes = SaveJournal(self.path).read()
+        for change in changes:
+            Context.apply_save_changes(savedata, change)
+        return savedata
+
+    def test_changes_are_appended(self) -> None:
+        ctx = self.ctx
+        ctx.received_items[0, 1, True] = [NetworkItem(1, 2, 1, 0)]
+        self.assertTrue(ctx._save())
+        snapshot_size = os.path.getsize(self.path)
+
+        ctx.received_items[0, 1, True].append(NetworkItem(3, 4, 1, 0))
+        ctx.location_checks[0, 1] |= {2, 4}
+        ctx.change_save_entries("location_checks", (0, 1))
+        ctx.stored_data["key"] = [1]
+        ctx.change_save_entries("stored_data", "key")
+        self.assertTrue(ctx._save())
+        self.assertGreater(os.path.getsize(self.path), snapshot_size)
+        changes = ctx.save_journal.read()[1]
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["received_items"], {(0, 1, True): (1, [NetworkItem(3, 4, 1, 0)])})
+
+        with open(self.path, "ab") as f:
+            f.write(b"\xff\x00\x00\x00cut short")
+        self.assertEqual(self.replay(), ctx.get_save())
+
+    def test_only_changed_keys_are_recorded(self) -> None:
+        ctx = self.ctx
+        self.assertTrue(ctx._save())
+        ctx.name_aliases[0, 1] = "Alias"
+        changes = ctx.get_save_changes()
+        self.assertEqual(changes["name_aliases"], {(0, 1): "Alias"})
+        self.assertNotIn("random_state", changes)
+        self.assertNotIn("hints_used", changes)
+        self.assertNotIn("name_aliases", ctx.get_save_changes())
+
+    def test_no_tracking_without_journal(self) -> None:
+        ctx = SaveContext("", 0, "", "", 0, 0, False)
+        ctx.change_save_entries("stored_data", "key")
+        self.assertEqual(ctx.changed_save_entries, {})
+
+    def test_compaction(self) -> None:
+        ctx = self.ctx
+        self.assertTrue(ctx._save())
+        for index in range(100):
+            ctx.stored_data[f"key{index}"] = list(range(index))
+            ctx.change_save_entries("stored_data", f"key{index}")
+            self.assertTrue(ctx._save())
+        self.assertLess(len(ctx.save_journal.read()[1]), 100)  # compacted into a new snapshot at least once
+        self.assertEqual(self.replay(), ctx.get_save())
+        self.assertTrue(ctx._save(exit_save=True))
+        self.assertEqual(ctx.save_journal.read()[1], [])
+
+    def test_changes_from_event_loop_during_save(self) -> None:
+        ctx = self.ctx
+        saved = set()
+        done = threading.Event()
+
+        def save_regularly() -> None:
+            while not done.is_set():
+                saved.update(ctx.get_save_changes()["stored_data"])
+
+        thread = threading.Thread(target=save_regularly)
+        thread.start()
+        for index in range(1000):
+            ctx.stored_data[f"key{index}"] = index
+            ctx.change_save_entries("stored_data", f"key{index}")
+        done.set()
+        thread.join()
+        saved.update(ctx.get_save_changes()["stored_data"])
+        self.assertEqual(saved, set(ctx.stored_data))
+
+    def test_plain_save(self) -> None:
+        savedata = self.ctx.get_save()
+        with open(self.path, "wb") as f:
+            f.write(zlib.compress(pickle.dumps(savedata)))
+        self.assertEqual(self.ctx.save_journal.read(), (savedata, []))
+        self.assertTrue(self.ctx.save_journal.needs_snapshot)
@@ -0,0 +1,30 @@
+# Tests for write_file_atomic in Utils.py
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from Utils import write_file_atomic
+
+
+class TestWriteFileAtomic(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "sub", "file.bin")
+
+    def test_write(self) -> None:
+        write_file_atomic(self.path, b"first")
+        write_file_atomic(self.path, b"second")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"second")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["file.bin"])
+
+    def test_failed_write_keeps_file(self) -> None:
+        write_file_atomic(self.path, b"first")
+        with mock.patch("os.replace", side_effect=OSError), self.assertRaises(OSError):
+            write_file_atomic(self.path, b"second")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"first")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["file.bin"])
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import os
+import pickle
+import tempfile
+from unittest import mock
+
+from . import TestBase
+
+game_package = {
+    "checksum": "0123abcd",
+    "item_name_to_id": {"Item": 1},
+    "location_name_to_id": {"Location": 2},
+    "item_name_groups": {"Everything": ["Item"]},
+    "location_name_groups": {},
+}
+archipelago_package = {
+    "checksum": "archipelago",
+    "item_name_to_id": {"Nothing": -1},
+    "location_name_to_id": {"Cheat Console": -1},
+}
+
+
+class TestDataPackageStore(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.data_packages import cache_clear
+        from WebHostLib.models import GameDataPackage
+
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        cache_path = mock.patch("WebHostLib.data_packages.cache_path",
+                                lambda *path: os.path.join(self.temp_dir.name, *path))
+        cache_path.start()
+        self.addCleanup(cache_path.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+        cache_clear()
+        with db_session:
+            if not GameDataPackage.get(checksum=game_package["checksum"]):
+                GameDataPackage(checksum=game_package["checksum"], data=pickle.dumps(game_package))
+
+    def test_store(self) -> None:
+        from WebHostLib.data_packages import cache_clear, get_data_package, get_id_to_name
+
+        self.assertEqual(get_data_package(game_package["checksum"]), game_package)
+        self.assertIs(get_data_package(game_package["checksum"]), get_data_package(game_package["checksum"]))
+        self.assertEqual(get_id_to_name(game_package["checksum"]), ({1: "Item"}, {2: "Location"}))
+        self.assertIsNone(get_data_package("unknown"))
+        self.assertIsNone(get_data_package("../unknown"))
+
+        stored = os.path.join(self.temp_dir.name, "datapackages", f"{game_package['checksum']}.pickle")
+        self.assertTrue(os.path.isfile(stored))
+        cache_clear()
+        with mock.patch("WebHostLib.data_packages.GameDataPackage") as rows:
+            self.assertEqual(get_data_package(game_package["checksum"]), game_package)
+            rows.get.assert_not_called()
+
+    def test_unknown_not_cached(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.data_packages import get_data_package, get_id_to_name
+        from WebHostLib.models import GameDataPackage
+
+        checksum = "4567cdef"
+        self.assertIsNone(get_data_package(checksum))
+        self.assertIsNone(get_id_to_name(checksum))
+        with db_session:
+            GameDataPackage(checksum=checksum, data=pickle.dumps({**game_package, "checksum": checksum}))
+        self.assertEqual(get_data_package(checksum)["checksum"], checksum)
+        self.assertEqual(get_id_to_name(checksum), ({1: "Item"}, {2: "Location"}))
+
+    def test_rooms_share_tables(self) -> None:
+        from WebHostLib.customserver import WebHostContext
+
+        async def create_room() -> WebHostContext:
+            static_server_data = {
+                "non_hintable_names": {},
+                "gamespackage": {"Archipelago": archipelago_package},
+                "item_name_groups": {"Archipelago": {}},
+                "location_name_groups": {"Archipelago": {}},
+            }
+            ctx = WebHostContext(static_server_data, logging.getLogger("TestDataPackageStore"))
+            ctx.gamespackage = {"Archipelago": archipelago_package, "Game": game_package}
+            ctx.item_name_groups = {"Archipelago": {}, "Game": game_package["item_name_groups"]}
+            ctx.location_name_groups = {"Archipelago": {}, "Game": {}}
+            ctx._init_game_data()
+            return ctx
+
+        first = asyncio.run(create_room())
+        second = asyncio.run(create_room())
+        self.assertEqual(first.item_names["Game"], {1: "Item", -1: "Nothing"})
+        self.assertIs(first.item_names["Game"], second.item_names["Game"])
+        self.assertIs(first.all_item_and_group_names["Game"], second.all_item_and_group_names["Game"])
+        self.assertEqual(second.checksums["Game"], game_package["checksum"])
+        self.assertIsNot(first.item_names["Archipelago"], second.item_names["Archipelago"])
@@ -0,0 +1,148 @@
+import json
+import pickle
+import time
+from unittest import mock
+from uuid import uuid4
+
+from . import TestBase
+
+
+def _hanging_generator(config, connection) -> None:
+    connection.recv()
+    time.sleep(30)  # stand in for a generation that does not finish on its own
+
+
+def _instant_generator(config, connection) -> None:
+    while True:
+        gen_options, meta, owner, sid = connection.recv()
+        connection.send(sid)
+
+
+class TestGeneratorWorker(TestBase):
+    def create_generation(self):
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_STARTED
+
+        with db_session:
+            generation = Generation(options=pickle.dumps({}), meta=json.dumps({}), state=STATE_STARTED, owner=uuid4())
+            return generation.id
+
+    def start_worker(self, generator, timeout):
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import GeneratorWorker
+        from WebHostLib.models import Generation
+
+        sid = self.create_generation()
+        with mock.patch("WebHostLib.autolauncher._run_generator", generator):
+            worker = GeneratorWorker(self.app.config, 0)
+        self.addCleanup(worker.kill)
+        with db_session:
+            worker.start(Generation.get(id=sid), timeout)
+        return worker, sid
+
+    def test_finish(self) -> None:
+        worker, sid = self.start_worker(_instant_generator, None)
+        worker.connection.poll(10)
+        worker.check()
+        self.assertTrue(worker.idle)
+        self.assertTrue(worker.process.is_alive())
+
+    def test_timeout(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR
+
+        with mock.patch("WebHostLib.autolauncher._run_generator", _hanging_generator):
+            worker, sid = self.start_worker(_hanging_generator, 60)
+            process = worker.process
+            worker.check()
+            self.assertEqual(worker.sid, sid)
+            worker.deadline = time.monotonic()
+            worker.check()
+        self.assertTrue(worker.idle)
+        self.assertFalse(process.is_alive())
+        self.assertIsNot(worker.process, process)
+        with db_session:
+            generation = Generation.get(id=sid)
+            self.assertEqual(generation.state, STATE_ERROR)
+            self.assertIn("Allowed time for Generation exceeded", json.loads(generation.meta)["error"])
+
+    def test_cancel(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Generation
+
+        with mock.patch("WebHostLib.autolauncher._run_generator", _hanging_generator):
+            worker, sid = self.start_worker(_hanging_generator, None)
+            process = worker.process
+            with db_session:
+                self.assertFalse(worker.cancelled())
+                Generation.get(id=sid).delete()
+            with db_session:
+                self.assertTrue(worker.cancelled())
+            worker.stop()
+        self.assertTrue(worker.idle)
+        self.assertFalse(process.is_alive())
+
+    def test_failure_is_not_cancellation(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR
+
+        worker, sid = self.start_worker(_instant_generator, None)
+        process = worker.process
+        self.assertTrue(worker.connection.poll(10))
+        with db_session:
+            Generation.get(id=sid).state = STATE_ERROR  # gen_game marks a failed Generation before reporting it
+        with db_session:
+            self.assertFalse(worker.cancelled())
+        worker.check()
+        self.assertTrue(worker.idle)
+        self.assertIs(worker.process, process)
+
+    def test_error_is_cancellation_after_grace_period(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR
+
+        worker, sid = self.start_worker(_hanging_generator, None)
+        with db_session:
+            Generation.get(id=sid).state = STATE_ERROR
+        with db_session:
+            self.assertFalse(worker.cancelled())
+            with mock.patch("WebHostLib.autolauncher.GENERATION_ERROR_GRACE_PERIOD", 0):
+                self.assertTrue(worker.cancelled())
+
+    def test_progress(self) -> None:
+        import logging
+        from flask import url_for
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import GenerationProgress
+
+        sid = self.create_generation()
+        with self.app.app_context(), self.app.test_request_context():
+            status_url = url_for("api.wait_seed_api", seed=sid)
+        response = self.client.get(status_url)
+        self.assertEqual(response.get_json()["text"], "Generation running")
+        progress = GenerationProgress()
+        progress.sid = sid
+        record = logging.LogRecord("root", logging.INFO, "Main.py", 1, "Calculating Access Rules.", None, None)
+        with db_session:
+            progress.emit(record)
+        response = self.client.get(status_url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()["text"], "Generation running: Calculating Access Rules.")
+
+    def test_throttled_progress_is_written_later(self) -> None:
+        import logging
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import GenerationProgress
+        from WebHostLib.models import Generation
+
+        sid = self.create_generation()
+        progress = GenerationProgress()
+        progress.sid = sid
+        for stage in ("Creating Items.", "Calculating Access Rules.", "Running Item Plando."):
+            progress.emit(logging.LogRecord("root", logging.INFO, "Main.py", 1, stage, None, None))
+        timer = progress.timer
+        self.assertIsNotNone(timer)
+        timer.cancel()  # the in-memory test database is not shared with other threads
+        progress.flush()
+        with db_session:
+            self.assertEqual(json.loads(Generation.get(id=sid).meta)["progress"], "Running Item Plando.")
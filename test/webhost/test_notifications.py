@@ -0,0 +1,59 @@
+from uuid import uuid4
+
+from WebHostLib.notifications import ROOM_ACTIVE, ROOM_COMMAND, NotificationListener, notify
+from . import TestBase
+
+
+class TestNotifications(TestBase):
+    listener: NotificationListener
+    notify_port: int | None
+
+    def setUp(self) -> None:
+        super().setUp()
+        listener = NotificationListener.open(0)
+        assert listener
+        self.listener = listener
+        self.notify_port = self.app.config["LAUNCHER_NOTIFY_PORT"]
+        self.app.config["LAUNCHER_NOTIFY_PORT"] = self.listener.port
+
+    def tearDown(self) -> None:
+        self.listener.close()
+        self.app.config["LAUNCHER_NOTIFY_PORT"] = self.notify_port
+
+    def test_roundtrip(self) -> None:
+        room_id = uuid4()
+        notify(self.listener.port, ROOM_COMMAND, room_id)
+        self.assertEqual(self.listener.receive(1), (ROOM_COMMAND, room_id))
+        self.assertIsNone(self.listener.receive(0))
+
+    def test_disabled(self) -> None:
+        self.assertIsNone(NotificationListener.open(None))
+        notify(None, ROOM_ACTIVE, uuid4())  # does not raise
+
+    def test_room_notifies(self) -> None:
+        from flask import url_for
+        from pony.orm import db_session, select
+        from WebHostLib.models import Command, Room, Seed
+
+        with self.client.session_transaction() as session:
+            session["_id"] = owner = uuid4()
+        with db_session:
+            seed_id = Seed(multidata=b"", owner=owner).id
+        with self.app.app_context(), self.app.test_request_context():
+            new_room_url = url_for("new_room", seed=seed_id)
+        response = self.client.get(new_room_url)
+        self.assertEqual(response.status_code, 302)
+        kind, room_id = self.listener.receive(1) or (None, None)
+        self.assertEqual(kind, ROOM_ACTIVE)
+
+        with self.app.app_context(), self.app.test_request_context():
+            room_url = url_for("host_room", room=room_id)
+        self.client.post(room_url, data={"cmd": "/help"})
+        self.assertEqual(self.listener.receive(1), (ROOM_COMMAND, room_id))
+
+        with db_session:
+            for command in select(command for command in Command if command.room.id == room_id):  # type: ignore
+                command.delete()
+            room = Room.get(id=room_id)
+            room.seed.delete()
+            room.delete()
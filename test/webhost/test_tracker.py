@@ -103,3 +103,32 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_decoded_data_reused(self) -> None:
+        """Verify that multidata is only decoded once per seed and multisave again only after the room saved."""
+        import datetime
+        from unittest import mock
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import Context, TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1}}})
+        with mock.patch.object(Context, "decompress", wraps=Context.decompress) as decompress, db_session:
+            room = Room.get(id=self.room_id)
+            first = TrackerData(room)
+            second = TrackerData(room)
+            self.assertEqual(decompress.call_count, 1)
+            self.assertIs(first._multidata, second._multidata)
+            self.assertIs(first.get_player_missing_locations(0, 1), second.get_player_missing_locations(0, 1))
+            self.assertEqual(second.get_player_checked_locations(0, 1), {1})
+
+            # visiting the room page updates last_activity without a save
+            room.last_activity += datetime.timedelta(seconds=1)
+            self.assertIs(TrackerData(room)._multisave, first._multisave)
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1, 2}}})
+            room.save_version += 1
+            self.assertEqual(TrackerData(room).get_player_checked_locations(0, 1), {1, 2})
+            self.assertEqual(decompress.call_count, 1)
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import concurrent.futures
+import functools
 import hashlib
+import io
 import logging
+import multiprocessing
 import pathlib
+import pickle
 import sys
+import threading
 import time
+import weakref
 from collections.abc import Callable, Iterable, Mapping
 from random import Random
 from typing import (Any, ClassVar, Dict, FrozenSet, List, Optional, Self, Set, TextIO, Tuple,
@@ -12,6 +19,7 @@ from typing import (Any, ClassVar, Dict, FrozenSet, List, Optional, Self, Set, T
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState, Entrance
+from rule_builder.compiled import CompiledRules
 from rule_builder.rules import CustomRuleRegister, Rule
 from Utils import Version
 
@@ -204,16 +212,222 @@ def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
         world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            _assert_no_duplicate_items(multiworld, player, prev_item_count)
 
     call_stage(multiworld, method_name, *args)
 
 
+def _assert_no_duplicate_items(multiworld: "MultiWorld", player: int, prev_item_count: int) -> None:
+    new_items = multiworld.itempool[prev_item_count:]
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
+_forked_multiworld: Optional["MultiWorld"] = None
+"""The MultiWorld a forked call_all_parallel or output worker operates on, inherited from the parent process."""
+
+
+class _SlotPickler(pickle.Pickler):
+    """Pickles one slot's generation results, referencing objects shared with the parent process by name."""
+
+    def __init__(self, file: io.BytesIO, multiworld: "MultiWorld", player: int) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.shared_objects: Dict[int, Any] = {
+            id(multiworld): "multiworld",
+            id(multiworld.regions): "regions",
+            id(multiworld.state): "state",
+            id(multiworld.random): "random",
+        }
+        for other_player, world in multiworld.worlds.items():
+            if other_player != player:
+                self.shared_objects[id(world)] = other_player
+
+    def persistent_id(self, obj: Any) -> Any:
+        return self.shared_objects.get(id(obj))
+
+
+class _SlotUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, multiworld: "MultiWorld") -> None:
+        super().__init__(file)
+        self.multiworld = multiworld
+
+    def persistent_load(self, pid: Any) -> Any:
+        if isinstance(pid, int):
+            return self.multiworld.worlds[pid]
+        if pid == "multiworld":
+            return self.multiworld
+        return getattr(self.multiworld, pid)
+
+
+_untransferable_stages: "weakref.WeakKeyDictionary[MultiWorld, Set[Tuple[type, str]]]" = weakref.WeakKeyDictionary()
+"""For each MultiWorld, the world types and methods whose results could not be transferred from a worker, these are run
+in the parent from then on instead of throwing away the worker's work again."""
+
+
+def _get_shared_snapshot(multiworld: "MultiWorld", player: int) -> Tuple[Any, List[Any]]:
+    """The random state and the objects of other slots, which a world method run in a worker must not change."""
+    shared_objects: List[Any] = []
+    for other_player, world in multiworld.worlds.items():
+        if other_player != player:
+            shared_objects.append(world)
+            shared_objects.extend(vars(world).values())
+            shared_objects.extend(multiworld.state.prog_items[other_player].items())
+            shared_objects.append(len(multiworld.regions.region_cache[other_player]))
+    return multiworld.random.getstate(), shared_objects
+
+
+def _shared_snapshot_changed(before: Tuple[Any, List[Any]], after: Tuple[Any, List[Any]]) -> bool:
+    return before[0] != after[0] or len(before[1]) != len(after[1]) or any(
+        prev is not new and prev != new for prev, new in zip(before[1], after[1]))
+
+
+def _call_single_forked(method_name: str, player: int) -> Optional[bytes]:
+    """Runs a world method in a forked worker and returns the pickled slot results, or None to run it in the parent."""
+    multiworld = _forked_multiworld
+    assert multiworld is not None, "call_all_parallel worker was not forked from a generating process"
+    prev_itempool = multiworld.itempool.copy()
+    prev_precollected_count = len(multiworld.precollected_items[player])
+    prev_completion_condition = multiworld.completion_condition[player]
+    prev_shared = _get_shared_snapshot(multiworld, player)
+    try:
+        call_single(multiworld, method_name, player)
+        if _shared_snapshot_changed(prev_shared, _get_shared_snapshot(multiworld, player)):
+            # the world used multiworld.random or changed other slots, which only works in the parent process
+            return None
+        new_items = multiworld.itempool[len(prev_itempool):]
+        if len(multiworld.itempool) < len(prev_itempool) or any(
+                item is not prev_item for item, prev_item in zip(multiworld.itempool, prev_itempool)):
+            # the world modified items it does not own, this can only be done in the parent process
+            return None
+        if any(item.player != player for item in new_items):
+            return None
+        slot_results = (
+            multiworld.worlds[player],
+            multiworld.regions.region_cache[player],
+            multiworld.regions.entrance_cache[player],
+            multiworld.regions.location_cache[player],
+            new_items,
+            multiworld.precollected_items[player][prev_precollected_count:],
+            {region: entrances for region, entrances in multiworld.indirect_connections.items()
+             if region.player == player},
+            (multiworld.completion_condition[player]
+             if multiworld.completion_condition[player] is not prev_completion_condition else None),
+            multiworld.early_items[player],
+            multiworld.local_early_items[player],
+        )
+        buffer = io.BytesIO()
+        _SlotPickler(buffer, multiworld, player).dump(slot_results)
+        return buffer.getvalue()
+    except Exception as e:
+        # includes unpicklable results, such as lambda access rules; the parent process reruns the method and reports
+        # any actual error in the world
+        logging.debug(f"Running {method_name} for player {player} in the main process instead: {e!r}")
+        return None
+
+
+def _apply_slot_results(multiworld: "MultiWorld", player: int, data: bytes) -> None:
+    (world, region_cache, entrance_cache, location_cache, new_items, new_precollected, indirect_connections,
+     completion_condition, early_items, local_early_items) = _SlotUnpickler(io.BytesIO(data), multiworld).load()
+    multiworld.worlds[player] = world
+    dict.__setitem__(multiworld.per_slot_randoms, player, world.random)
+    multiworld.regions.region_cache[player] = region_cache
+    multiworld.regions.entrance_cache[player] = entrance_cache
+    multiworld.regions.location_cache[player] = location_cache
+    multiworld.itempool.extend(new_items)
+    for region in [region for region in multiworld.indirect_connections if region.player == player]:
+        del multiworld.indirect_connections[region]
+    multiworld.indirect_connections.update(indirect_connections)
+    if completion_condition is not None:
+        multiworld.completion_condition[player] = completion_condition
+    multiworld.early_items[player] = early_items
+    multiworld.local_early_items[player] = local_early_items
+    for item in new_precollected:
+        multiworld.push_precollected(item)
+
+
+def _can_fork() -> bool:
+    """
+    Whether worker processes can be forked safely. Only the calling thread is forked, so locks held by any other
+    thread, such as a WebHost generation running in a thread pool, would stay locked forever in the workers.
+    """
+    return ("fork" in multiprocessing.get_all_start_methods() and
+            threading.current_thread() is threading.main_thread() and threading.active_count() == 1)
+
+
+def call_all_parallel(multiworld: "MultiWorld", method_name: str, processes: int) -> None:
+    """
+    Like call_all, but runs the method of worlds that declare independent_generation in forked worker processes.
+    Results are merged back in player order, so the outcome is the same as calling the method for each player in turn.
+    Worlds whose results can't be transferred, for example due to lambda access rules, or that draw from
+    multiworld.random or change other slots, are run in this process instead, and that world type's method is not sent
+    to workers again. Falls back to call_all if there is nothing to parallelize or forking is not safe.
+    """
+    global _forked_multiworld
+    untransferable_stages = _untransferable_stages.setdefault(multiworld, set())
+    players = [player for player in multiworld.player_ids if multiworld.worlds[player].independent_generation and
+               (type(multiworld.worlds[player]), method_name) not in untransferable_stages and
+               # rule builder caching is keyed by object identity, which does not survive the transfer
+               not (method_name == "set_rules" and getattr(multiworld.worlds[player], "rule_caching_enabled", False))]
+    if processes < 2 or len(players) < 2 or not _can_fork():
+        call_all(multiworld, method_name)
+        return
+
+    _forked_multiworld = multiworld
+    try:
+        with multiprocessing.get_context("fork").Pool(min(processes, len(players))) as pool:
+            results = dict(zip(players, pool.starmap(_call_single_forked,
+                                                     [(method_name, player) for player in players])))
+    finally:
+        _forked_multiworld = None
+
+    for player in multiworld.player_ids:
+        prev_item_count = len(multiworld.itempool)
+        data = results.get(player)
+        if data is None:
+            if player in results:
+                untransferable_stages.add((type(multiworld.worlds[player]), method_name))
+            call_single(multiworld, method_name, player)
+        else:
+            _apply_slot_results(multiworld, player, data)
+        if __debug__:
+            _assert_no_duplicate_items(multiworld, player, prev_item_count)
+
+    call_stage(multiworld, method_name)
+
+
+def _set_forked_multiworld(multiworld: "MultiWorld") -> None:
+    global _forked_multiworld
+    _forked_multiworld = multiworld
+
+
+def _generate_output_forked(player: int, output_directory: str) -> None:
+    multiworld = _forked_multiworld
+    assert multiworld is not None, "generate_output worker was not forked from a generating process"
+    call_single(multiworld, "generate_output", player, output_directory)
+
+
+def submit_output_parallel(multiworld: "MultiWorld", output_directories: Mapping[int, str],
+                           processes: int) -> Dict[int, "concurrent.futures.Future[None]"]:
+    """
+    Starts generate_output of the worlds in output_directories that declare independent_output in forked worker
+    processes, each writing to the directory given for its player. Returns a future for each started world, the other
+    worlds are left to the caller. Starts nothing if there are less than 2 processes or forking is not safe, which
+    requires the platform to support it and this to be called from the main thread of a single-threaded process.
+    """
+    players = [player for player in output_directories if multiworld.worlds[player].independent_output]
+    if processes < 2 or not players or not _can_fork():
+        return {}
+    # with fork, the initializer arguments are inherited instead of pickled, and all workers are forked on first submit
+    pool = concurrent.futures.ProcessPoolExecutor(min(processes, len(players)), multiprocessing.get_context("fork"),
+                                                  initializer=_set_forked_multiworld, initargs=(multiworld,))
+    futures = {player: pool.submit(_generate_output_forked, player, output_directories[player]) for player in players}
+    pool.shutdown(wait=False)  # the workers exit once all submitted worlds are done
+    return futures
+
+
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types = {multiworld.worlds[player].__class__ for player in multiworld.player_ids}
     for world_type in sorted(world_types, key=lambda world: world.__name__):
@@ -324,6 +538,35 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    independent_generation: ClassVar[bool] = False
+    """If True, this world declares that its generate_early, create_regions, create_items, set_rules and generate_basic
+    only read and write its own slot, so they may be run in a worker process when parallel world stages are enabled.
+    Its world instance, regions and items are then pickled back to the generating process, and changes to class
+    level state are lost."""
+
+    independent_output: ClassVar[bool] = False
+    """If True, this world declares that generate_output only writes files to its output directory, changes nothing
+    read afterwards and does not wait for other output tasks such as stage_generate_output, so it may be run in a worker
+    process when parallel world stages are enabled. Any changes it makes to the world or multiworld are lost."""
+
+    decremental_reachability: ClassVar[bool] = False
+    """If True, removing an item from a CollectionState only drops the regions whose entry path depended on it,
+    instead of recalculating all region reachability from scratch. Rule builder rules report their dependencies,
+    any other access rule is assumed to depend on every item."""
+
+    cross_player_logic: ClassVar[bool] = False
+    """If True, this world's rules may depend on the items or regions of other players, so speculative sweeps during
+    entrance randomization have to copy and sweep the whole multiworld instead of only this world."""
+
+    compact_collection_state: ClassVar[bool] = False
+    """If True, CollectionStates store this world's items in a flat array and its reachable regions in a bitset,
+    interned after create_items. This makes state copies cheap, but prog_items and reachable_regions are then only
+    Counter-like and set-like instead of an actual Counter and set."""
+
+    compile_rules: ClassVar[bool] = False
+    """If True, sweeps evaluate this world's rule builder location rules in batches, through a program compiled from
+    all of them by rule_builder.compiled.CompiledRules, instead of calling each location's rule in turn."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -432,8 +675,8 @@ class World(metaclass=AutoWorldRegister):
 
     def generate_output(self, output_directory: str) -> None:
         """
-        This method gets called from a threadpool, do not use multiworld.random here.
-        If you need any last-second randomization, use self.random instead.
+        This method gets called from a threadpool, or a worker process if the world declares independent_output,
+        do not use multiworld.random here. If you need any last-second randomization, use self.random instead.
         """
         pass
 
@@ -559,7 +802,18 @@ class World(metaclass=AutoWorldRegister):
         """Called when a region is newly reachable by the state."""
         pass
 
+    def lost_region(self, state: "CollectionState", region: "Region") -> None:
+        """Called when a region is no longer known to be reachable by the state after an item was removed.
+        Only called for worlds with decremental_reachability."""
+        pass
+
     # following methods should not need to be overridden.
+    @functools.cached_property
+    def compiled_rules(self) -> CompiledRules:
+        """The compiled form of this world's location rules, only used if compile_rules is set.
+        Rules are compiled as locations are first evaluated through it."""
+        return CompiledRules(self.player)
+
     def create_filler(self) -> "Item":
         return self.create_item(self.get_filler_item_name())
 
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import abc
 import json
+import operator
+import struct
 import zipfile
 from enum import IntEnum
 import os
 import threading
 from io import BytesIO
 
-from typing import (ClassVar, Dict, List, Literal, Tuple, Any, Optional, Union, BinaryIO, overload, Sequence,
+from typing import (Callable, ClassVar, Dict, List, Literal, Tuple, Any, Optional, Union, BinaryIO, overload, Sequence,
                     TYPE_CHECKING)
 
 import bsdiff4
@@ -388,6 +390,15 @@ class APTokenTypes(IntEnum):
     XOR_8 = 5
 
 
+_token_header = struct.Struct("<BII")  # token type, offset, size of the arguments
+_token_range = struct.Struct("<II")  # arguments of COPY and RLE: length, source offset or value
+_bitwise_operators: Dict[int, Callable[[int, int], int]] = {
+    APTokenTypes.AND_8: operator.and_,
+    APTokenTypes.OR_8: operator.or_,
+    APTokenTypes.XOR_8: operator.xor,
+}
+
+
 class APTokenMixin:
     """
     A class that defines functions for generating a token binary, for use in patches.
@@ -402,29 +413,48 @@ class APTokenMixin:
     def get_token_binary(self) -> bytes:
         """
         Returns the token binary created from stored tokens.
+        WRITE tokens that continue where the previous WRITE token ended are merged into one token.
         :return: A bytes object representing the token data.
         """
-        data = bytearray()
-        data.extend(len(self._tokens).to_bytes(4, "little"))
+        data: List[bytes] = []
+        token_count = 0
+        write_offset = write_end = 0
+        writes: List[bytes] = []  # continuing WRITE tokens not added to data yet
+
+        def end_writes() -> None:
+            nonlocal token_count
+            write_data = b"".join(writes)
+            data.append(_token_header.pack(APTokenTypes.WRITE, write_offset, len(write_data)))
+            data.append(write_data)
+            token_count += 1
+            writes.clear()
+
         for token_type, offset, args in self._tokens:
-            data.append(token_type)
-            data.extend(offset.to_bytes(4, "little"))
-            if token_type in [APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8]:
+            if token_type == APTokenTypes.WRITE:
+                assert isinstance(args, bytes), f"Arguments to WRITE must be of type bytes, not {type(args)}"
+                if writes and offset != write_end:
+                    end_writes()
+                if not writes:
+                    write_offset = write_end = offset
+                writes.append(args)
+                write_end += len(args)
+                continue
+            if writes:
+                end_writes()
+            if token_type in _bitwise_operators:
                 assert isinstance(args, int), f"Arguments to AND/OR/XOR must be of type int, not {type(args)}"
-                data.extend(int.to_bytes(1, 4, "little"))
-                data.append(args)
+                data.append(_token_header.pack(token_type, offset, 1))
+                data.append(bytes((args,)))
             elif token_type in [APTokenTypes.COPY, APTokenTypes.RLE]:
                 assert isinstance(args, tuple), f"Arguments to COPY/RLE must be of type tuple, not {type(args)}"
-                data.extend(int.to_bytes(8, 4, "little"))
-                data.extend(args[0].to_bytes(4, "little"))
-                data.extend(args[1].to_bytes(4, "little"))
-            elif token_type == APTokenTypes.WRITE:
-                assert isinstance(args, bytes), f"Arguments to WRITE must be of type bytes, not {type(args)}"
-                data.extend(len(args).to_bytes(4, "little"))
-                data.extend(args)
+                data.append(_token_header.pack(token_type, offset, _token_range.size))
+                data.append(_token_range.pack(*args))
             else:
                 raise ValueError(f"Unknown token type {token_type}")
-        return bytes(data)
+            token_count += 1
+        if writes:
+            end_writes()
+        return token_count.to_bytes(4, "little") + b"".join(data)
 
     @overload
     def write_token(self,
@@ -480,33 +510,48 @@ class APPatchExtension(metaclass=AutoPatchExtensionRegister):
     @staticmethod
     def apply_tokens(caller: APProcedurePatch, rom: bytes, token_file: str) -> bytes:
         """Applies the given token file from the patch onto the current file."""
-        token_data = caller.get_file(token_file)
+        token_data = memoryview(caller.get_file(token_file))
         rom_data = bytearray(rom)
         token_count = int.from_bytes(token_data[0:4], "little")
         bpr = 4
+        # AND/OR/XOR tokens of the same type on consecutive bytes are applied together as one integer operation
+        bitwise_type = bitwise_offset = bitwise_end = 0
+        bitwise_args = bytearray()
+
+        def apply_bitwise() -> None:
+            length = len(bitwise_args)
+            if bitwise_end > len(rom_data):
+                raise IndexError(f"AND/OR/XOR token at {bitwise_end - 1:#x} is outside of the file")
+            value = _bitwise_operators[bitwise_type](
+                int.from_bytes(rom_data[bitwise_offset:bitwise_end], "little"),
+                int.from_bytes(bitwise_args, "little"))
+            rom_data[bitwise_offset:bitwise_end] = value.to_bytes(length, "little")
+            bitwise_args.clear()
+
         for _ in range(token_count):
-            token_type = token_data[bpr:bpr + 1][0]
-            offset = int.from_bytes(token_data[bpr + 1:bpr + 5], "little")
-            size = int.from_bytes(token_data[bpr + 5:bpr + 9], "little")
-            data = token_data[bpr + 9:bpr + 9 + size]
-            if token_type in [APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8]:
-                arg = data[0]
-                if token_type == APTokenTypes.AND_8:
-                    rom_data[offset] = rom_data[offset] & arg
-                elif token_type == APTokenTypes.OR_8:
-                    rom_data[offset] = rom_data[offset] | arg
-                else:
-                    rom_data[offset] = rom_data[offset] ^ arg
-            elif token_type in [APTokenTypes.COPY, APTokenTypes.RLE]:
-                length = int.from_bytes(data[:4], "little")
-                value = int.from_bytes(data[4:], "little")
-                if token_type == APTokenTypes.COPY:
-                    rom_data[offset: offset + length] = rom_data[value: value + length]
-                else:
-                    rom_data[offset: offset + length] = bytes([value] * length)
+            token_type, offset, size = _token_header.unpack_from(token_data, bpr)
+            bpr += _token_header.size
+            if token_type in _bitwise_operators:
+                if bitwise_args and (token_type != bitwise_type or offset != bitwise_end):
+                    apply_bitwise()
+                if not bitwise_args:
+                    bitwise_type, bitwise_offset, bitwise_end = token_type, offset, offset
+                bitwise_args.append(token_data[bpr])
+                bitwise_end += 1
             else:
-                rom_data[offset:offset + len(data)] = data
-            bpr += 9 + size
+                if bitwise_args:
+                    apply_bitwise()
+                if token_type in [APTokenTypes.COPY, APTokenTypes.RLE]:
+                    length, value = _token_range.unpack_from(token_data, bpr)
+                    if token_type == APTokenTypes.COPY:
+                        rom_data[offset: offset + length] = rom_data[value: value + length]
+                    else:
+                        rom_data[offset: offset + length] = bytes((value,)) * length
+                else:
+                    rom_data[offset:offset + size] = token_data[bpr:bpr + size]
+            bpr += size
+        if bitwise_args:
+            apply_bitwise()
         return bytes(rom_data)
 
     @staticmethod